@@ -0,0 +1,93 @@
+import ast, hashlib, json, os, sqlite3, threading, time
+
+CACHE_DB = os.environ.get("PY2CPP_AI_CACHE_DB", os.path.join(os.path.expanduser("~"), ".cache", "py2cpp", "ai-cache.sqlite3"))
+CACHE_MAX_ENTRIES = int(os.environ.get("PY2CPP_AI_CACHE_MAX", "5000"))
+CACHE_TTL = float(os.environ.get("PY2CPP_AI_CACHE_TTL_DAYS", "30")) * 86400
+CACHE_ENABLED = os.environ.get("PY2CPP_AI_CACHE", "1") != "0"
+
+def normalize_source(py_src: str) -> str:
+    # ast.dump without line/col attributes: whitespace, comments and layout don't change it
+    try:
+        return "ast:" + ast.dump(ast.parse(py_src), annotate_fields=False, include_attributes=False)
+    except (SyntaxError, ValueError):
+        return "raw:" + "\n".join(l.rstrip() for l in py_src.strip().splitlines())
+
+def conversion_key(py_src: str, model: str, system: str, options: dict) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_source(py_src), model, hashlib.sha256(system.encode()).hexdigest(),
+                 json.dumps(options, sort_keys=True)):
+        h.update(part.encode()); h.update(b"\0")
+    return h.hexdigest()
+
+# Persistent py -> cpp store for conversions that compiled. Evicts by TTL on read
+# and by least-recent use once over `max_entries`.
+class ConversionCache:
+    def __init__(self, path: str, max_entries: int, ttl: float, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = self.misses = self.stores = self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversions ("
+                "key TEXT PRIMARY KEY, cpp TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS conversions_last_used ON conversions(last_used)")
+        return self._db
+
+    def get(self, key: str):
+        if not self.enabled: return None
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT cpp, created FROM conversions WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                db.execute("DELETE FROM conversions WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            db.execute("UPDATE conversions SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, cpp: str):
+        if not self.enabled: return
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT OR REPLACE INTO conversions (key, cpp, created, last_used, hits) VALUES (?, ?, ?, ?, 0)",
+                       (key, cpp, now, now))
+            self.stores += 1
+            (n,) = db.execute("SELECT COUNT(*) FROM conversions").fetchone()
+            if n > self.max_entries:
+                cur = db.execute(
+                    "DELETE FROM conversions WHERE key IN (SELECT key FROM conversions ORDER BY last_used LIMIT ?)",
+                    (n - self.max_entries,),
+                )
+                self.evictions += cur.rowcount
+
+    def clear(self):
+        with self._lock: self._conn().execute("DELETE FROM conversions")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn().execute("SELECT COUNT(*) FROM conversions").fetchone()[0] if self.enabled else 0
+            return {
+                "enabled": self.enabled, "path": self.path, "entries": entries,
+                "maxEntries": self.max_entries, "ttlSeconds": self.ttl,
+                "hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+conversion_cache = ConversionCache(CACHE_DB, CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_ENABLED)
@@ -1,9 +1,15 @@
-import json, os, re, requests
+import json, os, re, requests, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from runner.sandbox import compile_cpp_only
+from runner.sandbox import compile_cpp_only, check_cpp_syntax, run_cpp, run_python
+from runner.batch import normalize_output
+from runner import metrics
+from ai.cache import conversion_cache, conversion_key
 
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
 MODEL = os.environ.get("OLLAMA_MODEL", "qwen2.5-coder:7b")
+OPTIONS = {"temperature": 0.15, "top_p": 0.9}
+MAX_CANDIDATES = int(os.environ.get("PY2CPP_AI_MAX_CANDIDATES", "4"))
 
 CF_BOILERPLATE = r"""
 #include <bits/stdc++.h>
@@ -73,43 +79,158 @@ USER_TEMPLATE = """Convert this Python to C++ (write logic inside solve()). Keep
 {py}
 ```"""
 
-def _ollama_generate(model: str, prompt: str, system: str) -> str:
+def _ollama_stream(model: str, prompt: str, system: str, options: dict = None, cancel=None):
     payload = {
         "model": model,
         "prompt": prompt,
         "system": system,
         "stream": True,
-        "options": {"temperature": 0.15, "top_p": 0.9}
+        "options": options or OPTIONS
     }
-    r = requests.post(f"{OLLAMA_URL}/api/generate", json=payload, timeout=600)
-    r.raise_for_status()
-    text = ""
-    for line in r.iter_lines(decode_unicode=True):
-        if not line: continue
-        obj = json.loads(line)
-        text += obj.get("response", "")
-        if obj.get("done"): break
-    return text
+    chunks, t0 = 0, time.perf_counter()
+    with metrics.stage("llm") as st, requests.post(f"{OLLAMA_URL}/api/generate", json=payload, timeout=600, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            # leaving the `with` closes the connection, which makes Ollama stop generating
+            if cancel is not None and cancel.is_set():
+                st.outcome = "cancelled"
+                return
+            if not line: continue
+            obj = json.loads(line)
+            if obj.get("response"):
+                chunks += 1
+                yield obj["response"]
+            if obj.get("done"):
+                # Ollama reports the exact count and decode time on the last line;
+                # otherwise a streamed chunk is about one token
+                tokens = obj.get("eval_count", chunks)
+                secs = obj["eval_duration"] / 1e9 if obj.get("eval_duration") else time.perf_counter() - t0
+                metrics.LLM_TOKENS.inc(model, amount=tokens)
+                if secs > 0: metrics.LLM_TOKENS_PER_SECOND.observe(tokens / secs, model)
+                break
+
+def _ollama_generate(model: str, prompt: str, system: str) -> str:
+    return "".join(_ollama_stream(model, prompt, system))
 
 def _extract_code(text: str) -> str:
     m = re.search(r"```(?:cpp|c\+\+|cc|cxx)?\s*(.*?)```", text, flags=re.S|re.I)
     return (m.group(1) if m else text).strip()
 
-def ai_convert_to_cpp(py_src: str, max_repairs: int = 2) -> str:
-    out = _ollama_generate(MODEL, USER_TEMPLATE.format(py=py_src), SYSTEM)
-    cpp = _extract_code(out)
-
-    for _ in range(max_repairs + 1):
+def _repair_prompt(err: str) -> str:
+    return (
+        "The C++ failed to compile with these errors:\n\n"
+        f"{err}\n\n"
+        "Fix and reprint the FULL corrected C++ file. Keep the SAME boilerplate and constraints. "
+        "Return ONLY the code in one fenced code block."
+    )
+
+def _candidate_temperature(i: int) -> float:
+    return min(OPTIONS["temperature"] + 0.25 * i, 1.0)
+
+# Generates k candidates concurrently at spread temperatures and screens each
+# with -fsyntax-only as it arrives; with sample_stdin, survivors are also built
+# and run against Python's output. Yields "candidate" events and returns the
+# winner (first that compiles, preferring the first that matches), else the first
+# failure. "built" marks a winner that already went through a full build and link.
+def _race_candidates(py_src: str, k: int, sample_stdin):
+    cancel = threading.Event()
+    prompt = USER_TEMPLATE.format(py=py_src)
+    pool = ThreadPoolExecutor(max_workers=k + 1, thread_name_prefix="ai-race")
+    ref = pool.submit(run_python, py_src, sample_stdin) if sample_stdin is not None else None
+
+    def candidate(i):
+        opts = {**OPTIONS, "temperature": _candidate_temperature(i)}
+        out = "".join(_ollama_stream(MODEL, prompt, SYSTEM, opts, cancel))
+        if cancel.is_set(): return None
+        cpp = _extract_code(out)
+        r = {"index": i, "temperature": opts["temperature"], "cpp": cpp, "ok": False, "matched": None, "err": "",
+             "built": False}
+        rc, r["err"] = check_cpp_syntax(cpp)
+        if rc != 0 or cancel.is_set() or ref is None: return {**r, "ok": rc == 0}
+        py_out, _, py_rc, _, _ = ref.result()
+        if py_rc != 0: return {**r, "ok": True}
+        out, err, rc, _, use = run_cpp(cpp, sample_stdin)
+        # the syntax check can't see link errors; the build can
+        if use["verdict"] == "CE": return {**r, "err": err}
+        return {**r, "ok": True, "built": True, "err": err,
+                "matched": rc == 0 and normalize_output(out) == normalize_output(py_out)}
+
+    futures = {pool.submit(candidate, i): i for i in range(k)}
+    first_ok = first_fail = None
+    errors = []
+    try:
+        for f in as_completed(futures):
+            try: r = f.result()
+            except Exception as e:
+                errors.append(e); continue
+            if r is None: continue
+            yield {"type": "candidate", "index": r["index"], "temperature": r["temperature"], "ok": r["ok"],
+                   "matched": r["matched"], "stderr": "" if r["ok"] else r["err"]}
+            if r["ok"] and r["matched"] is not False: return r
+            if r["ok"] and first_ok is None: first_ok = r
+            if not r["ok"] and first_fail is None: first_fail = r
+        if first_ok is None and first_fail is None and errors: raise errors[0]
+        return first_ok or first_fail
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Yields progress events as dicts with a "type" key:
+#   token {attempt, text}, candidate {index, temperature, ok, matched, stderr},
+#   compiling {attempt}, compile_failed {attempt, stderr}, repair {attempt},
+#   done {cpp, ok, attempts, cached}
+# Conversions that compiled are cached by normalized AST; use_cache=False bypasses it.
+# candidates > 1 races that many generations first and only falls back to the
+# sequential repair loop when none of them compiles.
+def ai_convert_events(py_src: str, max_repairs: int = 2, use_cache: bool = True,
+                      candidates: int = 1, sample_stdin: str = None):
+    key = conversion_key(py_src, MODEL, SYSTEM, OPTIONS)
+    hit = conversion_cache.get(key) if use_cache else None
+    if hit is not None:
+        metrics.LLM_CONVERSIONS.inc("cached")
+        yield {"type": "done", "cpp": hit, "ok": True, "attempts": 0, "cached": True}
+        return
+    prompt, start, cpp = USER_TEMPLATE.format(py=py_src), 0, ""
+    candidates = max(1, min(candidates, MAX_CANDIDATES))
+    if candidates > 1:
+        best = yield from _race_candidates(py_src, candidates, sample_stdin)
+        if best["ok"] and not best["built"]:
+            # only a full build may put a conversion in the cache
+            yield {"type": "compiling", "attempt": 0}
+            rc, err = compile_cpp_only(best["cpp"])
+            if rc != 0:
+                yield {"type": "compile_failed", "attempt": 0, "stderr": err}
+                best = {**best, "ok": False, "err": err}
+        if best["ok"]:
+            metrics.LLM_CONVERSIONS.inc("ok"); metrics.LLM_REPAIR_ROUNDS.observe(0)
+            conversion_cache.put(key, best["cpp"])
+            yield {"type": "done", "cpp": best["cpp"], "ok": True, "attempts": 1, "cached": False,
+                   "candidate": best["index"], "matched": best["matched"]}
+            return
+        prompt, start, cpp = _repair_prompt(best["err"]), 1, best["cpp"]
+    for attempt in range(start, max_repairs + 2):
+        if attempt > 0:
+            metrics.LLM_REPAIRS.inc()
+            yield {"type": "repair", "attempt": attempt}
+        out = ""
+        for tok in _ollama_stream(MODEL, prompt, SYSTEM):
+            out += tok
+            yield {"type": "token", "attempt": attempt, "text": tok}
+        cpp = _extract_code(out)
+        if attempt > max_repairs: break
+        yield {"type": "compiling", "attempt": attempt}
         rc, err = compile_cpp_only(cpp)
         if rc == 0:
-            return cpp
-        repair_prompt = (
-            "The C++ failed to compile with these errors:\n\n"
-            f"{err}\n\n"
-            "Fix and reprint the FULL corrected C++ file. Keep the SAME boilerplate and constraints. "
-            "Return ONLY the code in one fenced code block."
-        )
-        out = _ollama_generate(MODEL, repair_prompt, SYSTEM)
-        cpp = _extract_code(out)
-
-    return cpp
+            metrics.LLM_CONVERSIONS.inc("ok"); metrics.LLM_REPAIR_ROUNDS.observe(attempt)
+            conversion_cache.put(key, cpp)
+            yield {"type": "done", "cpp": cpp, "ok": True, "attempts": attempt + 1, "cached": False}
+            return
+        yield {"type": "compile_failed", "attempt": attempt, "stderr": err}
+        prompt = _repair_prompt(err)
+    metrics.LLM_CONVERSIONS.inc("failed"); metrics.LLM_REPAIR_ROUNDS.observe(max_repairs + 1)
+    yield {"type": "done", "cpp": cpp, "ok": False, "attempts": max_repairs + 2, "cached": False}
+
+def ai_convert_to_cpp(py_src: str, max_repairs: int = 2, use_cache: bool = True,
+                      candidates: int = 1, sample_stdin: str = None) -> str:
+    for ev in ai_convert_events(py_src, max_repairs, use_cache, candidates, sample_stdin):
+        if ev["type"] == "done": return ev["cpp"]
@@ -0,0 +1,17 @@
+from collections import deque
+
+n, m = map(int, input().split())
+grid = [input() for _ in range(n)]
+dist = [[-1] * m for _ in range(n)]
+dist[0][0] = 0
+q = deque()
+q.append((0, 0))
+while q:
+    r, c = q.popleft()
+    for dr, dc in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+        nr, nc = r + dr, c + dc
+        if 0 <= nr < n and 0 <= nc < m and grid[nr][nc] == "." and dist[nr][nc] == -1:
+            dist[nr][nc] = dist[r][c] + 1
+            q.append((nr, nc))
+reached = sum(1 for row in dist for d in row if d >= 0)
+print(dist[n - 1][m - 1], reached)
@@ -0,0 +1,21 @@
+import heapq
+
+n, m = map(int, input().split())
+adj = [[] for _ in range(n + 1)]
+for _ in range(m):
+    u, v, w = map(int, input().split())
+    adj[u].append((v, w))
+    adj[v].append((u, w))
+INF = 10 ** 18
+dist = [INF] * (n + 1)
+dist[1] = 0
+h = [(0, 1)]
+while h:
+    d, u = heapq.heappop(h)
+    if d > dist[u]:
+        continue
+    for v, w in adj[u]:
+        if d + w < dist[v]:
+            dist[v] = d + w
+            heapq.heappush(h, (dist[v], v))
+print(sum(x for x in dist[1:] if x < INF), max(x for x in dist[1:] if x < INF))
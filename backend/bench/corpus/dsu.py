@@ -0,0 +1,21 @@
+n, m = map(int, input().split())
+parent = list(range(n + 1))
+size = [1] * (n + 1)
+
+def find(x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+comps = n
+for _ in range(m):
+    u, v = map(int, input().split())
+    ru, rv = find(u), find(v)
+    if ru != rv:
+        if size[ru] < size[rv]:
+            ru, rv = rv, ru
+        parent[rv] = ru
+        size[ru] += size[rv]
+        comps -= 1
+print(comps, max(size[find(i)] for i in range(1, n + 1)))
@@ -0,0 +1,8 @@
+n, cap = map(int, input().split())
+dp = [0] * (cap + 1)
+for _ in range(n):
+    w, v = map(int, input().split())
+    for c in range(cap, w - 1, -1):
+        if dp[c - w] + v > dp[c]:
+            dp[c] = dp[c - w] + v
+print(dp[cap])
@@ -0,0 +1,12 @@
+import sys
+from functools import lru_cache
+sys.setrecursionlimit(10**6)
+
+@lru_cache(maxsize=None)
+def paths(i, j):
+    if i == 0 or j == 0:
+        return 1
+    return (paths(i - 1, j) + paths(i, j - 1) + paths(i - 1, j - 1)) % 1000000007
+
+r, c = map(int, input().split())
+print(paths(r, c))
@@ -0,0 +1,18 @@
+n = int(input())
+is_prime = [True] * (n + 1)
+is_prime[0] = False
+if n >= 1:
+    is_prime[1] = False
+i = 2
+while i * i <= n:
+    if is_prime[i]:
+        for j in range(i * i, n + 1, i):
+            is_prime[j] = False
+    i += 1
+count = 0
+total = 0
+for k in range(n + 1):
+    if is_prime[k]:
+        count += 1
+        total = (total + k) % 1000000007
+print(count, total)
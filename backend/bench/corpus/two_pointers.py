@@ -0,0 +1,11 @@
+n, k = map(int, input().split())
+a = sorted(map(int, input().split()))
+j = n - 1
+pairs = 0
+for i in range(n):
+    while j > i and a[i] + a[j] > k:
+        j -= 1
+    if j <= i:
+        break
+    pairs += j - i
+print(pairs)
@@ -0,0 +1,10 @@
+import sys
+
+words = sys.stdin.read().split()
+cnt = {}
+for w in words:
+    cnt[w] = cnt.get(w, 0) + 1
+best = sorted(cnt.items(), key=lambda kv: (-kv[1], kv[0]))
+for w, c in best[:10]:
+    print(w, c)
+print(len(cnt))
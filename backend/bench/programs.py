@@ -0,0 +1,69 @@
+import os, random
+from collections import namedtuple
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# gen(n, rng) -> stdin for size n; sizes run smallest first, the largest is
+# about where CPython needs a second or two
+Program = namedtuple("Program", "name gen sizes")
+
+def _ints(rng, n, lo, hi): return " ".join(str(rng.randint(lo, hi)) for _ in range(n))
+
+def _prefix_sums(n, rng):
+    q = n
+    qs = []
+    for _ in range(q):
+        l = rng.randint(1, n); qs.append(f"{l} {rng.randint(l, n)}")
+    return f"{n} {q}\n{_ints(rng, n, -10**9, 10**9)}\n" + "\n".join(qs) + "\n"
+
+def _sieve(n, rng): return f"{n}\n"
+
+def _bfs_grid(n, rng):
+    side = max(2, int(n ** 0.5))
+    rows = ["".join("#" if rng.random() < 0.25 else "." for _ in range(side)) for _ in range(side)]
+    rows[0] = "." + rows[0][1:]
+    return f"{side} {side}\n" + "\n".join(rows) + "\n"
+
+def _graph(n, rng, weighted):
+    m = 2 * n
+    edges = [f"{i} {rng.randint(1, i - 1)}" for i in range(2, n + 1)]  # connected
+    edges += [f"{rng.randint(1, n)} {rng.randint(1, n)}" for _ in range(m - len(edges))]
+    if weighted: edges = [f"{e} {rng.randint(1, 10**6)}" for e in edges]
+    return f"{n} {len(edges)}\n" + "\n".join(edges) + "\n"
+
+def _knapsack(n, rng):
+    items = max(1, n // 1000)
+    return f"{items} 1000\n" + "\n".join(f"{rng.randint(1, 1000)} {rng.randint(1, 10**6)}" for _ in range(items)) + "\n"
+
+def _two_pointers(n, rng): return f"{n} {10**9}\n{_ints(rng, n, 1, 10**9)}\n"
+
+def _word_freq(n, rng):
+    vocab = ["".join(rng.choice("abcdefgh") for _ in range(rng.randint(1, 6))) for _ in range(max(10, n // 50))]
+    words = [rng.choice(vocab) for _ in range(n)]
+    return "\n".join(" ".join(words[i:i + 12]) for i in range(0, n, 12)) + "\n"
+
+def _lis(n, rng): return f"{n}\n{_ints(rng, n, 1, 10**9)}\n"
+
+def _memo_paths(n, rng):
+    side = max(1, int(n ** 0.5))
+    return f"{side} {side + rng.randint(0, 9)}\n"
+
+PROGRAMS = [
+    Program("prefix_sums", _prefix_sums, (10**3, 10**4, 10**5)),
+    Program("sieve", _sieve, (10**4, 10**5, 10**6)),
+    Program("bfs_grid", _bfs_grid, (10**3, 10**4, 10**5)),
+    Program("dijkstra", lambda n, rng: _graph(n, rng, True), (10**3, 10**4, 10**5)),
+    Program("knapsack", _knapsack, (10**4, 10**5, 10**6)),
+    Program("two_pointers", _two_pointers, (10**3, 10**4, 10**5)),
+    Program("word_freq", _word_freq, (10**3, 10**4, 10**5)),
+    Program("lis", _lis, (10**3, 10**4, 10**5)),
+    Program("memo_paths", _memo_paths, (10**4, 10**5, 4 * 10**5)),
+    Program("dsu", lambda n, rng: _graph(n, rng, False), (10**3, 10**4, 10**5)),
+]
+
+def source(p: Program) -> str:
+    with open(os.path.join(CORPUS_DIR, p.name + ".py")) as f: return f.read()
+
+def stdin_for(p: Program, n: int, seed: int = 1) -> str:
+    # deterministic per (program, size, seed) so baselines compare like with like
+    return p.gen(n, random.Random(f"{p.name}:{n}:{seed}"))
@@ -0,0 +1,140 @@
+import argparse, json, os, platform, sys, tempfile, time
+
+from bench.programs import PROGRAMS, source, stdin_for
+from runner import sandbox
+from runner.batch import normalize_output
+from runner.limits import Limits
+from transpiler.python_to_cpp import transpile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+# generous: the point is to time the largest inputs, not to judge them
+BENCH_LIMITS = Limits(float(os.environ.get("PY2CPP_BENCH_CPU_LIMIT", "20")), None)
+
+def _best(runs):
+    # min cpu/wall over repeats (least noisy), peak memory of any run
+    ok = [u for u in runs if u["verdict"] == "OK"] or runs
+    return {"verdict": ok[0]["verdict"], "cpuMs": round(min(u["cpuUserMs"] + u["cpuSysMs"] for u in ok), 3),
+            "wallMs": min(u["wallMs"] for u in ok), "maxRssKb": max(u["maxRssKb"] for u in ok)}
+
+def _time_transpile(src: str, repeat: int):
+    best, cpp = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cpp, _ = transpile(src)
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    return cpp, round(best, 3)
+
+def bench_program(p, sizes, repeat: int, profile: str) -> dict:
+    src = source(p)
+    res = {"status": "ok", "sizes": {}}
+    try:
+        cpp, res["transpileMs"] = _time_transpile(src, repeat)
+    except Exception as e:
+        return {**res, "status": "transpile_error", "error": f"{type(e).__name__}: {e}"}
+    res["cppLines"] = cpp.count("\n") + 1
+    with tempfile.TemporaryDirectory() as d:
+        # compile from scratch every time: a cache hit would time nothing
+        enabled, sandbox.binary_cache.enabled = sandbox.binary_cache.enabled, False
+        try:
+            phases = {}
+            bin_path, err, rc = sandbox._compile(cpp, d, profile, stdin_for(p, sizes[-1]), BENCH_LIMITS, phases)
+        finally:
+            sandbox.binary_cache.enabled = enabled
+        res["compileMs"] = round(sum(phases.values()), 3)
+        if rc != 0: return {**res, "status": "compile_error", "error": err[-2000:]}
+        for n in sizes:
+            stdin = stdin_for(p, n)
+            py_runs, cpp_runs, match = [], [], True
+            for _ in range(repeat):
+                py_out, _, _, _, py_use = sandbox.run_python(src, stdin, BENCH_LIMITS)
+                out, _, _, _, use = sandbox._run([bin_path], stdin, d, BENCH_LIMITS)
+                py_runs.append(py_use); cpp_runs.append(use)
+                match = match and normalize_output(out) == normalize_output(py_out)
+            py, cc = _best(py_runs), _best(cpp_runs)
+            row = {"stdinBytes": len(stdin), "python": py, "cpp": cc, "match": match}
+            if py["verdict"] == cc["verdict"] == "OK":
+                row["speedup"] = round(py["cpuMs"] / max(cc["cpuMs"], 0.001), 2)
+            if not match and res["status"] == "ok": res["status"] = "mismatch"
+            res["sizes"][str(n)] = row
+    return res
+
+# metrics compared per program / per size, all lower-is-better; speedup is
+# reported but not compared, being a ratio of two noisy timings
+_PROGRAM_METRICS = ("transpileMs", "compileMs")
+_SIZE_METRICS = ("cpp.cpuMs", "cpp.maxRssKb", "python.cpuMs")
+
+def _get(row, path):
+    for k in path.split("."):
+        if not isinstance(row, dict) or k not in row: return None
+        row = row[k]
+    return row
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.3, floor_ms: float = 30.0, floor_kb: int = 4096) -> dict:
+    # a change counts when it is over `tolerance` relatively and over the floor
+    # in absolute terms, so timer noise on small inputs is ignored
+    regressions, improvements = [], []
+    def check(program, size, metric, base, cur):
+        floor = floor_kb if metric.endswith("Kb") else floor_ms
+        if not base or cur is None or abs(cur - base) <= floor: return
+        ratio = cur / base
+        entry = {"program": program, "size": size, "metric": metric, "baseline": base, "current": cur, "ratio": round(ratio, 3)}
+        if ratio > 1 + tolerance: regressions.append(entry)
+        elif ratio < 1 / (1 + tolerance): improvements.append(entry)
+    for name, cur in current["programs"].items():
+        base = baseline.get("programs", {}).get(name)
+        if base is None: continue
+        if base["status"] != cur["status"]:
+            entry = {"program": name, "size": None, "metric": "status", "baseline": base["status"], "current": cur["status"]}
+            (improvements if cur["status"] == "ok" else regressions).append(entry)
+        for metric in _PROGRAM_METRICS: check(name, None, metric, base.get(metric), cur.get(metric))
+        for size, row in cur.get("sizes", {}).items():
+            brow = base.get("sizes", {}).get(size)
+            if brow is None: continue
+            for metric in _SIZE_METRICS: check(name, int(size), metric, _get(brow, metric), _get(row, metric))
+    return {"tolerance": tolerance, "regressions": regressions, "improvements": improvements}
+
+def run(names=None, quick=False, repeat=3, profile=sandbox.DEFAULT_PROFILE, log=print) -> dict:
+    compiler, _ = sandbox._find_compiler()
+    results = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                        "compiler": compiler, "platform": platform.platform(), "cpus": os.cpu_count(),
+                        "profile": profile, "repeat": repeat, "quick": quick}, "programs": {}}
+    for p in PROGRAMS:
+        if names and p.name not in names: continue
+        sizes = p.sizes[:1] if quick else p.sizes
+        t0 = time.perf_counter()
+        r = results["programs"][p.name] = bench_program(p, sizes, repeat, profile)
+        speedups = [row.get("speedup") for row in r["sizes"].values()]
+        log(f"{p.name:14} {r['status']:15} transpile {r.get('transpileMs', 0):8.2f} ms  compile {r.get('compileMs', 0):8.1f} ms  "
+            f"speedup {' '.join(f'{s}x' if s else '-' for s in speedups) or '-'}  ({time.perf_counter() - t0:.1f}s)")
+    return results
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark transpile/compile time and Python vs C++ runtime over the corpus.")
+    ap.add_argument("--only", nargs="*", help="program names to run")
+    ap.add_argument("--quick", action="store_true", help="smallest input size only")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--profile", default=sandbox.DEFAULT_PROFILE, choices=sorted(sandbox.PROFILES))
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--tolerance", type=float, default=0.3)
+    ap.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    args = ap.parse_args(argv)
+
+    if sandbox._find_compiler()[0] is None: sys.exit("no C++ compiler found")
+    sandbox.warm_pch()
+    results = run(args.only, args.quick, args.repeat, args.profile)
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        results["comparison"] = {"baseline": args.baseline, **compare(results, baseline, args.tolerance)}
+        for kind in ("regressions", "improvements"):
+            for e in results["comparison"][kind]:
+                where = e["program"] + (f" n={e['size']}" if e["size"] else "")
+                print(f"{kind[:-1]:11} {where:24} {e['metric']:13} {e['baseline']} -> {e['current']}")
+    with open(args.baseline if args.save_baseline else args.out, "w") as f: json.dump(results, f, indent=1)
+    if results.get("comparison", {}).get("regressions"): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
-from fastapi import FastAPI
+import json, os, shutil, tempfile, threading
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
-from transpiler.python_to_cpp import py_to_cpp
-from runner.sandbox import run_python, run_cpp
-from ai.llm import ai_convert_to_cpp
+from transpiler.python_to_cpp import transpile as transpile_py
+from transpiler.incremental import sessions, VersionMismatch
+from runner.sandbox import warm_pch, DEFAULT_PROFILE
+from runner import async_sandbox
+from runner.async_sandbox import QueueFull
+from runner.pypool import python_pool
+from runner.limits import clamp
+from runner.compile_cache import binary_cache
+from runner import pch, metrics
+from runner.batch import MAX_BATCH_CASES
+from runner.streams import StdinFile, CHUNK, MAX_STDIN_BYTES, SPILL_MAX
+from ai.llm import ai_convert_to_cpp, ai_convert_events
+from ai.cache import conversion_cache
 
 app = FastAPI()
 
@@ -19,33 +34,240 @@ app.add_middleware(
 class TranspileReq(BaseModel):
     code: str
 
+class Edit(BaseModel):
+    start: int
+    end: int
+    text: str = ""
+
+class PatchReq(BaseModel):
+    baseVersion: int
+    edits: List[Edit]
+
 class ConvertReq(BaseModel):
     py: str
+    bypassCache: bool = False
+    candidates: int = 1
+    sampleStdin: Optional[str] = None
 
 class RunReq(BaseModel):
     code: str
     stdin: str = ""
+    cpuLimit: Optional[float] = None
+    memLimitMb: Optional[int] = None
+
+class CppRunReq(RunReq):
+    profile: Literal["fast", "release", "aggressive", "pgo"] = DEFAULT_PROFILE
+
+class BothReq(BaseModel):
+    python: str
+    cpp: str
+    stdin: str = ""
+    cpuLimit: Optional[float] = None
+    memLimitMb: Optional[int] = None
+    profile: Literal["fast", "release", "aggressive", "pgo"] = DEFAULT_PROFILE
+    floatTol: Optional[float] = None
+
+class BatchCase(BaseModel):
+    stdin: str = ""
+    expected: Optional[str] = None
+
+class BatchReq(BaseModel):
+    lang: Literal["cpp", "python"] = "cpp"
+    code: str
+    cases: List[BatchCase]
+    cpuLimit: Optional[float] = None
+    memLimitMb: Optional[int] = None
+
+class StressReq(BaseModel):
+    python: str
+    cpp: str
+    generator: str
+    maxCases: int = 1000
+    maxSeconds: float = 10.0
+    cpuLimit: Optional[float] = None
+    memLimitMb: Optional[int] = None
+    workers: Optional[int] = None
+    seed: int = 1
+    profile: Literal["fast", "release", "aggressive", "pgo"] = DEFAULT_PROFILE
+    shrink: bool = True
+
+@app.on_event("startup")
+def _warm_toolchain():
+    # build the precompiled header in the background so the first /run/cpp doesn't pay for it
+    threading.Thread(target=warm_pch, daemon=True).start()
+
+@app.on_event("shutdown")
+def _stop_workers():
+    python_pool.shutdown()
+
+@app.exception_handler(QueueFull)
+def _queue_full(request: Request, exc: QueueFull):
+    return JSONResponse(status_code=503, headers={"Retry-After": "1"},
+                        content={"detail": str(exc), "stage": exc.stage})
 
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
 
+# Prometheus text format; empty with PY2CPP_METRICS=0
+@app.get("/metrics")
+def metrics_route():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"binary": binary_cache.stats(), "pch": pch.status(), "ai": conversion_cache.stats(),
+            "transpileSessions": sessions.stats()}
+
+@app.get("/queue/stats")
+def queue_stats():
+    return {**async_sandbox.stats(), "pythonPool": python_pool.stats()}
+
 @app.post("/ai/convert")
 def ai_convert(req: ConvertReq):
-    cpp = ai_convert_to_cpp(req.py)
+    cpp = ai_convert_to_cpp(req.py, use_cache=not req.bypassCache, candidates=req.candidates,
+                            sample_stdin=req.sampleStdin)
     return {"cpp": cpp}
 
+def _sse(events):
+    try:
+        for ev in events:
+            yield f"event: {ev['type']}\ndata: {json.dumps(ev)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+@app.post("/ai/convert/stream")
+def ai_convert_stream(req: ConvertReq):
+    return StreamingResponse(_sse(ai_convert_events(
+        req.py, use_cache=not req.bypassCache, candidates=req.candidates, sample_stdin=req.sampleStdin)), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/transpile")
 def transpile(req: TranspileReq):
-    cpp = py_to_cpp(req.code)
-    return {"cpp": cpp}
+    with metrics.stage("transpile"): cpp, diagnostics = transpile_py(req.code)
+    return {"cpp": cpp, "diagnostics": diagnostics}
+
+# Incremental transpile for live editing: the client opens a session with the
+# whole buffer, then sends only its edits (offsets in UTF-16 code units) and
+# gets back the spliced C++; unchanged definitions aren't re-emitted.
+def _session_transpile(s):
+    with metrics.stage("transpile_incremental") as st:
+        r = s.transpile()
+        if r["error"]: st.outcome = "error"
+        return r
+
+@app.post("/transpile/session")
+def transpile_session(req: TranspileReq):
+    s = sessions.create(req.code)
+    with s.lock: return _session_transpile(s)
+
+@app.post("/transpile/session/{sid}/patch")
+def transpile_patch(sid: str, req: PatchReq):
+    s = sessions.get(sid)
+    if s is None: raise HTTPException(status_code=404, detail="unknown or expired session")
+    with s.lock:
+        try: s.patch(req.baseVersion, [(e.start, e.end, e.text) for e in req.edits])
+        except VersionMismatch as e: raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e: raise HTTPException(status_code=422, detail=str(e))
+        return _session_transpile(s)
+
+@app.delete("/transpile/session/{sid}")
+def transpile_session_close(sid: str):
+    return {"closed": sessions.close(sid)}
+
+def _run_response(res, waited):
+    out, err, rc, timed_out, use = res
+    return {"stdout": out, "stderr": err, "rc": rc, "timedOut": timed_out, "verdict": use["verdict"],
+            "usage": use, "queueMs": round(waited * 1000, 3), "truncated": use.get("outputTruncated", False)}
 
 @app.post("/run/python")
-def run_py(req: RunReq):
-    out, err, rc, timed_out = run_python(req.code, req.stdin)
-    return {"stdout": out, "stderr": err, "rc": rc, "timedOut": timed_out}
+async def run_py(req: RunReq):
+    res, waited = await async_sandbox.run_python(req.code, req.stdin, clamp(req.cpuLimit, req.memLimitMb))
+    return _run_response(res, waited)
 
 @app.post("/run/cpp")
-def run_cpp_route(req: RunReq):
-    out, err, rc, timed_out = run_cpp(req.code, req.stdin)
-    return {"stdout": out, "stderr": err, "rc": rc, "timedOut": timed_out}
+async def run_cpp_route(req: CppRunReq):
+    res, waited, build = await async_sandbox.run_cpp(req.code, req.stdin, clamp(req.cpuLimit, req.memLimitMb), req.profile)
+    return {**_run_response(res, waited), "compile": build}
+
+# /run/cpp for Python source: transpiled with a counter and timer on every loop,
+# returned as loopProfile (per loop, and ms per Python line for the editor heatmap)
+@app.post("/run/profile")
+async def run_profile_route(req: CppRunReq):
+    try:
+        res, waited, build, prof = await async_sandbox.run_profiled(req.code, req.stdin, clamp(req.cpuLimit, req.memLimitMb),
+                                                                    req.profile)
+    except SyntaxError as e: raise HTTPException(status_code=422, detail=str(e))
+    return {**_run_response(res, waited), "compile": build, "loopProfile": prof}
+
+@app.post("/run/both")
+async def run_both_route(req: BothReq):
+    r = await async_sandbox.run_both(req.python, req.cpp, req.stdin, clamp(req.cpuLimit, req.memLimitMb), req.profile,
+                                     req.floatTol)
+    (cc, cc_wait, build) = r["cpp"]
+    return {"python": _run_response(*r["python"]), "cpp": {**_run_response(cc, cc_wait), "compile": build},
+            "diff": r["diff"], "speedup": r["speedup"], "wallMs": r["wallMs"]}
+
+async def _spool_upload(upload: UploadFile, path: str):
+    # copied in chunks; the multipart parser has already spooled it to disk past 1 MB
+    n = 0
+    with open(path, "wb") as f:
+        while chunk := await upload.read(CHUNK):
+            n += len(chunk)
+            if n > MAX_STDIN_BYTES: raise HTTPException(status_code=413, detail=f"stdin over {MAX_STDIN_BYTES} bytes")
+            f.write(chunk)
+
+# Multipart form of /run/python, /run/cpp and /run/both for large test data:
+# the stdin file goes to the child as a file descriptor and is never held in
+# memory. With stream=true (one language only) the body is the full stdout,
+# up to PY2CPP_OUTPUT_SPILL_MAX, and the rest of the result is JSON in the
+# X-Run-Result header.
+@app.post("/run/upload")
+async def run_upload(lang: Literal["python", "cpp", "both"] = Form("cpp"), python: str = Form(""), cpp: str = Form(""),
+                     stdin: Optional[UploadFile] = File(None), cpuLimit: Optional[float] = Form(None),
+                     memLimitMb: Optional[int] = Form(None), profile: Literal["fast", "release", "aggressive", "pgo"] = Form(DEFAULT_PROFILE),
+                     stream: bool = Form(False)):
+    if stream and lang == "both": raise HTTPException(status_code=422, detail="stream needs a single language")
+    d = tempfile.mkdtemp(prefix="py2cpp-upload-")
+    streaming = False
+    try:
+        src = ""
+        if stdin is not None:
+            src = StdinFile(os.path.join(d, "stdin"))
+            await _spool_upload(stdin, src.path)
+        limits = clamp(cpuLimit, memLimitMb)
+        full = os.path.join(d, "stdout") if stream else None
+        if lang == "both":
+            r = await async_sandbox.run_both(python, cpp, src, limits, profile)
+            (cc, cc_wait, build) = r["cpp"]
+            return {"python": _run_response(*r["python"]), "cpp": {**_run_response(cc, cc_wait), "compile": build},
+                    "diff": r["diff"], "speedup": r["speedup"], "wallMs": r["wallMs"]}
+        if lang == "python":
+            result = _run_response(*await async_sandbox.run_python(python, src, limits, full))
+        else:
+            res, waited, build = await async_sandbox.run_cpp(cpp, src, limits, profile, full)
+            result = {**_run_response(res, waited), "compile": build}
+        if not stream: return result
+        if not os.path.exists(full): open(full, "wb").close()
+        result.pop("stdout")
+        result["stderr"] = result["stderr"][-1000:]
+        result["streamTruncated"] = result["usage"].get("stdoutBytes", 0) > SPILL_MAX
+        streaming = True
+        # the directory goes once the file has been sent
+        return FileResponse(full, media_type="text/plain; charset=utf-8", headers={"X-Run-Result": json.dumps(result)},
+                            background=BackgroundTask(shutil.rmtree, d, True))
+    finally:
+        if not streaming: shutil.rmtree(d, ignore_errors=True)
+
+@app.post("/run/batch")
+async def run_batch_route(req: BatchReq):
+    if len(req.cases) > MAX_BATCH_CASES:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH_CASES} cases per batch")
+    results, summary = await async_sandbox.run_batch(req.lang, req.code, [(c.stdin, c.expected) for c in req.cases],
+                                 clamp(req.cpuLimit, req.memLimitMb))
+    return {"results": results, "summary": summary}
+
+@app.post("/stress")
+async def stress_route(req: StressReq):
+    return await async_sandbox.run_stress(req.python, req.cpp, req.generator, max(1, req.maxCases), max(0.1, req.maxSeconds),
+                                          clamp(req.cpuLimit, req.memLimitMb), req.workers, req.seed, req.profile, req.shrink)
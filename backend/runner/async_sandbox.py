@@ -0,0 +1,204 @@
+import asyncio, os, tempfile, textwrap, time
+from contextlib import asynccontextmanager
+
+from runner import sandbox, metrics, stress
+from runner.batch import diff_outputs, FLOAT_TOL, BATCH_WORKERS, case_result, ce_results, summary
+from runner.limits import Limits, NO_LIMITS
+from transpiler import profiling
+from transpiler.python_to_cpp import transpile
+
+COMPILE_CONCURRENCY = int(os.environ.get("PY2CPP_COMPILE_CONCURRENCY", "0")) or os.cpu_count() or 1
+RUN_CONCURRENCY = int(os.environ.get("PY2CPP_RUN_CONCURRENCY", "0")) or os.cpu_count() or 1
+MAX_QUEUE = int(os.environ.get("PY2CPP_MAX_QUEUE", "64"))
+STRESS_CONCURRENCY = int(os.environ.get("PY2CPP_STRESS_CONCURRENCY", "1"))
+# a stress run holds its slot for up to max_seconds, so by default extra ones are refused, not queued
+STRESS_MAX_QUEUE = int(os.environ.get("PY2CPP_STRESS_MAX_QUEUE", "0"))
+
+class QueueFull(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} queue is full")
+        self.stage = stage
+
+# Semaphore plus a bounded wait list: callers beyond `max_queue` waiters are
+# rejected immediately instead of piling up behind the event loop.
+class Gate:
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._sem = None
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._sem is None: self._sem = asyncio.Semaphore(self.limit)
+        if self._sem.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            metrics.QUEUE_REJECTED.inc(self.name)
+            raise QueueFull(self.name)
+        t0 = time.perf_counter()
+        self.waiting += 1
+        metrics.QUEUE_WAITING.inc(self.name)
+        try: await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+            metrics.QUEUE_WAITING.dec(self.name)
+        self.active += 1
+        waited = time.perf_counter() - t0
+        metrics.QUEUE_WAIT.observe(waited, self.name)
+        try:
+            yield waited
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                "maxQueue": self.max_queue, "rejected": self.rejected}
+
+compile_gate = Gate("compile", COMPILE_CONCURRENCY, MAX_QUEUE)
+run_gate = Gate("run", RUN_CONCURRENCY, MAX_QUEUE)
+stress_gate = Gate("stress", STRESS_CONCURRENCY, STRESS_MAX_QUEUE)
+
+async def _exec(cmd, cwd):
+    p = await asyncio.create_subprocess_exec(
+        *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=cwd,
+    )
+    try:
+        out, err = await p.communicate()
+    except BaseException:
+        if p.returncode is None: p.kill()
+        raise
+    return sandbox._text(out), sandbox._text(err), p.returncode
+
+async def _run(cmd, stdin_str, cwd, limits: Limits, stdout_path: str = None):
+    # runs block in a worker thread: the sync path reaps with wait4 to collect rusage,
+    # which asyncio's child watcher would otherwise race for
+    async with run_gate.slot() as waited:
+        res = await asyncio.to_thread(sandbox._run, cmd, stdin_str, cwd, limits, stdout_path)
+    return res, waited
+
+async def _compile(cpp_code: str, d: str, profile: str, stdin_str: str, limits: Limits, phases: dict):
+    async with compile_gate.slot() as waited:
+        with metrics.stage("compile") as st:
+            res = await _compile_in_slot(cpp_code, d, profile, stdin_str, limits, phases)
+            if res[2] != 0: st.outcome = "error"
+        return res, waited
+
+async def _compile_in_slot(cpp_code: str, d: str, profile: str, stdin_str: str, limits: Limits, phases: dict):
+    if profile == "pgo":
+        # instrument + training run + rebuild, all inside one compile slot
+        return await asyncio.to_thread(sandbox._compile_pgo, cpp_code, d, stdin_str, limits, phases)
+    t0 = time.perf_counter()
+    # planning may build the PCH on first use, keep it off the event loop
+    plan, done = await asyncio.to_thread(sandbox._plan_compile, cpp_code, d, profile)
+    if done:
+        phases["compile"] = sandbox._ms(t0)
+        return done
+    _, err, rc = await _exec(plan.args, d)
+    if sandbox._needs_fallback(plan, cpp_code, rc, err):
+        _, err, rc = await _exec(plan.args, d)
+    phases["compile"] = sandbox._ms(t0)
+    return sandbox._finish_compile(plan, rc, err)
+
+# stdin_str may be a streams.StdinFile; stdout_path receives the full stdout
+async def run_python(code: str, stdin_str, limits: Limits = NO_LIMITS, stdout_path: str = None):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "main.py")
+        with open(path, "w") as f: f.write(textwrap.dedent(code))
+        return await _run_python_file(path, stdin_str, d, limits, stdout_path)
+
+async def _run_python_file(path: str, stdin_str, cwd: str, limits: Limits, stdout_path: str = None):
+    async with run_gate.slot() as waited:
+        res = await asyncio.to_thread(sandbox._run_python_file, path, stdin_str, cwd, limits, stdout_path)
+    return res, waited
+
+# also returns the build report: {"profile", "phases": {phase: ms}}
+async def run_cpp(cpp_code: str, stdin_str, limits: Limits = NO_LIMITS, profile: str = sandbox.DEFAULT_PROFILE,
+                  stdout_path: str = None):
+    build = {"profile": profile, "phases": {}}
+    with tempfile.TemporaryDirectory() as d:
+        (bin_path, err, rc), compile_wait = await _compile(cpp_code, d, profile, stdin_str, limits, build["phases"])
+        if rc != 0:
+            return ("", err, rc, False, sandbox._ce_usage(limits)), compile_wait, build
+        res, run_wait = await _run([bin_path], stdin_str, d, limits, stdout_path)
+        return res, compile_wait + run_wait, build
+
+# run_cpp for a Python program transpiled with loop counters (transpiler.profiling);
+# also returns the per-loop profile, which a TLE or crash doesn't lose
+async def run_profiled(py_code: str, stdin_str, limits: Limits = NO_LIMITS, profile: str = sandbox.DEFAULT_PROFILE):
+    loops = []
+    cpp_code, _ = transpile(py_code, loops=loops)
+    build = {"profile": profile, "phases": {}}
+    with tempfile.TemporaryDirectory() as d:
+        (bin_path, err, rc), compile_wait = await _compile(cpp_code, d, profile, stdin_str, limits, build["phases"])
+        if rc != 0:
+            return ("", err, rc, False, sandbox._ce_usage(limits)), compile_wait, build, None
+        # after the build: a PGO training run writes the same counters
+        path = profiling.prepare(d, loops)
+        res, run_wait = await _run([bin_path], stdin_str, d, limits)
+        prof = profiling.read(path, loops, time.monotonic_ns(), res[4]["wallMs"])
+        return res, compile_wait + run_wait, build, profiling.summary(prof)
+
+# cases: list of (stdin, expected or None). One build, then every case in its own
+# process; the compile takes a compile slot and each case a run slot, with at
+# most BATCH_WORKERS of this batch's cases waiting or running at a time.
+async def run_batch(lang: str, code: str, cases, limits: Limits = NO_LIMITS):
+    t0 = time.perf_counter()
+    workers = max(1, min(BATCH_WORKERS, run_gate.limit, len(cases)))
+    with tempfile.TemporaryDirectory() as d:
+        compile_ms = 0.0
+        if lang == "cpp":
+            (bin_path, err, rc), _ = await _compile(code, d, sandbox.DEFAULT_PROFILE, "", limits, {})
+            compile_ms = sandbox._ms(t0)
+            if rc != 0:
+                results = ce_results(err, rc, len(cases), sandbox._ce_usage(limits))
+                return results, summary(results, compile_ms, compile_ms, workers)
+            execute = lambda stdin_str: _run([bin_path], stdin_str, d, limits)
+        else:
+            path = os.path.join(d, "main.py")
+            with open(path, "w") as f: f.write(textwrap.dedent(code))
+            execute = lambda stdin_str: _run_python_file(path, stdin_str, d, limits)
+
+        results = [None] * len(cases)
+        todo = iter(range(len(cases)))
+        async def worker():
+            for i in todo:
+                stdin_str, expected = cases[i]
+                t1 = time.perf_counter()
+                res, waited = await execute(stdin_str)
+                results[i] = case_result(res, expected, (time.perf_counter() - t1 - waited) * 1000)
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    return results, summary(results, compile_ms, sandbox._ms(t0), workers)
+
+def _cpu_ms(use) -> float: return use["cpuUserMs"] + use["cpuSysMs"]
+
+# The C++ compile starts alongside the Python run, so the result is ready after
+# max(python, compile + run) rather than the sum. On one core the two still
+# share the CPU, but a compile spends much of its time in cc1plus I/O and the
+# Python run usually dominates anyway.
+async def run_both(py_code: str, cpp_code: str, stdin_str, limits: Limits = NO_LIMITS,
+                   profile: str = sandbox.DEFAULT_PROFILE, tol: float = None):
+    t0 = time.perf_counter()
+    (py_res, py_wait), (cc_res, cc_wait, build) = await asyncio.gather(
+        run_python(py_code, stdin_str, limits), run_cpp(cpp_code, stdin_str, limits, profile))
+    wall = sandbox._ms(t0)
+    py_use, cc_use = py_res[4], cc_res[4]
+    diff = diff_outputs(py_res[0], cc_res[0], FLOAT_TOL if tol is None else tol)
+    speedup = None
+    if py_use["verdict"] == cc_use["verdict"] == "OK":
+        # cpu time, so the overlap with the compile doesn't skew it
+        speedup = {"cpu": round(_cpu_ms(py_use) / max(_cpu_ms(cc_use), 0.001), 2),
+                   "wall": round(py_use["wallMs"] / max(cc_use["wallMs"], 0.001), 2)}
+    return {"python": (py_res, py_wait), "cpp": (cc_res, cc_wait, build), "diff": diff, "speedup": speedup, "wallMs": wall}
+
+# run_stress keeps its own compile and worker threads busy for the whole run,
+# so it's admitted as one unit through stress_gate
+async def run_stress(*args, **kwargs) -> dict:
+    async with stress_gate.slot():
+        return await asyncio.to_thread(stress.run_stress, *args, **kwargs)
+
+def stats() -> dict:
+    return {"compile": compile_gate.stats(), "run": run_gate.stats(), "stress": stress_gate.stats()}
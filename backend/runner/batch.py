@@ -0,0 +1,78 @@
+import os
+
+# cases of one batch in flight at once, each still taking a run slot
+# (async_sandbox.run_batch), so a big batch never floods the run queue
+BATCH_WORKERS = int(os.environ.get("PY2CPP_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+MAX_BATCH_CASES = int(os.environ.get("PY2CPP_MAX_BATCH_CASES", "500"))
+
+def normalize_output(s: str) -> str:
+    lines = [l.rstrip() for l in s.replace("\r\n", "\n").split("\n")]
+    while lines and not lines[-1]: lines.pop()
+    return "\n".join(lines)
+
+FLOAT_TOL = float(os.environ.get("PY2CPP_FLOAT_TOL", "1e-6"))
+MAX_DIFF_LINES = 50
+
+def _is_float(tok: str) -> bool:
+    # tokens that both sides print as plain integers must match exactly
+    try: float(tok)
+    except ValueError: return False
+    return any(c in tok for c in ".eEnN")
+
+def _tokens_match(a: str, b: str, tol: float) -> bool:
+    if a == b: return True
+    if not (_is_float(a) or _is_float(b)): return False
+    try: x, y = float(a), float(b)
+    except ValueError: return False
+    return abs(x - y) <= tol * max(1.0, abs(x), abs(y))
+
+def _lines_match(a: str, b: str, tol: float) -> bool:
+    if a == b: return True
+    ta, tb = a.split(), b.split()
+    return len(ta) == len(tb) and all(_tokens_match(x, y, tol) for x, y in zip(ta, tb))
+
+# Line diff of normalized outputs; numbers with a decimal point or exponent
+# compare within `tol` (absolute, or relative above 1), so 0.1 vs
+# 0.10000000000000001 or 1e+06 vs 1000000.0 count as equal.
+def diff_outputs(expected: str, actual: str, tol: float = FLOAT_TOL) -> dict:
+    a, b = normalize_output(expected).split("\n"), normalize_output(actual).split("\n")
+    diffs = []
+    for i in range(max(len(a), len(b))):
+        x, y = (a[i] if i < len(a) else None), (b[i] if i < len(b) else None)
+        if x is None or y is None or not _lines_match(x, y, tol):
+            diffs.append({"line": i + 1, "expected": x, "actual": y})
+    return {"match": not diffs, "mismatchedLines": len(diffs), "firstMismatch": diffs[0]["line"] if diffs else None,
+            "lines": diffs[:MAX_DIFF_LINES], "floatTol": tol}
+
+def _verdict(out, run_verdict, expected):
+    if run_verdict != "OK": return run_verdict
+    if expected is None: return "OK"
+    return "AC" if normalize_output(out) == normalize_output(expected) else "WA"
+
+def case_result(res, expected, time_ms: float) -> dict:
+    out, err, rc, timed_out, use = res
+    return {
+        "stdout": out, "stderr": err, "rc": rc, "timedOut": timed_out,
+        "verdict": _verdict(out, use["verdict"], expected), "timeMs": round(time_ms, 3), "usage": use,
+    }
+
+def ce_results(err: str, rc: int, n: int, use: dict) -> list:
+    return [{"stdout": "", "stderr": err, "rc": rc, "timedOut": False, "verdict": "CE", "timeMs": 0.0, "usage": use}
+            for _ in range(n)]
+
+def summary(results, compile_ms, wall_ms, workers: int):
+    verdicts = {}
+    for r in results: verdicts[r["verdict"]] = verdicts.get(r["verdict"], 0) + 1
+    times = [r["timeMs"] for r in results]
+    cpu = [r["usage"]["cpuUserMs"] + r["usage"]["cpuSysMs"] for r in results]
+    return {
+        "total": len(results),
+        "passed": sum(r["verdict"] in ("AC", "OK") for r in results),
+        "verdicts": verdicts,
+        "compileMs": compile_ms,
+        "maxTimeMs": max(times, default=0.0),
+        "maxCpuMs": round(max(cpu, default=0.0), 3),
+        "maxRssKb": max((r["usage"]["maxRssKb"] for r in results), default=0),
+        "wallMs": wall_ms,
+        "workers": workers,
+    }
@@ -0,0 +1,93 @@
+import hashlib, os, shutil, subprocess, threading, uuid
+from functools import lru_cache
+
+CACHE_DIR = os.environ.get("PY2CPP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "py2cpp", "bin"))
+CACHE_MAX_BYTES = int(os.environ.get("PY2CPP_CACHE_MAX_MB", "256")) * 1024 * 1024
+CACHE_ENABLED = os.environ.get("PY2CPP_CACHE", "1") != "0"
+
+@lru_cache(maxsize=None)
+def _version(path: str, mtime_ns: int) -> str:
+    try:
+        return subprocess.run([path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def compiler_identity(compiler: str) -> str:
+    # realpath + mtime + `--version`, so a toolchain upgrade behind the same name invalidates old artifacts
+    path = os.path.realpath(shutil.which(compiler) or compiler)
+    try: mtime = os.stat(path).st_mtime_ns
+    except OSError: mtime = 0
+    return f"{path}\n{mtime}\n{_version(path, mtime)}"
+
+# content-addressed store of compiled binaries, size-bounded LRU eviction by mtime
+class CompileCache:
+    def __init__(self, root: str, max_bytes: int, enabled: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = self.misses = self.stores = self.evictions = 0
+        self._lock = threading.Lock()
+
+    def key(self, source: str, compiler: str, flags) -> str:
+        h = hashlib.sha256()
+        for part in (compiler_identity(compiler), "\0".join(flags), source):
+            h.update(part.encode()); h.update(b"\0\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str: return os.path.join(self.root, key)
+
+    def fetch(self, key: str, dest: str) -> bool:
+        if not self.enabled: return False
+        src = self._path(key)
+        try:
+            os.utime(src)
+            try: os.link(src, dest)
+            except OSError: shutil.copy2(src, dest)
+        except OSError:
+            with self._lock: self.misses += 1
+            return False
+        with self._lock: self.hits += 1
+        return True
+
+    def store(self, key: str, bin_path: str):
+        if not self.enabled: return
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.tmp")
+            shutil.copy(bin_path, tmp)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return
+        with self._lock: self.stores += 1
+        self._evict()
+
+    def _evict(self):
+        try:
+            entries = []
+            for e in os.scandir(self.root):
+                if e.name.startswith("."): continue
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+            with self._lock: self.evictions += 1
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled, "dir": self.root, "maxBytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "stores": self.stores, "evictions": self.evictions,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+binary_cache = CompileCache(CACHE_DIR, CACHE_MAX_BYTES, CACHE_ENABLED)
@@ -0,0 +1,65 @@
+// Tiny exec shim used by runner/launcher.py.
+//   launch <wall_ms> <cpu_s|-> <mem_mb|-> <report_fd> <prog> [args...]
+// The program is forked from this (small) process rather than from the backend,
+// so its ru_maxrss does not start at the backend's RSS. Writes
+// "<wait status> <timed out> <utime> <stime> <maxrss>" to report_fd.
+#include <errno.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+static volatile sig_atomic_t g_child = 0, g_timed_out = 0;
+
+static void on_alarm(int) {
+    g_timed_out = 1;
+    if (g_child > 0) kill(g_child, SIGKILL);
+}
+
+int main(int argc, char** argv) {
+    if (argc < 6) { fprintf(stderr, "launch: bad arguments\n"); return 125; }
+    long wall_ms = atol(argv[1]);
+    int report = atoi(argv[4]);
+
+    pid_t pid = fork();
+    if (pid < 0) { perror("launch: fork"); return 125; }
+    if (pid == 0) {
+        close(report);
+        if (strcmp(argv[2], "-") != 0) {
+            rlim_t s = (rlim_t)atol(argv[2]);
+            struct rlimit rl = {s, s + 1};
+            setrlimit(RLIMIT_CPU, &rl);
+        }
+        if (strcmp(argv[3], "-") != 0) {
+            rlim_t b = (rlim_t)atol(argv[3]) * 1024 * 1024;
+            struct rlimit rl = {b, b};
+            setrlimit(RLIMIT_AS, &rl);
+        }
+        execvp(argv[5], argv + 5);
+        perror("launch: exec");
+        _exit(127);
+    }
+    g_child = pid;
+
+    struct sigaction sa;
+    memset(&sa, 0, sizeof sa);
+    sa.sa_handler = on_alarm;
+    sigaction(SIGALRM, &sa, nullptr);
+    struct itimerval it;
+    memset(&it, 0, sizeof it);
+    it.it_value.tv_sec = wall_ms / 1000;
+    it.it_value.tv_usec = (wall_ms % 1000) * 1000;
+    setitimer(ITIMER_REAL, &it, nullptr);
+
+    int status = 0;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0 && errno == EINTR) {}
+    dprintf(report, "%d %d %ld.%06ld %ld.%06ld %ld\n", status, (int)g_timed_out,
+            (long)ru.ru_utime.tv_sec, (long)ru.ru_utime.tv_usec,
+            (long)ru.ru_stime.tv_sec, (long)ru.ru_stime.tv_usec, (long)ru.ru_maxrss);
+    return 0;
+}
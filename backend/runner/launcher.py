@@ -0,0 +1,46 @@
+import hashlib, math, os, subprocess, threading, uuid
+
+from runner.compile_cache import compiler_identity
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launch.cc")
+LAUNCH_DIR = os.environ.get("PY2CPP_LAUNCH_DIR", os.path.join(os.path.expanduser("~"), ".cache", "py2cpp", "launch"))
+
+_lock = threading.Lock()
+_built = {}
+
+def _build(compiler: str):
+    with open(SOURCE) as f: src = f.read()
+    key = hashlib.sha256((compiler_identity(compiler) + "\0" + src).encode()).hexdigest()[:24]
+    path = os.path.join(LAUNCH_DIR, f"launch-{key}")
+    if os.access(path, os.X_OK): return path
+    os.makedirs(LAUNCH_DIR, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    comp = subprocess.run([compiler, "-x", "c++", "-O2", SOURCE, "-o", tmp],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if comp.returncode != 0:
+        try: os.remove(tmp)
+        except OSError: pass
+        return None
+    os.replace(tmp, path)
+    return path
+
+# Path to the compiled launch shim for `compiler`, or None if it can't be built
+# (callers then spawn directly and accept an inflated ru_maxrss).
+def get(compiler):
+    if not compiler: return None
+    k = compiler_identity(compiler)
+    with _lock:
+        if k not in _built:
+            try: _built[k] = _build(compiler)
+            except OSError: _built[k] = None
+        return _built[k]
+
+def argv(exe: str, cmd, wall_s: float, limits, report_fd: int):
+    cpu = "-" if limits.cpu is None else str(math.ceil(limits.cpu))
+    mem = "-" if limits.mem_mb is None else str(limits.mem_mb)
+    return [exe, str(int(wall_s * 1000)), cpu, mem, str(report_fd), *cmd]
+
+# "<status> <timed_out> <utime> <stime> <maxrss>" -> (rc, timed_out, utime, stime, maxrss)
+def parse_report(line: str):
+    status, timed_out, utime, stime, maxrss = line.split()
+    return os.waitstatus_to_exitcode(int(status)), timed_out == "1", float(utime), float(stime), int(maxrss)
@@ -0,0 +1,52 @@
+import math, os, resource, signal, sys
+from collections import namedtuple
+
+MAX_CPU_LIMIT = float(os.environ.get("PY2CPP_MAX_CPU_LIMIT", "10"))
+MAX_MEM_MB = int(os.environ.get("PY2CPP_MAX_MEM_MB", "2048"))
+
+# cpu in seconds, mem_mb in MiB; None means "not limited"
+Limits = namedtuple("Limits", "cpu mem_mb")
+NO_LIMITS = Limits(None, None)
+
+MLE_MARKERS = ("std::bad_alloc", "MemoryError", "Cannot allocate memory")
+
+def clamp(cpu=None, mem_mb=None) -> Limits:
+    if cpu is not None: cpu = min(max(float(cpu), 0.1), MAX_CPU_LIMIT)
+    if mem_mb is not None: mem_mb = min(max(int(mem_mb), 16), MAX_MEM_MB)
+    return Limits(cpu, mem_mb)
+
+def wall_timeout(limits: Limits, default: float) -> float:
+    return default if limits.cpu is None else max(default, limits.cpu + 1)
+
+def set_rlimits(limits: Limits):
+    if limits.cpu is not None:
+        soft = math.ceil(limits.cpu)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    if limits.mem_mb is not None:
+        b = limits.mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (b, b))
+
+def preexec(limits: Limits):
+    if limits.cpu is None and limits.mem_mb is None: return None
+    return lambda: set_rlimits(limits)
+
+def rss_kb(maxrss: int) -> int:
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+def verdict(rc: int, err: str, timed_out: bool, cpu_s: float, max_rss_kb: int, limits: Limits) -> str:
+    if timed_out or rc == -signal.SIGXCPU or (limits.cpu is not None and cpu_s > limits.cpu): return "TLE"
+    if limits.mem_mb is not None:
+        if max_rss_kb > limits.mem_mb * 1024: return "MLE"
+        if rc != 0 and any(m in err for m in MLE_MARKERS): return "MLE"
+    if rc != 0: return "RE"
+    return "OK"
+
+def usage(user_s: float, sys_s: float, wall_s: float, maxrss: int, rc: int, err: str, timed_out: bool, limits: Limits) -> dict:
+    kb = rss_kb(maxrss)
+    return {
+        "verdict": verdict(rc, err, timed_out, user_s + sys_s, kb, limits),
+        "cpuUserMs": round(user_s * 1000, 3), "cpuSysMs": round(sys_s * 1000, 3),
+        "wallMs": round(wall_s * 1000, 3), "maxRssKb": kb,
+        "cpuLimit": limits.cpu, "memLimitMb": limits.mem_mb,
+    }
@@ -0,0 +1,155 @@
+import math, os, threading, time
+
+METRICS_ENABLED = os.environ.get("PY2CPP_METRICS", "1") != "0"
+
+# seconds; wide enough for a PCH build or an LLM generation at the top end
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(v) -> str: return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _num(v) -> str:
+    if v == math.inf: return "+Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+# Minimal Prometheus text-format metrics: values keyed by label tuple, one lock
+# per metric. Label values are positional, in `labelnames` order.
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock: items = sorted(self._values.items())
+        for labels, v in items: yield from self._samples(labels, v)
+
+    def _samples(self, labels, v):
+        yield f"{self.name}{_labels(self.labelnames, labels)} {_num(v)}"
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock: self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self._lock: self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1): self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock: self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None: v = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    v[0][i] += 1
+                    break
+            v[1] += value; v[2] += 1
+
+    def _samples(self, labels, v):
+        counts, total, n = v
+        acc = 0
+        for b, c in zip(self.buckets, counts):
+            acc += c
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, (('le', _num(b)),))} {acc}"
+        yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(round(total, 6))}"
+        yield f"{self.name}_count{_labels(self.labelnames, labels)} {n}"
+
+class _Null:
+    # stands in for every metric when metrics are off
+    def inc(self, *a, **k): pass
+    def dec(self, *a, **k): pass
+    def set(self, *a, **k): pass
+    def observe(self, *a, **k): pass
+    def render(self): return iter(())
+
+class Registry:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._metrics = []
+
+    def _add(self, cls, *args, **kw):
+        if not self.enabled: return _Null()
+        m = cls(*args, **kw)
+        self._metrics.append(m)
+        return m
+
+    def counter(self, *args, **kw) -> Counter: return self._add(Counter, *args, **kw)
+    def gauge(self, *args, **kw) -> Gauge: return self._add(Gauge, *args, **kw)
+    def histogram(self, *args, **kw) -> Histogram: return self._add(Histogram, *args, **kw)
+
+    def render(self) -> str:
+        return "".join(line + "\n" for m in self._metrics for line in m.render())
+
+registry = Registry(METRICS_ENABLED)
+
+STAGE_SECONDS = registry.histogram("py2cpp_stage_seconds", "Latency of each pipeline stage.", ("stage",))
+STAGE_TOTAL = registry.counter("py2cpp_stage_total", "Completed stage executions by outcome (ok, error, timeout).",
+                               ("stage", "outcome"))
+STAGE_IN_FLIGHT = registry.gauge("py2cpp_stage_in_flight", "Stage executions currently running.", ("stage",))
+QUEUE_WAIT = registry.histogram("py2cpp_queue_wait_seconds", "Time spent waiting for a compile/run/stress slot.", ("gate",))
+QUEUE_WAITING = registry.gauge("py2cpp_queue_waiting", "Requests waiting for a compile/run/stress slot.", ("gate",))
+QUEUE_REJECTED = registry.counter("py2cpp_queue_rejected_total", "Requests rejected with a full queue.", ("gate",))
+LLM_TOKENS = registry.counter("py2cpp_llm_tokens_total", "Tokens generated by the model.", ("model",))
+LLM_TOKENS_PER_SECOND = registry.histogram("py2cpp_llm_tokens_per_second", "Generation speed per model call.",
+                                           ("model",), buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500))
+LLM_REPAIRS = registry.counter("py2cpp_llm_repairs_total", "Repair rounds after a failed compile.")
+LLM_REPAIR_ROUNDS = registry.histogram("py2cpp_llm_repair_rounds", "Repair rounds per uncached conversion.",
+                                       buckets=(0, 1, 2, 3, 5, 8))
+LLM_CONVERSIONS = registry.counter("py2cpp_llm_conversions_total", "AI conversions by outcome (ok, failed, cached).",
+                                   ("outcome",))
+
+class _Stage:
+    __slots__ = ("name", "outcome", "t0")
+
+    def __init__(self, name: str):
+        self.name, self.outcome = name, "ok"
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT.inc(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.t0, self.name)
+        STAGE_IN_FLIGHT.dec(self.name)
+        STAGE_TOTAL.inc(self.name, "error" if exc_type is not None else self.outcome)
+        return False
+
+class _NullStage:
+    outcome = "ok"
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def __setattr__(self, k, v): pass
+
+_NULL_STAGE = _NullStage()
+
+# with stage("compile") as st: ...; st.outcome = "error"
+# An exception escaping the block counts as "error".
+def stage(name: str):
+    return _Stage(name) if registry.enabled else _NULL_STAGE
+
+def run_outcome(verdict: str) -> str:
+    return "ok" if verdict == "OK" else "timeout" if verdict == "TLE" else "error"
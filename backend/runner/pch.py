@@ -0,0 +1,80 @@
+import hashlib, os, subprocess, threading, uuid
+
+from runner.compile_cache import compiler_identity
+
+PCH_DIR = os.environ.get("PY2CPP_PCH_DIR", os.path.join(os.path.expanduser("~"), ".cache", "py2cpp", "pch"))
+PCH_ENABLED = os.environ.get("PY2CPP_PCH", "1") != "0"
+
+GUARD = "PY2CPP_PCH_STDCXX_H"
+STDCXX_HEADER = f"#ifndef {GUARD}\n#define {GUARD}\n#include_next <bits/stdc++.h>\n#endif\n"
+PROBE = "#include <bits/stdc++.h>\nint main(){}\n"
+
+_lock = threading.Lock()
+_prepared = {}
+
+# Shadow <bits/stdc++.h> with a header in our own include dir, precompiled once per
+# (compiler identity, flags). If the toolchain has no bits/stdc++.h the shadow header
+# carries the fallback includes instead, so sources never need a failed compile + rewrite.
+class Prepared:
+    def __init__(self, flags, has_stdcxx: bool, ready: bool, err: str = ""):
+        self.flags = flags
+        self.has_stdcxx = has_stdcxx
+        self.ready = ready
+        self.err = err
+
+def _has_stdcxx(compiler: str, flags) -> bool:
+    r = subprocess.run([compiler, *flags, "-fsyntax-only", "-x", "c++", "-"], input=PROBE,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return r.returncode == 0
+
+def _build(compiler: str, is_clang: bool, flags, fallback_headers: str) -> Prepared:
+    key = hashlib.sha256((compiler_identity(compiler) + "\0" + "\0".join(flags)).encode()).hexdigest()[:24]
+    root = os.path.join(PCH_DIR, key)
+    hdr = os.path.join(root, "bits", "stdc++.h")
+    out = hdr + (".pch" if is_clang else ".gch")
+    use = ["-I", root] + (["-include-pch", out] if is_clang else [])
+
+    if os.path.exists(out) and os.path.exists(hdr):
+        with open(hdr) as f: has_stdcxx = "#include_next" in f.read()
+        return Prepared(use, has_stdcxx, True)
+
+    has_stdcxx = _has_stdcxx(compiler, flags)
+    body = STDCXX_HEADER if has_stdcxx else f"#ifndef {GUARD}\n#define {GUARD}\n{fallback_headers}#endif\n"
+    os.makedirs(os.path.dirname(hdr), exist_ok=True)
+    tmp_hdr = f"{hdr}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_hdr, "w") as f: f.write(body)
+    os.replace(tmp_hdr, hdr)
+
+    # the header is compiled without -I root so #include_next resolves to the system copy
+    tmp_out = f"{out}.{uuid.uuid4().hex}.tmp"
+    comp = subprocess.run([compiler, *flags, "-x", "c++-header", hdr, "-o", tmp_out],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=root)
+    if comp.returncode != 0:
+        try: os.remove(tmp_out)
+        except OSError: pass
+        # the shadow header still works as a plain include, just without the speedup
+        return Prepared(["-I", root], has_stdcxx, False, comp.stderr)
+    os.replace(tmp_out, out)
+    return Prepared(use, has_stdcxx, True)
+
+def prepare(compiler: str, is_clang: bool, flags, fallback_headers: str):
+    if not PCH_ENABLED: return None
+    k = (compiler_identity(compiler), tuple(flags))
+    with _lock:
+        if k not in _prepared:
+            try: _prepared[k] = _build(compiler, is_clang, flags, fallback_headers)
+            except OSError as e: _prepared[k] = Prepared([], True, False, str(e))
+        return _prepared[k]
+
+def status() -> dict:
+    with _lock:
+        return {
+            "enabled": PCH_ENABLED, "dir": PCH_DIR,
+            "entries": [
+                {"compiler": c.split("\n")[0], "flags": list(f), "ready": p.ready, "hasStdcxx": p.has_stdcxx, "error": p.err}
+                for (c, f), p in _prepared.items()
+            ],
+        }
+
+def reset():
+    with _lock: _prepared.clear()
@@ -0,0 +1,127 @@
+import json, os, queue, shutil, statistics, subprocess, sys, tempfile, threading, time
+
+from runner.limits import Limits, usage
+from runner.streams import Capture, SPILL_MAX, report, write_stdin
+
+ZYGOTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pyzygote.py")
+
+POOL_ENABLED = hasattr(os, "fork") and os.environ.get("PY2CPP_PY_POOL", "1") != "0"
+POOL_SIZE = int(os.environ.get("PY2CPP_PY_POOL_SIZE", "0")) or os.cpu_count() or 1
+RECYCLE_AFTER = int(os.environ.get("PY2CPP_PY_POOL_RECYCLE", "200"))
+
+class _Worker:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, ZYGOTE], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        self.jobs = 0
+
+    def submit(self, d: str, path: str, io: str, limits: Limits, timeout: float) -> dict:
+        # the zygote copies the child's stdout/stderr to files, keeping at most fsize bytes of each
+        job = {"dir": d, "path": path, "io": io, "timeout": timeout, "cpu": limits.cpu, "memMb": limits.mem_mb,
+               "fsize": SPILL_MAX}
+        self.proc.stdin.write(json.dumps(job) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line: raise RuntimeError("python worker exited")
+        self.jobs += 1
+        return json.loads(line)
+
+    def alive(self) -> bool: return self.proc.poll() is None
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+
+def _cold_start_ms(samples: int = 3) -> float:
+    times = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+# Pre-forked zygotes: each one already paid for interpreter startup and forks a
+# fresh child per job, so a job costs a fork instead of a full `python main.py`.
+class PythonPool:
+    def __init__(self, size: int, recycle_after: int):
+        self.size = size
+        self.recycle_after = recycle_after
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self.busy = self.jobs = self.recycled = 0
+        self.cold_start_ms = None
+        self.fork_ms_total = 0.0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started: return
+            self._started = True
+            self.cold_start_ms = _cold_start_ms()
+            for _ in range(self.size): self._idle.put(_Worker())
+
+    def run(self, d: str, path: str, stdin_str, limits: Limits, timeout: float, stdout_path: str = None):
+        # per-job io dir so concurrent jobs can share one working directory
+        io = tempfile.mkdtemp(prefix="io-", dir=d)
+        try:
+            return self._run(d, path, io, stdin_str, limits, timeout, stdout_path)
+        finally:
+            shutil.rmtree(io, ignore_errors=True)
+
+    def _run(self, d, path, io, stdin_str, limits, timeout, stdout_path):
+        write_stdin(stdin_str, os.path.join(io, "stdin.txt"))
+        self._ensure_started()
+        w = self._idle.get()
+        with self._lock: self.busy += 1
+        try:
+            t0 = time.perf_counter()
+            res = w.submit(d, path, io, limits, timeout)
+            wall = time.perf_counter() - t0
+        except (OSError, RuntimeError, ValueError):
+            # the zygote itself died; replace it and let the caller fall back to a cold run
+            w.close(); w = _Worker()
+            with self._lock: self.recycled += 1
+            raise
+        finally:
+            if w.jobs >= self.recycle_after or not w.alive():
+                w.close(); w = _Worker()
+                with self._lock: self.recycled += 1
+            self._idle.put(w)
+            with self._lock: self.busy -= 1
+
+        with self._lock:
+            self.jobs += 1
+            self.fork_ms_total += res["forkMs"]
+
+        out_cap = Capture(spill=stdout_path).drain_file(os.path.join(io, "stdout.txt"), res["stdoutBytes"])
+        err_cap = Capture().drain_file(os.path.join(io, "stderr.txt"), res["stderrBytes"])
+        out, err = out_cap.text(), err_cap.text()
+        use = report(usage(res["utime"], res["stime"], wall, res["maxrss"], res["rc"], err, res["timedOut"], limits),
+                     out_cap, err_cap)
+        if use["verdict"] == "TLE":
+            return "", "Time limit exceeded", -1, True, use
+        return out, err, res["rc"], False, use
+
+    def stats(self) -> dict:
+        with self._lock:
+            avg_fork = self.fork_ms_total / self.jobs if self.jobs else 0.0
+            return {
+                "enabled": POOL_ENABLED, "size": self.size, "busy": self.busy,
+                "utilization": self.busy / self.size if self.size else 0.0,
+                "jobs": self.jobs, "recycled": self.recycled, "recycleAfter": self.recycle_after,
+                "coldStartMs": self.cold_start_ms, "avgForkMs": avg_fork,
+                "savedMsPerJob": (self.cold_start_ms - avg_fork) if self.cold_start_ms is not None else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._started = False
+        while True:
+            try: self._idle.get_nowait().close()
+            except queue.Empty: break
+
+python_pool = PythonPool(POOL_SIZE, RECYCLE_AFTER)
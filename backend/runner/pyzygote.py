@@ -0,0 +1,122 @@
+# Forkserver for runner.pypool. Reads one JSON job per line on stdin, forks a
+# child per job and answers with one JSON line on stdout. User code only ever
+# runs in the forked child, so nothing it does survives into the next job.
+import json, math, os, resource, select, signal, sys, time, traceback, types
+
+# the same modules a typical CF solution imports; paid for once per zygote
+import collections, heapq, bisect, itertools, functools, string, re  # noqa: F401
+
+CHUNK = 1 << 16
+
+def _child(job, out_w, err_w):
+    d, path, io = job["dir"], job["path"], job["io"]
+    os.chdir(d)
+    f = os.open(os.path.join(io, "stdin.txt"), os.O_RDONLY)
+    os.dup2(f, 0); os.close(f)
+    os.dup2(out_w, 1); os.dup2(err_w, 2); os.close(out_w); os.close(err_w)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    sys.argv = [path]
+    sys.path[0] = d
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # mirrors runner.limits.set_rlimits; this script runs standalone and can't import it
+    if job.get("cpu") is not None:
+        soft = math.ceil(job["cpu"])
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    if job.get("memMb") is not None:
+        b = job["memMb"] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (b, b))
+    # files the program opens itself; stdout/stderr are pipes and never hit it
+    if job.get("fsize") is not None:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (job["fsize"], job["fsize"]))
+
+    main = types.ModuleType("__main__")
+    main.__file__ = path
+    sys.modules["__main__"] = main
+    rc = 0
+    try:
+        with open(path) as f: src = f.read()
+        exec(compile(src, path, "exec"), main.__dict__)
+    except SystemExit as e:
+        if e.code is None: rc = 0
+        elif isinstance(e.code, int): rc = e.code
+        else: print(e.code, file=sys.stderr); rc = 1
+    except BaseException as e:
+        # drop this frame so the traceback looks like a plain `python main.py`
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next); rc = 1
+    try:
+        sys.stdout.flush(); sys.stderr.flush()
+    except BaseException:
+        rc = rc or 120
+    os._exit(rc & 0xFF)
+
+# One output pipe copied to a file: the first `limit` bytes are kept, the rest
+# is counted and dropped, so a runaway printer never sees a write error (the
+# same as runner.streams.Capture on the subprocess path).
+class _Sink:
+    def __init__(self, path, limit):
+        self.f = open(path, "wb")
+        self.limit = limit
+        self.total = 0
+
+    def write(self, chunk):
+        if self.total < self.limit: self.f.write(chunk[:self.limit - self.total])
+        self.total += len(chunk)
+
+def _pump(sinks, wait):
+    # reads whatever the pipes have within `wait` seconds; drops a pipe at EOF
+    ready, _, _ = select.select(list(sinks), [], [], wait)
+    for fd in ready:
+        chunk = os.read(fd, CHUNK)
+        if chunk: sinks[fd].write(chunk)
+        else: os.close(fd); del sinks[fd]
+    return bool(ready)
+
+def _wait(pid, timeout, sinks):
+    deadline = time.monotonic() + timeout
+    delay = 0.0002
+    timed_out = False
+    while True:
+        done, status, ru = os.wait4(pid, os.WNOHANG)
+        if done:
+            # whatever is still buffered; a leftover grandchild holding the pipe open isn't waited for
+            while sinks and _pump(sinks, 0): pass
+            for fd in sinks: os.close(fd)
+            return os.waitstatus_to_exitcode(status), timed_out, ru
+        if time.monotonic() >= deadline and not timed_out:
+            os.kill(pid, signal.SIGKILL)
+            timed_out = True
+            delay = 0.0002
+        if not sinks: time.sleep(delay)
+        elif _pump(sinks, delay): delay = 0.0002
+        delay = min(delay * 2, 0.005)
+
+def main():
+    ctl_in = sys.stdin.buffer
+    ctl_out = sys.stdout
+    for line in ctl_in:
+        job = json.loads(line)
+        (out_r, out_w), (err_r, err_w) = os.pipe(), os.pipe()
+        t0 = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(out_r); os.close(err_r)
+                _child(job, out_w, err_w)
+            finally: os._exit(121)
+        fork_ms = (time.perf_counter() - t0) * 1000
+        os.close(out_w); os.close(err_w)
+        limit = job.get("fsize") or float("inf")
+        out, err = _Sink(os.path.join(job["io"], "stdout.txt"), limit), _Sink(os.path.join(job["io"], "stderr.txt"), limit)
+        try: rc, timed_out, ru = _wait(pid, job["timeout"], {out_r: out, err_r: err})
+        finally: out.f.close(); err.f.close()
+        ctl_out.write(json.dumps({
+            "rc": rc, "timedOut": timed_out, "forkMs": fork_ms,
+            "utime": ru.ru_utime, "stime": ru.ru_stime, "maxrss": ru.ru_maxrss,
+            "stdoutBytes": out.total, "stderrBytes": err.total,
+        }) + "\n")
+        ctl_out.flush()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
-import subprocess, tempfile, os, textwrap, sys, shutil, glob
+import subprocess, tempfile, os, textwrap, sys, shutil, glob, signal, threading, time, hashlib
+from collections import namedtuple
+
+from runner.compile_cache import binary_cache
+from runner import pch, launcher, metrics
+from runner.pypool import python_pool, POOL_ENABLED
+from runner.limits import Limits, NO_LIMITS, preexec, usage, wall_timeout
+from runner.streams import Capture, StdinFile, report, stdin_digest
 
 LIMIT_TIME = 2
 
+# Optimization profiles for /run/cpp. "pgo" builds instrumented, trains on the
+# request's stdin and rebuilds with the profile on top of the aggressive flags.
+PROFILES = {
+    "fast": ["-O0"],
+    "release": ["-O2"],
+    "aggressive": ["-O3", "-march=native", "-flto"],
+    "pgo": ["-O3", "-march=native"],
+}
+DEFAULT_PROFILE = os.environ.get("PY2CPP_BUILD_PROFILE", "release")
+
 FALLBACK_HEADERS = """#include <iostream>
 #include <vector>
 #include <string>
@@ -28,22 +45,129 @@ FALLBACK_HEADERS = """#include <iostream>
 using namespace std;
 """
 
-def _run(cmd, stdin_str, cwd):
+def _text(b: bytes) -> str: return b.decode("utf-8", "replace").replace("\r\n", "\n")
+
+def _open_stdin(src):
+    # a StdinFile goes to the child as its own fd; a string is fed through a pipe
+    return open(src.path, "rb") if isinstance(src, StdinFile) else subprocess.PIPE
+
+def _communicate(p, stdin_src, stdout_path=None):
+    # like Popen.communicate, but leaves reaping to the caller so rusage can be
+    # collected, and keeps only a capped head of each stream in memory
+    out, err = Capture(spill=stdout_path), Capture()
+    def pump(cap, stream):
+        cap.drain(stream); stream.close()
+    def feed():
+        try: p.stdin.write(stdin_src.encode())
+        except (BrokenPipeError, OSError): pass
+        try: p.stdin.close()
+        except (BrokenPipeError, OSError): pass
+    threads = [threading.Thread(target=pump, args=(err, p.stderr), daemon=True)]
+    if p.stdin is not None: threads.append(threading.Thread(target=feed, daemon=True))
+    for t in threads: t.start()
+    pump(out, p.stdout)
+    for t in threads: t.join()
+    return out, err
+
+# stdin_str may also be a StdinFile; with stdout_path the full stdout (up to
+# SPILL_MAX) is written there as well
+def _run(cmd, stdin_str, cwd, limits: Limits = NO_LIMITS, stdout_path: str = None):
+    # Python runs are timed in _run_python_file, which the pool path skips this for
+    if cmd[0] == sys.executable: return _run_shim(cmd, stdin_str, cwd, limits, stdout_path)
+    with metrics.stage("run_cpp") as st:
+        res = _run_shim(cmd, stdin_str, cwd, limits, stdout_path)
+        st.outcome = metrics.run_outcome(res[4]["verdict"])
+        return res
+
+def _run_shim(cmd, stdin_str, cwd, limits: Limits = NO_LIMITS, stdout_path: str = None):
+    exe = launcher.get(_find_compiler()[0])
+    if exe is None: return _run_direct(cmd, stdin_str, cwd, limits, stdout_path)
+    wall = wall_timeout(limits, LIMIT_TIME + 1)
+    r, w = os.pipe()
+    stdin = _open_stdin(stdin_str)
+    t0 = time.perf_counter()
+    try:
+        p = subprocess.Popen(
+            launcher.argv(exe, cmd, wall, limits, w), stdin=stdin, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, cwd=cwd, pass_fds=(w,), start_new_session=True,
+        )
+    finally:
+        os.close(w)
+        if stdin is not subprocess.PIPE: stdin.close()
+    # the shim enforces the wall limit itself; this only catches a wedged shim
+    timer = threading.Timer(wall + 1, lambda: _killpg(p.pid))
+    timer.start()
+    try:
+        out_cap, err_cap = _communicate(p, stdin_str, stdout_path)
+        p.wait()
+        with os.fdopen(r) as f: line = f.read()
+    finally:
+        timer.cancel()
+    elapsed = time.perf_counter() - t0
+    if not line:
+        use = usage(0.0, 0.0, elapsed, 0, -1, "", True, limits)
+        return "", "Time limit exceeded", -1, True, report(use, out_cap, err_cap)
+    rc, timed_out, utime, stime, maxrss = launcher.parse_report(line)
+    out, err = _text(out_cap.head), _text(err_cap.head)
+    use = report(usage(utime, stime, elapsed, maxrss, rc, err, timed_out, limits), out_cap, err_cap)
+    if use["verdict"] == "TLE":
+        return "", "Time limit exceeded", -1, True, use
+    return out, err, rc, False, use
+
+def _killpg(pid):
+    try: os.killpg(pid, signal.SIGKILL)
+    except OSError: pass
+
+# Spawns straight from the backend. ru_maxrss then includes the backend's RSS at
+# fork time, so this is only used when the launch shim can't be built.
+def _run_direct(cmd, stdin_str, cwd, limits: Limits = NO_LIMITS, stdout_path: str = None):
+    stdin = _open_stdin(stdin_str)
+    t0 = time.perf_counter()
     try:
         p = subprocess.Popen(
-            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            cwd=cwd, text=True,
+            cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=cwd, preexec_fn=preexec(limits),
         )
-        out, err = p.communicate(input=stdin_str, timeout=LIMIT_TIME + 1)
-        return out, err, p.returncode, False
-    except subprocess.TimeoutExpired:
-        return "", "Time limit exceeded", -1, True
+    finally:
+        if stdin is not subprocess.PIPE: stdin.close()
+    killed = threading.Event()
+    def kill():
+        killed.set(); p.kill()
+    timer = threading.Timer(wall_timeout(limits, LIMIT_TIME + 1), kill)
+    timer.start()
+    try:
+        out_cap, err_cap = _communicate(p, stdin_str, stdout_path)
+        _, status, ru = os.wait4(p.pid, 0)
+    finally:
+        timer.cancel()
+    p.returncode = rc = os.waitstatus_to_exitcode(status)
+    timed_out = killed.is_set() and rc == -signal.SIGKILL
+    out, err = _text(out_cap.head), _text(err_cap.head)
+    use = usage(ru.ru_utime, ru.ru_stime, time.perf_counter() - t0, ru.ru_maxrss, rc, err, timed_out, limits)
+    report(use, out_cap, err_cap)
+    if use["verdict"] == "TLE":
+        return "", "Time limit exceeded", -1, True, use
+    return out, err, rc, False, use
+
+def _ce_usage(limits: Limits) -> dict:
+    return {"verdict": "CE", "cpuUserMs": 0.0, "cpuSysMs": 0.0, "wallMs": 0.0, "maxRssKb": 0,
+            "cpuLimit": limits.cpu, "memLimitMb": limits.mem_mb}
 
-def run_python(code: str, stdin_str: str):
+def run_python(code: str, stdin_str, limits: Limits = NO_LIMITS):
     with tempfile.TemporaryDirectory() as d:
         path = os.path.join(d, "main.py")
         with open(path, "w") as f: f.write(textwrap.dedent(code))
-        return _run([sys.executable, path], stdin_str, d)
+        return _run_python_file(path, stdin_str, d, limits)
+
+def _run_python_file(path: str, stdin_str, d: str, limits: Limits = NO_LIMITS, stdout_path: str = None):
+    with metrics.stage("run_python") as st:
+        res = None
+        if POOL_ENABLED:
+            try: res = python_pool.run(d, path, stdin_str, limits, wall_timeout(limits, LIMIT_TIME + 1), stdout_path)
+            except (OSError, RuntimeError, ValueError): pass
+        if res is None: res = _run([sys.executable, path], stdin_str, d, limits, stdout_path)
+        st.outcome = metrics.run_outcome(res[4]["verdict"])
+        return res
 
 def _find_compiler():
     brew_gpp = sorted(
@@ -56,34 +180,143 @@ def _find_compiler():
         if shutil.which(c): return c, (c == "clang++")
     return None, None
 
-def _compile(cpp_code: str, d: str):
+def _flags(is_clang: bool, profile: str = DEFAULT_PROFILE):
+    flags = ["-std=gnu++17", *PROFILES[profile], "-pipe"]
+    if is_clang: flags.insert(0, "-stdlib=libc++")
+    return flags
+
+def _pgo_flags(is_clang: bool, phase: str, prof_dir: str):
+    # kept out of the PCH key: the header precompiled for the base flags stays valid
+    if phase == "instrument": return [f"-fprofile-generate={prof_dir}"]
+    if is_clang:
+        data = os.path.join(prof_dir, "default.profdata")
+        return [f"-fprofile-use={data}"] if os.path.exists(data) else []
+    return [f"-fprofile-use={prof_dir}", "-fprofile-correction", "-Wno-missing-profile"]
+
+def warm_pch():
+    compiler, is_clang = _find_compiler()
+    if compiler: pch.prepare(compiler, is_clang, _flags(is_clang), FALLBACK_HEADERS)
+
+# A compile is split into plan / fallback / finish so the sync path below and
+# runner.async_sandbox share the cache, PCH and bits/stdc++.h handling.
+CompilePlan = namedtuple("CompilePlan", "args cpp_path bin_path key")
+
+# pgo_phase is None, "instrument" (never cached: the binary writes into d) or
+# "optimize", whose binary is cached per training input via `salt`.
+def _plan_compile(cpp_code: str, d: str, profile: str = DEFAULT_PROFILE, pgo_phase: str = None, salt: str = ""):
     cpp_path = os.path.join(d, "main.cpp")
     bin_path = os.path.join(d, "a.out")
     with open(cpp_path, "w") as f: f.write(cpp_code)
 
     compiler, is_clang = _find_compiler()
     if not compiler:
-        return None, "No C++ compiler found. Install Xcode CLT or Homebrew GCC.", 127
+        return None, (None, "No C++ compiler found. Install Xcode CLT or Homebrew GCC.", 127)
 
-    args = [compiler, "-std=gnu++17", "-O2", "-pipe", cpp_path, "-o", bin_path]
-    if is_clang: args.insert(1, "-stdlib=libc++")
+    flags = _flags(is_clang, profile)
+    key = None
+    if pgo_phase != "instrument":
+        key = binary_cache.key(cpp_code, compiler, [*flags, f"pgo:{salt}"] if pgo_phase else flags)
+        if binary_cache.fetch(key, bin_path):
+            return None, (bin_path, "", 0)
 
-    comp = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
-    if comp.returncode != 0 and "bits/stdc++.h" in comp.stderr:
-        fixed = cpp_code.replace("#include <bits/stdc++.h>", FALLBACK_HEADERS)
-        with open(cpp_path, "w") as f: f.write(fixed)
-        comp = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
+    pre = pch.prepare(compiler, is_clang, flags, FALLBACK_HEADERS)
+    extra = _pgo_flags(is_clang, pgo_phase, os.path.join(d, "prof")) if pgo_phase else []
+    args = [compiler, *flags, *extra, *(pre.flags if pre else []), cpp_path, "-o", bin_path]
+    return CompilePlan(args, cpp_path, bin_path, key), None
+
+def _needs_fallback(plan: CompilePlan, cpp_code: str, rc: int, stderr: str) -> bool:
+    if rc == 0 or "bits/stdc++.h" not in stderr: return False
+    fixed = cpp_code.replace("#include <bits/stdc++.h>", FALLBACK_HEADERS)
+    with open(plan.cpp_path, "w") as f: f.write(fixed)
+    return True
+
+def _finish_compile(plan: CompilePlan, rc: int, stderr: str):
+    if rc != 0:
+        return None, stderr, rc
+    if plan.key: binary_cache.store(plan.key, plan.bin_path)
+    return plan.bin_path, stderr, 0
+
+def _ms(t0: float) -> float: return round((time.perf_counter() - t0) * 1000, 3)
 
-    return (bin_path if comp.returncode == 0 else None), comp.stderr, comp.returncode
+def _compile_once(cpp_code: str, d: str, profile: str, pgo_phase: str = None, salt: str = ""):
+    plan, done = _plan_compile(cpp_code, d, profile, pgo_phase, salt)
+    if done: return done
+    comp = subprocess.run(plan.args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
+    if _needs_fallback(plan, cpp_code, comp.returncode, comp.stderr):
+        comp = subprocess.run(plan.args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
+    return _finish_compile(plan, comp.returncode, comp.stderr)
+
+def _merge_profile(d: str) -> str:
+    # clang writes raw profiles that need llvm-profdata before -fprofile-use; gcc reads .gcda directly
+    if not _find_compiler()[1]: return ""
+    prof = os.path.join(d, "prof")
+    raw = glob.glob(os.path.join(prof, "*.profraw"))
+    tool = shutil.which("llvm-profdata")
+    if not raw or not tool: return "llvm-profdata unavailable, building without a profile"
+    r = subprocess.run([tool, "merge", "-o", os.path.join(prof, "default.profdata"), *raw],
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return r.stderr
+
+def _compile_pgo(cpp_code: str, d: str, stdin_str, limits: Limits, phases: dict):
+    salt = stdin_digest(stdin_str)
+    t0 = time.perf_counter()
+    plan, done = _plan_compile(cpp_code, d, "pgo", "optimize", salt)
+    if done:
+        phases["optimize"] = _ms(t0)
+        return done
+    bin_path, err, rc = _compile_once(cpp_code, d, "pgo", "instrument")
+    phases["instrument"] = _ms(t0)
+    if rc != 0: return bin_path, err, rc
+    # the training run gets the request's limits; a crash or TLE just leaves a partial profile
+    t0 = time.perf_counter()
+    _run([bin_path], stdin_str, d, limits)
+    merge_err = _merge_profile(d)
+    phases["train"] = _ms(t0)
+    t0 = time.perf_counter()
+    bin_path, err, rc = _compile_once(cpp_code, d, "pgo", "optimize", salt)
+    phases["optimize"] = _ms(t0)
+    return bin_path, (merge_err + "\n" + err).strip() if merge_err else err, rc
+
+# phases, when given, collects compile time per phase in ms: {"compile": ...} or,
+# for "pgo", {"instrument", "train", "optimize"} (just "optimize" on a cache hit)
+def _compile(cpp_code: str, d: str, profile: str = DEFAULT_PROFILE, stdin_str: str = "",
+             limits: Limits = NO_LIMITS, phases: dict = None):
+    phases = {} if phases is None else phases
+    with metrics.stage("compile") as st:
+        if profile == "pgo": res = _compile_pgo(cpp_code, d, stdin_str, limits, phases)
+        else:
+            t0 = time.perf_counter()
+            res = _compile_once(cpp_code, d, profile)
+            phases["compile"] = _ms(t0)
+        if res[2] != 0: st.outcome = "error"
+        return res
 
 def compile_cpp_only(cpp_code: str):
     with tempfile.TemporaryDirectory() as d:
         _, err, rc = _compile(cpp_code, d)
         return rc, err
 
-def run_cpp(cpp_code: str, stdin_str: str):
+def check_cpp_syntax(cpp_code: str):
+    # front end only (-fsyntax-only): catches everything but link errors, in a fraction of a full build
+    compiler, is_clang = _find_compiler()
+    if not compiler:
+        return 127, "No C++ compiler found. Install Xcode CLT or Homebrew GCC."
+    flags = _flags(is_clang)
+    pre = pch.prepare(compiler, is_clang, flags, FALLBACK_HEADERS)
+    with tempfile.TemporaryDirectory() as d, metrics.stage("syntax_check") as st:
+        cpp_path = os.path.join(d, "main.cpp")
+        with open(cpp_path, "w") as f: f.write(cpp_code)
+        args = [compiler, *flags, *(pre.flags if pre else []), "-fsyntax-only", cpp_path]
+        comp = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
+        if comp.returncode != 0 and "bits/stdc++.h" in comp.stderr:
+            with open(cpp_path, "w") as f: f.write(cpp_code.replace("#include <bits/stdc++.h>", FALLBACK_HEADERS))
+            comp = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=d)
+        if comp.returncode != 0: st.outcome = "error"
+        return comp.returncode, comp.stderr
+
+def run_cpp(cpp_code: str, stdin_str, limits: Limits = NO_LIMITS, profile: str = DEFAULT_PROFILE):
     with tempfile.TemporaryDirectory() as d:
-        bin_path, err, rc = _compile(cpp_code, d)
+        bin_path, err, rc = _compile(cpp_code, d, profile, stdin_str, limits)
         if rc != 0:
-            return "", err, rc, False
-        return _run([bin_path], stdin_str, d)
+            return "", err, rc, False, _ce_usage(limits)
+        return _run([bin_path], stdin_str, d, limits)
@@ -0,0 +1,66 @@
+import hashlib, os, shutil
+from collections import namedtuple
+
+# bytes of stdout/stderr kept per run for the response; the rest is counted and dropped
+OUTPUT_CAP = int(os.environ.get("PY2CPP_OUTPUT_CAP", str(4 << 20)))
+# most stdout written to disk when the full output is streamed back
+SPILL_MAX = int(os.environ.get("PY2CPP_OUTPUT_SPILL_MAX", str(256 << 20)))
+MAX_STDIN_BYTES = int(os.environ.get("PY2CPP_MAX_STDIN_BYTES", str(512 << 20)))
+CHUNK = 1 << 16
+
+# stdin that lives in a file (an upload); each run opens its own descriptor, so
+# concurrent runs of one input don't share a read offset
+StdinFile = namedtuple("StdinFile", "path")
+
+def stdin_size(src) -> int:
+    return os.path.getsize(src.path) if isinstance(src, StdinFile) else len(src.encode())
+
+def stdin_digest(src) -> str:
+    if not isinstance(src, StdinFile): return hashlib.sha256(src.encode()).hexdigest()
+    h = hashlib.sha256()
+    with open(src.path, "rb") as f:
+        while chunk := f.read(CHUNK): h.update(chunk)
+    return h.hexdigest()
+
+def write_stdin(src, path: str):
+    if isinstance(src, StdinFile): shutil.copyfile(src.path, path)
+    else:
+        with open(path, "w") as f: f.write(src)
+
+# One output stream read to EOF: the first `cap` bytes are kept, everything is
+# counted, and with `spill` the first SPILL_MAX bytes also go to that file.
+class Capture:
+    def __init__(self, cap: int = None, spill: str = None):
+        self.cap = OUTPUT_CAP if cap is None else cap
+        self.head = bytearray()
+        self.total = 0
+        self.spill = spill
+
+    def drain(self, stream):
+        out = open(self.spill, "wb") if self.spill else None
+        try:
+            while chunk := stream.read(CHUNK):
+                if len(self.head) < self.cap: self.head += chunk[:self.cap - len(self.head)]
+                if out is not None and self.total < SPILL_MAX: out.write(chunk[:SPILL_MAX - self.total])
+                self.total += len(chunk)
+        finally:
+            if out is not None: out.close()
+        return self
+
+    def drain_file(self, path: str, total: int = None):
+        # output the child already wrote to disk (the Python pool); `total` when
+        # the file only holds the first part of it
+        with open(path, "rb") as f:
+            self.head += f.read(self.cap)
+            self.total = os.fstat(f.fileno()).st_size if total is None else total
+        if self.spill: os.replace(path, self.spill)
+        return self
+
+    def text(self) -> str: return self.head.decode("utf-8", "replace")
+
+    @property
+    def truncated(self) -> bool: return self.total > len(self.head)
+
+def report(use: dict, out: Capture, err: Capture) -> dict:
+    use.update(stdoutBytes=out.total, stderrBytes=err.total, outputTruncated=out.truncated or err.truncated)
+    return use
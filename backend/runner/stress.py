@@ -0,0 +1,199 @@
+import itertools, json, os, subprocess, sys, tempfile, threading, time
+
+from runner import sandbox
+from runner.batch import normalize_output
+from runner.limits import Limits, NO_LIMITS, preexec
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stress_worker.py")
+STRESS_WORKERS = int(os.environ.get("PY2CPP_STRESS_WORKERS", "0")) or os.cpu_count() or 1
+MAX_CASES = int(os.environ.get("PY2CPP_STRESS_MAX_CASES", "100000"))
+MAX_SECONDS = float(os.environ.get("PY2CPP_STRESS_MAX_SECONDS", "60"))
+SHRINK_BUDGET = int(os.environ.get("PY2CPP_STRESS_SHRINK_STEPS", "400"))
+# wall time shrinking may take past what's left of max_seconds
+SHRINK_SECONDS = float(os.environ.get("PY2CPP_STRESS_SHRINK_SECONDS", "5"))
+# generated cases still run after the first failure, looking for a smaller one
+HUNT_CASES = int(os.environ.get("PY2CPP_STRESS_HUNT_CASES", "200"))
+
+class StressError(Exception):
+    pass
+
+# One warm interpreter (runner/stress_worker.py) holding the compiled generator
+# and reference; requests are serialized per worker.
+class RefWorker:
+    def __init__(self, gen_code: str, ref_code: str, timeout: float, limits: Limits):
+        self.dir = tempfile.TemporaryDirectory()
+        self.setup = {"gen": gen_code, "ref": ref_code, "timeout": timeout}
+        self.limits = Limits(None, limits.mem_mb)
+        self._start()
+
+    def _start(self):
+        self.p = subprocess.Popen([sys.executable, "-u", WORKER], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, cwd=self.dir.name, text=True,
+                                  preexec_fn=preexec(self.limits))
+        self._send(self.setup)
+
+    def _send(self, obj):
+        self.p.stdin.write(json.dumps(obj) + "\n"); self.p.stdin.flush()
+
+    def _call(self, obj) -> dict:
+        try:
+            self._send(obj)
+            line = self.p.stdout.readline()
+        except (BrokenPipeError, OSError):
+            line = ""
+        # the worker only dies on something like a memory limit hit by the
+        # reference: fail this request, and start over for the next one
+        if not line:
+            self.p.kill(); self.p.wait()
+            self._start()
+            raise StressError("reference interpreter exited")
+        return json.loads(line)
+
+    def case(self, seed: int) -> dict: return self._call({"op": "case", "seed": seed})
+    def reference(self, stdin_str: str) -> dict: return self._call({"op": "ref", "input": stdin_str})
+
+    def close(self):
+        try: self.p.kill(); self.p.wait()
+        except OSError: pass
+        self.dir.cleanup()
+
+def _verdict(expected: str, res) -> str:
+    # None when the C++ agrees with the reference
+    out, err, rc, timed_out, use = res
+    if use["verdict"] != "OK": return use["verdict"]
+    return None if normalize_output(out) == normalize_output(expected) else "WA"
+
+def _failure(kind, stdin_str, expected, res, **extra):
+    out, err, *_ = res
+    return {"kind": kind, "input": stdin_str, "expected": expected, "actual": out, "stderr": err[-2000:], **extra}
+
+# ---- shrinking, in two stages. First the loop keeps generating for a while
+# after the first failure and keeps the smallest failing input: that one is
+# valid by construction. Then delta debugging over lines, tokens and integer
+# values; a candidate is kept when the reference still runs cleanly on it and
+# the C++ fails the same way. The reference may not check every constraint
+# (say, that n matches the count of numbers), so that result is reported
+# separately as "shrunk" next to the generated failure. Both the step budget
+# and the deadline stop it, keeping the smallest input found so far.
+def _more(budget) -> bool:
+    # budget: [steps left, deadline or None]
+    return budget[0] > 0 and (budget[1] is None or time.perf_counter() < budget[1])
+
+def _ddmin(items, test, budget):
+    chunk = max(1, len(items) // 2)
+    while _more(budget):
+        i, removed = 0, False
+        while i < len(items) and _more(budget):
+            cand = items[:i] + items[i + chunk:]
+            budget[0] -= 1
+            if cand and test(cand): items, removed = cand, True
+            else: i += chunk
+        if chunk == 1 and not removed: break
+        if not removed: chunk = max(1, chunk // 2)
+    return items
+
+def _smaller_ints(v: int):
+    for c in (0, 1, v // 2, v - 1 if v > 0 else v + 1):
+        if abs(c) < abs(v): yield c
+
+def shrink(stdin_str: str, fails, budget: int = SHRINK_BUDGET, deadline: float = None):
+    left = [budget, deadline]
+    lines = _ddmin(stdin_str.split("\n"), lambda ls: fails("\n".join(ls)), left)
+    for i in range(len(lines)):
+        toks = lines[i].split(" ")
+        if len(toks) < 2: continue
+        rest = lambda ts: "\n".join(lines[:i] + [" ".join(ts)] + lines[i + 1:])
+        lines[i] = " ".join(_ddmin(toks, lambda ts: fails(rest(ts)), left))
+    for i in range(len(lines)):
+        toks = lines[i].split(" ")
+        for j, t in enumerate(toks):
+            while _more(left) and t.lstrip("-").isdigit():
+                for c in _smaller_ints(int(t)):
+                    left[0] -= 1
+                    cand = toks[:j] + [str(c)] + toks[j + 1:]
+                    if fails("\n".join(lines[:i] + [" ".join(cand)] + lines[i + 1:])):
+                        toks, t = cand, str(c)
+                        break
+                else: break
+        lines[i] = " ".join(toks)
+    return "\n".join(lines), budget - left[0]
+
+# Compiles once, then loops generator -> reference -> C++ on `workers` threads,
+# each owning a warm reference interpreter, until a failure (plus HUNT_CASES
+# more), max_cases or max_seconds. Reference and generator errors are counted
+# as skipped.
+def run_stress(py_code: str, cpp_code: str, gen_code: str, max_cases: int = 1000, max_seconds: float = 10.0,
+               limits: Limits = NO_LIMITS, workers: int = None, seed: int = 1, profile: str = sandbox.DEFAULT_PROFILE,
+               do_shrink: bool = True) -> dict:
+    max_cases, max_seconds = min(max_cases, MAX_CASES), min(max_seconds, MAX_SECONDS)
+    workers = max(1, min(workers or STRESS_WORKERS, STRESS_WORKERS))
+    ref_timeout = limits.cpu or sandbox.LIMIT_TIME
+    with tempfile.TemporaryDirectory() as d:
+        t0 = time.perf_counter()
+        bin_path, err, rc = sandbox._compile(cpp_code, d, profile)
+        compile_ms = sandbox._ms(t0)
+        if rc != 0: return {"status": "compile_error", "stderr": err, "compileMs": compile_ms}
+
+        seeds = itertools.count(seed)
+        lock, stop = threading.Lock(), threading.Event()
+        counts = {"cases": 0, "skipped": 0, "until": max_cases}
+        failures, errors = [], []
+        deadline = time.perf_counter() + max_seconds
+        pool = []
+
+        def loop(w: RefWorker):
+            try:
+                while not stop.is_set() and time.perf_counter() < deadline:
+                    with lock:
+                        if counts["cases"] + counts["skipped"] >= counts["until"]: return
+                        s = next(seeds)
+                    try: c = w.case(s)
+                    except StressError as e: c = {"error": str(e)}
+                    if c.get("genError") or c.get("error"):
+                        with lock:
+                            counts["skipped"] += 1
+                            if not errors: errors.append(c.get("genError") or c["error"])
+                        continue
+                    res = sandbox._run([bin_path], c["input"], d, limits)
+                    kind = _verdict(c["output"], res)
+                    with lock:
+                        counts["cases"] += 1
+                        if kind:
+                            if not failures and do_shrink:
+                                counts["until"] = min(counts["until"], counts["cases"] + counts["skipped"] + HUNT_CASES)
+                            elif not do_shrink: stop.set()
+                            failures.append(_failure(kind, c["input"], c["output"], res, seed=s))
+            except (OSError, ValueError) as e:
+                with lock: errors.append(str(e))
+                stop.set()
+
+        t0 = time.perf_counter()
+        try:
+            for _ in range(workers): pool.append(RefWorker(gen_code, py_code, ref_timeout, limits))
+            threads = [threading.Thread(target=loop, args=(w,), daemon=True) for w in pool]
+            for t in threads: t.start()
+            for t in threads: t.join()
+            elapsed = time.perf_counter() - t0
+            report = {"status": "failed" if failures else "passed", "cases": counts["cases"], "skipped": counts["skipped"],
+                      "casesPerSec": round(counts["cases"] / elapsed, 1) if elapsed > 0 else 0.0,
+                      "elapsedMs": round(elapsed * 1000, 3), "compileMs": compile_ms, "workers": workers}
+            if errors and not failures and not counts["cases"]:
+                report.update(status="error", error=errors[0])
+            if not failures: return report
+
+            fail = min(failures, key=lambda f: len(f["input"]))
+            report.update(failure=fail, failingCases=len(failures))
+            if do_shrink:
+                def fails(cand):
+                    try: r = pool[0].reference(cand)
+                    except StressError: return False
+                    if r.get("error"): return False
+                    return _verdict(r["output"], sandbox._run([bin_path], cand, d, limits)) == fail["kind"]
+                t1 = time.perf_counter()
+                small, steps = shrink(fail["input"], fails, deadline=max(deadline, t1) + SHRINK_SECONDS)
+                expected = pool[0].reference(small)["output"] if small != fail["input"] else fail["expected"]
+                fail["shrunk"] = _failure(fail["kind"], small, expected, sandbox._run([bin_path], small, d, limits),
+                                          steps=steps, ms=sandbox._ms(t1))
+            return report
+        finally:
+            for w in pool: w.close()
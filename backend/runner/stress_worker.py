@@ -0,0 +1,74 @@
+# Warm interpreter for stress runs: compiles the generator and the reference
+# once, then executes them in-process per case, so a case costs an exec()
+# instead of an interpreter start. Requests and replies are JSON lines on
+# copies of fds 0/1; during a case fds 0/1 point at scratch files so input(),
+# sys.stdin.buffer, open(0) and os.write(1, ...) all behave as in a real run.
+import builtins, io, json, os, random, signal, sys, time, traceback
+
+class _Timeout(BaseException):
+    # BaseException so a bare `except Exception` in user code can't swallow it
+    pass
+
+def _alarm(signum, frame): raise _Timeout()
+
+def _exec(code, argv, data: bytes, timeout: float, fin, fout):
+    fin.seek(0); fin.truncate(); fin.write(data); fin.flush(); fin.seek(0)
+    fout.seek(0); fout.truncate()
+    os.lseek(0, 0, os.SEEK_SET)
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False))
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), write_through=False)
+    sys.argv = argv
+    err = None
+    t0 = time.perf_counter()
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        exec(code, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        if e.code not in (None, 0): err = f"SystemExit: {e.code}"
+    except _Timeout:
+        err = "timeout"
+    except BaseException:
+        err = traceback.format_exc(limit=-3)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        try: sys.stdout.flush()
+        except Exception: pass
+    ms = (time.perf_counter() - t0) * 1000
+    os.lseek(1, 0, os.SEEK_SET)
+    out = b""
+    while chunk := os.read(1, 1 << 20): out += chunk
+    return out.decode("utf-8", "replace"), err, ms
+
+def main():
+    req = os.fdopen(os.dup(0), "r")
+    resp = os.fdopen(os.dup(1), "w")
+    fin = open("stdin.txt", "w+b")
+    fout = open("stdout.txt", "w+b")
+    os.dup2(fin.fileno(), 0)
+    os.dup2(fout.fileno(), 1)
+    signal.signal(signal.SIGALRM, _alarm)
+
+    setup = json.loads(req.readline())
+    gen = compile(setup["gen"], "<generator>", "exec") if setup.get("gen") else None
+    ref = compile(setup["ref"], "<reference>", "exec")
+    timeout = setup["timeout"]
+    real_stdin, real_stdout = sys.stdin, sys.stdout
+    for line in req:
+        job = json.loads(line)
+        r = {}
+        if job["op"] == "case":
+            # a case is generator(seed) then reference(input)
+            random.seed(job["seed"])
+            data, err, _ = _exec(gen, ["gen", str(job["seed"])], b"", timeout, fin, fout)
+            r["input"] = data
+            if err: r["genError"] = err
+        else:
+            data = job["input"]
+        if "genError" not in r:
+            random.seed(0)
+            r["output"], r["error"], r["ms"] = _exec(ref, ["main.py"], data.encode(), timeout, fin, fout)
+        sys.stdin, sys.stdout = real_stdin, real_stdout
+        resp.write(json.dumps(r) + "\n"); resp.flush()
+
+if __name__ == "__main__":
+    main()
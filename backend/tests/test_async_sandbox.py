@@ -0,0 +1,88 @@
+import asyncio, threading
+import pytest
+
+from runner import async_sandbox
+from runner.async_sandbox import Gate, QueueFull, run_python, run_both, run_profiled
+from runner.limits import Limits
+from runner.sandbox import _find_compiler
+
+needs_cxx = pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
+
+def test_run_python_async():
+    (out, err, rc, timed_out, use), waited = asyncio.run(run_python("print(int(input()) * 3)", "7\n"))
+    assert (out, rc, timed_out, use["verdict"]) == ("21\n", 0, False, "OK")
+    assert waited >= 0
+
+def test_gate_rejects_when_queue_full():
+    async def main():
+        gate = Gate("run", 1, 1)
+        release = asyncio.Event()
+        async def hold():
+            async with gate.slot(): await release.wait()
+        holder = asyncio.create_task(hold())
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert (gate.active, gate.waiting) == (1, 1)
+        with pytest.raises(QueueFull):
+            async with gate.slot(): pass
+        release.set()
+        await asyncio.gather(holder, queued)
+        assert gate.stats()["rejected"] == 1
+    asyncio.run(main())
+
+@needs_cxx
+def test_run_both_diffs_outputs():
+    py = "n = int(input())\nprint(n / 3)\nprint(n)\n"
+    cpp = '#include <bits/stdc++.h>\nint main(){ int n; std::cin >> n; printf("%.9f\\n%d\\n", n / 3.0, n + 1); }\n'
+    r = asyncio.run(run_both(py, cpp, "2\n"))
+    (py_res, _), (cc_res, _, build) = r["python"], r["cpp"]
+    assert py_res[0] == "0.6666666666666666\n2\n" and cc_res[0] == "0.666666667\n3\n"
+    assert r["diff"]["lines"] == [{"line": 2, "expected": "2", "actual": "3"}]
+    assert r["speedup"]["cpu"] > 0 and "compile" in build["phases"]
+
+LOOPS_PY = """def work(n):
+    s = 0
+    for i in range(n):
+        s += i % 7
+    return s
+
+n = int(input())
+t = 0
+for a in range(n):
+    for b in range(n):
+        t += a ^ b
+print(t + work(n))
+"""
+
+@needs_cxx
+def test_run_profiled_maps_loops_to_python_lines():
+    (out, *_, use), _, build, prof = asyncio.run(run_profiled(LOOPS_PY, "300\n"))
+    assert use["verdict"] == "OK" and out.strip().isdigit()
+    by_line = {p["line"]: p for p in prof["loops"]}
+    assert sorted(by_line) == [3, 9, 10]
+    assert (by_line[3]["hits"], by_line[3]["entries"], by_line[3]["function"]) == (300, 1, "work")
+    assert (by_line[9]["hits"], by_line[10]["hits"], by_line[10]["entries"]) == (300, 90000, 300)
+    assert by_line[9]["selfMs"] <= by_line[9]["ms"] and prof["hottestLine"] in by_line
+
+@needs_cxx
+def test_run_profiled_keeps_counters_on_tle():
+    (*_, use), _, _, prof = asyncio.run(run_profiled(LOOPS_PY, "1000000\n", Limits(0.5, None)))
+    assert use["verdict"] == "TLE"
+    inner = next(p for p in prof["loops"] if p["line"] == 10)
+    assert inner["running"] and inner["hits"] > 0 and prof["hottestLine"] == 10
+
+def test_stress_beyond_its_slots_is_refused(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    def slow(*args, **kwargs):
+        started.set(); release.wait(5)
+        return {"status": "passed"}
+    monkeypatch.setattr(async_sandbox.stress, "run_stress", slow)
+    monkeypatch.setattr(async_sandbox, "stress_gate", Gate("stress", 1, 0))
+    async def main():
+        first = asyncio.create_task(async_sandbox.run_stress("py", "cpp", "gen"))
+        await asyncio.to_thread(started.wait, 5)
+        with pytest.raises(QueueFull):
+            await async_sandbox.run_stress("py", "cpp", "gen")
+        release.set()
+        assert (await first)["status"] == "passed"
+    asyncio.run(main())
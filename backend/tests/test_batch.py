@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+
+from runner.async_sandbox import compile_gate, run_gate, run_batch
+from runner.batch import normalize_output, diff_outputs
+from runner.sandbox import _find_compiler
+
+needs_cxx = pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
+
+def test_normalize_output():
+    assert normalize_output("1 2  \r\n3\n\n") == "1 2\n3"
+
+def test_diff_outputs_float_tolerance():
+    assert diff_outputs("0.1 3\n1e+06\n", "0.10000000000000001 3  \n1000000.0")["match"]
+    d = diff_outputs("0.5\n2\n", "0.5001\n2.0\nextra\n")
+    assert [l["line"] for l in d["lines"]] == [1, 3] and d["firstMismatch"] == 1
+    # plain integers never get the tolerance
+    assert not diff_outputs("1000000000", "1000000001", tol=1e-6)["match"]
+
+def test_batch_python_verdicts():
+    code = "a, b = map(int, input().split())\nprint(a + b)\n"
+    results, summary = asyncio.run(run_batch("python", code, [("1 2", "3\n"), ("2 2", "5"), ("x", None), ("4 4", None)]))
+    assert [r["verdict"] for r in results] == ["AC", "WA", "RE", "OK"]
+    assert summary["total"] == 4 and summary["passed"] == 2
+    assert summary["verdicts"] == {"AC": 1, "WA": 1, "RE": 1, "OK": 1}
+
+@needs_cxx
+def test_batch_cpp_takes_gate_slots(monkeypatch):
+    slots = []
+    for gate in (compile_gate, run_gate):
+        monkeypatch.setattr(gate, "slot", lambda g=gate, slot=gate.slot: (slots.append(g.name), slot())[1])
+    cpp = "#include <cstdio>\nint main(){ long long a, b; scanf(\"%lld %lld\", &a, &b); printf(\"%lld\\n\", a * b); }\n"
+    results, summary = asyncio.run(run_batch("cpp", cpp, [("2 3", "6"), ("4 5", "21"), ("7 7", None)]))
+    assert [r["verdict"] for r in results] == ["AC", "WA", "OK"]
+    assert sorted(slots) == ["compile", "run", "run", "run"] and summary["workers"] <= run_gate.limit
@@ -0,0 +1,33 @@
+import pytest
+
+from bench.run import bench_program, compare
+from bench.programs import PROGRAMS, stdin_for
+from runner.sandbox import _find_compiler
+
+needs_cxx = pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
+
+def _result(status="ok", compile_ms=500.0, cpp_ms=100.0):
+    return {"programs": {"p": {"status": status, "transpileMs": 2.0, "compileMs": compile_ms, "sizes": {
+        "1000": {"python": {"cpuMs": 900.0, "maxRssKb": 9000}, "cpp": {"cpuMs": cpp_ms, "maxRssKb": 3000}}}}}}
+
+def test_compare_flags_regressions_over_noise_floor():
+    base = _result()
+    r = compare(_result(cpp_ms=200.0, compile_ms=510.0), base)
+    assert [(e["metric"], e["size"]) for e in r["regressions"]] == [("cpp.cpuMs", 1000)]
+    # within the absolute floor: not a change even though the ratio is large
+    assert compare(_result(cpp_ms=120.0), _result(cpp_ms=95.0))["regressions"] == []
+    r = compare(_result(status="compile_error"), base)
+    assert r["regressions"][0]["metric"] == "status"
+    assert compare(base, _result(status="mismatch"))["improvements"][0]["current"] == "ok"
+
+def test_inputs_are_deterministic():
+    p = PROGRAMS[0]
+    assert stdin_for(p, 100) == stdin_for(p, 100) != stdin_for(p, 100, seed=2)
+
+@needs_cxx
+def test_bench_program_smoke():
+    p = next(p for p in PROGRAMS if p.name == "lis")
+    r = bench_program(p, (200,), 1, "release")
+    assert r["status"] == "ok" and r["compileMs"] > 0
+    row = r["sizes"]["200"]
+    assert row["match"] and row["cpp"]["verdict"] == "OK" and row["speedup"] > 0
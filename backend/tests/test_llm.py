@@ -0,0 +1,63 @@
+import pytest
+
+from ai import llm
+from ai.cache import ConversionCache, conversion_key
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    c = ConversionCache(str(tmp_path / "ai.sqlite3"), 2, 3600)
+    monkeypatch.setattr(llm, "conversion_cache", c)
+    return c
+
+def test_convert_events_repairs_until_compile(monkeypatch):
+    replies = iter(["```cpp\nbad\n```", "```cpp\ngood\n```"])
+    monkeypatch.setattr(llm, "_ollama_stream", lambda model, prompt, system: iter(next(replies)))
+    monkeypatch.setattr(llm, "compile_cpp_only", lambda cpp: (0, "") if cpp == "good" else (1, "error: bad"))
+    events = list(llm.ai_convert_events("print(1)"))
+    kinds = [e["type"] for e in events if e["type"] != "token"]
+    assert kinds == ["compiling", "compile_failed", "repair", "compiling", "done"]
+    assert events[-1] == {"type": "done", "cpp": "good", "ok": True, "attempts": 2, "cached": False}
+
+def test_convert_cache_ignores_layout(monkeypatch, cache):
+    calls = []
+    def stream(model, prompt, system):
+        calls.append(prompt); return iter("```cpp\nok\n```")
+    monkeypatch.setattr(llm, "_ollama_stream", stream)
+    monkeypatch.setattr(llm, "compile_cpp_only", lambda cpp: (0, ""))
+    assert llm.ai_convert_to_cpp("x = 1\nprint(x)\n") == "ok"
+    assert llm.ai_convert_to_cpp("x=1   # one\n\nprint( x )") == "ok"
+    assert len(calls) == 1 and cache.stats()["hits"] == 1
+    llm.ai_convert_to_cpp("x=1\nprint(x)", use_cache=False)
+    assert len(calls) == 2
+
+def test_conversion_cache_lru_and_ttl(tmp_path):
+    c = ConversionCache(str(tmp_path / "c.sqlite3"), 2, 3600)
+    k = lambda src: conversion_key(src, "m", "sys", {})
+    c.put(k("a=1"), "A"); c.put(k("b=1"), "B")
+    assert c.get(k("a=1")) == "A"
+    c.put(k("c=1"), "C")
+    assert c.get(k("b=1")) is None and c.get(k("a=1")) == "A"
+    c.ttl = -1
+    assert c.get(k("c=1")) is None
+    assert c.stats()["evictions"] == 2
+
+def test_race_prefers_candidate_matching_python(monkeypatch):
+    by_temp = {0.15: "bad", 0.4: "wrong", 0.65: "right"}
+    monkeypatch.setattr(llm, "_ollama_stream", lambda m, p, s, opts, cancel: iter(f"```cpp\n{by_temp[opts['temperature']]}\n```"))
+    monkeypatch.setattr(llm, "check_cpp_syntax", lambda cpp: (1, "error") if cpp == "bad" else (0, ""))
+    monkeypatch.setattr(llm, "run_cpp", lambda cpp, stdin: ("6\n" if cpp == "right" else "7\n", "", 0, False, {"verdict": "OK"}))
+    events = list(llm.ai_convert_events("print(int(input()) * 2)", candidates=3, sample_stdin="3"))
+    done = events[-1]
+    assert (done["cpp"], done["ok"], done["matched"]) == ("right", True, True)
+    assert all(e["type"] == "candidate" for e in events[:-1])
+
+def test_race_winner_is_linked_before_caching(monkeypatch, cache):
+    # raced candidates pass the syntax check but don't link; the repair does
+    monkeypatch.setattr(llm, "_ollama_stream", lambda *a: iter("```cpp\nno_main\n```" if len(a) > 3 else "```cpp\nfixed\n```"))
+    monkeypatch.setattr(llm, "check_cpp_syntax", lambda cpp: (0, ""))
+    monkeypatch.setattr(llm, "compile_cpp_only", lambda cpp: (0, "") if cpp == "fixed" else (1, "undefined reference to `main'"))
+    events = list(llm.ai_convert_events("print(1)", candidates=2))
+    kinds = [e["type"] for e in events if e["type"] not in ("token", "candidate")]
+    assert kinds == ["compiling", "compile_failed", "repair", "compiling", "done"]
+    assert (events[-1]["cpp"], events[-1]["ok"]) == ("fixed", True)
+    assert llm.ai_convert_to_cpp("print(1)") == "fixed" and cache.stats()["hits"] == 1
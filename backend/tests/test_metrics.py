@@ -0,0 +1,34 @@
+import pytest
+
+from runner import metrics, sandbox
+from runner.metrics import Registry
+
+def test_render_prometheus_text():
+    r = Registry(True)
+    c = r.counter("x_total", "X.", ("stage", "outcome"))
+    h = r.histogram("x_seconds", "X time.", ("stage",), buckets=(0.1, 1))
+    c.inc("compile", "ok"); c.inc("compile", "ok"); c.inc("run", 'a"b')
+    h.observe(0.05, "compile"); h.observe(0.5, "compile"); h.observe(5, "compile")
+    lines = r.render().splitlines()
+    assert lines[:2] == ["# HELP x_total X.", "# TYPE x_total counter"]
+    assert 'x_total{stage="compile",outcome="ok"} 2' in lines and 'x_total{stage="run",outcome="a\\"b"} 1' in lines
+    assert [l for l in lines if l.startswith("x_seconds_bucket")] == [
+        'x_seconds_bucket{stage="compile",le="0.1"} 1', 'x_seconds_bucket{stage="compile",le="1"} 2',
+        'x_seconds_bucket{stage="compile",le="+Inf"} 3']
+    assert 'x_seconds_count{stage="compile"} 3' in lines and 'x_seconds_sum{stage="compile"} 5.55' in lines
+
+def test_disabled_registry_is_noop():
+    r = Registry(False)
+    r.counter("a_total", "A.").inc(); r.histogram("b", "B.").observe(1); r.gauge("c", "C.").set(3)
+    assert r.render() == ""
+
+@pytest.mark.skipif(not metrics.METRICS_ENABLED, reason="metrics disabled")
+def test_stage_outcomes_from_run_verdicts():
+    count = lambda outcome: metrics.STAGE_TOTAL._values.get(("run_python", outcome), 0)
+    ok, err = count("ok"), count("error")
+    sandbox.run_python("print(1)", "")
+    sandbox.run_python("raise SystemExit(3)", "")
+    assert (count("ok"), count("error")) == (ok + 1, err + 1)
+    with pytest.raises(ValueError):
+        with metrics.stage("t") as st: raise ValueError()
+    assert metrics.STAGE_TOTAL._values[("t", "error")] == 1 and metrics.STAGE_IN_FLIGHT._values[("t",)] == 0
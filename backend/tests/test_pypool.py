@@ -0,0 +1,49 @@
+import pytest
+
+from runner import pypool, streams
+from runner.pypool import PythonPool, POOL_ENABLED
+from runner.limits import Limits, NO_LIMITS
+from runner.sandbox import _find_compiler, run_cpp
+
+pytestmark = pytest.mark.skipif(not POOL_ENABLED, reason="needs os.fork")
+
+@pytest.fixture
+def pool():
+    p = PythonPool(1, recycle_after=2)
+    yield p
+    p.shutdown()
+
+def _run(pool, tmp_path, code, stdin="", timeout=3, limits=NO_LIMITS):
+    path = tmp_path / "main.py"; path.write_text(code)
+    return pool.run(str(tmp_path), str(path), stdin, limits, timeout)[:4]
+
+def test_pool_runs_and_isolates_jobs(pool, tmp_path):
+    assert _run(pool, tmp_path, "import sys\nsys.leak = 1\nprint(input()[::-1])", "abc\n") == ("cba\n", "", 0, False)
+    assert _run(pool, tmp_path, "import sys\nprint(hasattr(sys, 'leak'), __name__)")[0] == "False __main__\n"
+    out, err, rc, _ = _run(pool, tmp_path, "raise ValueError('boom')")
+    assert rc == 1 and "ValueError: boom" in err
+    assert _run(pool, tmp_path, "import sys\nsys.exit(3)")[2] == 3
+    assert _run(pool, tmp_path, "while True: pass", timeout=0.2) == ("", "Time limit exceeded", -1, True)
+    st = pool.stats()
+    assert st["jobs"] == 5 and st["recycled"] >= 2 and st["busy"] == 0
+
+def test_pool_enforces_memory_limit(pool, tmp_path):
+    path = tmp_path / "main.py"; path.write_text("a = bytearray(512 * 1024 * 1024)")
+    *_, use = pool.run(str(tmp_path), str(path), "", Limits(None, 128), 3)
+    assert use["verdict"] == "MLE" and use["maxRssKb"] > 0
+
+@pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
+def test_runaway_output_is_cut_off_like_cpp(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(pypool, "SPILL_MAX", 1 << 20)
+    monkeypatch.setattr(streams, "OUTPUT_CAP", 1 << 16)
+    path = tmp_path / "main.py"; path.write_text("for _ in range(3000): print('x' * 999)")
+    out, err, rc, timed_out, use = pool.run(str(tmp_path), str(path), "", NO_LIMITS, 5)
+    assert (rc, timed_out, use["verdict"], err) == (0, False, "OK", "")
+    assert use["outputTruncated"] and use["stdoutBytes"] == 3000 * 1000 and len(out) == 1 << 16
+    cpp = '#include <cstdio>\nint main(){ for(int i = 0; i < 3000; i++){ for(int j = 0; j < 999; j++) putchar(120); putchar(10); } }\n'
+    c_out, _, c_rc, _, c_use = run_cpp(cpp, "")
+    assert (c_rc, c_use["verdict"], c_use["outputTruncated"], c_use["stdoutBytes"], c_out) == (rc, "OK", True, 3000 * 1000, out)
+    # printing forever is a TLE, not an OSError from a file size limit
+    path.write_text("while True: print('x' * 1000)")
+    *_, timed_out, use = pool.run(str(tmp_path), str(path), "", NO_LIMITS, 0.5)
+    assert timed_out and use["verdict"] == "TLE" and use["outputTruncated"]
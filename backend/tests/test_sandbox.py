@@ -0,0 +1,95 @@
+import os, sys, tempfile
+import pytest
+
+from runner import sandbox, pch
+from runner.compile_cache import CompileCache
+from runner.limits import Limits
+from runner import streams
+
+needs_cxx = pytest.mark.skipif(sandbox._find_compiler()[0] is None, reason="no C++ compiler")
+
+HELLO = '#include <bits/stdc++.h>\nusing namespace std;\nint main(){ long long a,b; cin>>a>>b; cout<<a+b<<"\\n"; }\n'
+
+@needs_cxx
+def test_compile_cache_hit(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path / "bin"), 1 << 30)
+    monkeypatch.setattr(sandbox, "binary_cache", cache)
+    monkeypatch.setattr(pch, "PCH_ENABLED", False)
+    assert sandbox.run_cpp(HELLO, "1 2")[0].strip() == "3"
+    assert sandbox.run_cpp(HELLO, "40 2")[0].strip() == "42"
+    st = cache.stats()
+    assert (st["hits"], st["misses"], st["stores"]) == (1, 1, 1)
+
+def test_compile_cache_evicts_lru(tmp_path):
+    cache = CompileCache(str(tmp_path / "bin"), 10)
+    src = tmp_path / "a.out"; src.write_bytes(b"x" * 8)
+    cache.store("old", str(src)); os.utime(tmp_path / "bin" / "old", (1, 1))
+    cache.store("new", str(src))
+    assert not cache.fetch("old", str(tmp_path / "o"))
+    assert cache.fetch("new", str(tmp_path / "n"))
+    assert cache.stats()["evictions"] == 1
+
+@needs_cxx
+def test_pch_shadow_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(sandbox, "binary_cache", CompileCache(str(tmp_path / "bin"), 1 << 30, enabled=False))
+    monkeypatch.setattr(pch, "PCH_DIR", str(tmp_path / "pch"))
+    pch.reset()
+    try:
+        assert sandbox.run_cpp(HELLO, "2 3")[0].strip() == "5"
+        (entry,) = pch.status()["entries"]
+        assert entry["ready"], entry["error"]
+    finally:
+        pch.reset()
+
+def test_run_reports_usage_and_cpu_tle(tmp_path):
+    out, err, rc, timed_out, use = sandbox._run([sys.executable, "-c", "print(sum(range(10**5)))"], "", str(tmp_path))
+    assert out.strip() == str(sum(range(10**5))) and use["verdict"] == "OK"
+    assert use["maxRssKb"] > 0 and use["cpuUserMs"] + use["cpuSysMs"] > 0
+    *_, use = sandbox._run([sys.executable, "-c", "while True: pass"], "", str(tmp_path), Limits(0.5, None))
+    assert use["verdict"] == "TLE" and use["cpuUserMs"] >= 500
+
+def test_run_stdin_file_and_output_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(streams, "OUTPUT_CAP", 1000)
+    src = streams.StdinFile(str(tmp_path / "in.txt"))
+    with open(src.path, "w") as f: f.write("".join(f"{i}\n" for i in range(100000)))
+    code = "import sys\nfor l in sys.stdin: sys.stdout.write(l)"
+    full = str(tmp_path / "out.txt")
+    out, err, rc, _, use = sandbox._run([sys.executable, "-c", code], src, str(tmp_path), stdout_path=full)
+    assert rc == 0 and len(out) == 1000 and out.startswith("0\n1\n2\n")
+    assert use["outputTruncated"] and use["stdoutBytes"] == os.path.getsize(src.path) == os.path.getsize(full)
+    out, *_, use = sandbox.run_python("print(input())", src)
+    assert out == "0\n" and not use["outputTruncated"] and use["stdoutBytes"] == 2
+
+@needs_cxx
+def test_run_cpp_mle(monkeypatch, tmp_path):
+    monkeypatch.setattr(pch, "PCH_ENABLED", False)
+    monkeypatch.setattr(sandbox, "binary_cache", CompileCache(str(tmp_path / "bin"), 1 << 30))
+    src = "#include <bits/stdc++.h>\nint main(){ std::vector<char> v(1u << 30, 1); std::cout << (int)v[12345]; }\n"
+    *_, use = sandbox.run_cpp(src, "", Limits(None, 256))
+    assert use["verdict"] == "MLE"
+
+@needs_cxx
+def test_peak_rss_excludes_backend_memory(tmp_path):
+    ballast = bytearray(200 * 1024 * 1024)
+    *_, use = sandbox._run(["true"], "", str(tmp_path))
+    assert use["verdict"] == "OK" and 0 < use["maxRssKb"] < 32 * 1024
+    del ballast
+
+@needs_cxx
+def test_pgo_profile_trains_on_stdin(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path / "bin"), 1 << 30)
+    monkeypatch.setattr(sandbox, "binary_cache", cache)
+    monkeypatch.setattr(pch, "PCH_ENABLED", False)
+    phases = {}
+    with tempfile.TemporaryDirectory() as d:
+        bin_path, err, rc = sandbox._compile(HELLO, d, "pgo", "4 5", phases=phases)
+        assert rc == 0, err
+        assert set(phases) == {"instrument", "train", "optimize"}
+        assert os.listdir(os.path.join(d, "prof"))
+    # the optimized binary is cached per training input, the instrumented one never
+    assert cache.stats()["stores"] == 1
+    phases = {}
+    with tempfile.TemporaryDirectory() as d:
+        assert sandbox._compile(HELLO, d, "pgo", "4 5", phases=phases)[2] == 0
+    assert list(phases) == ["optimize"]
+    assert sandbox.run_cpp(HELLO, "1 2", profile="fast")[0].strip() == "3"
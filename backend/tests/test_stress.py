@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from runner.sandbox import _find_compiler
+from runner.stress import run_stress, shrink
+
+needs_cxx = pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
+
+REF = "n = int(input())\na = list(map(int, input().split()))\nprint(sum(a))\n"
+GEN = "import random\nn = random.randint(1, 8)\nprint(n)\nprint(*[random.randint(0, 9) for _ in range(n)])\n"
+
+def _cpp(limit):
+    return ('#include <bits/stdc++.h>\nusing namespace std;\nint main(){ int n; cin >> n; long long s = 0;\n'
+            f'for (int i = 0; i < n; i++) {{ long long x; cin >> x; if (i < {limit}) s += x; }}\ncout << s << "\\n"; }}\n')
+
+def test_shrink_keeps_failing_input():
+    # "fails" when the input still has a line holding a 7
+    small, steps = shrink("3\n1 7 2\n5\n", lambda s: any("7" in l.split(" ") for l in s.split("\n")))
+    assert small == "7" and steps > 0
+
+@needs_cxx
+def test_stress_passes_matching_program():
+    r = run_stress(REF, _cpp(100), GEN, max_cases=30, workers=1)
+    assert r["status"] == "passed" and r["cases"] == 30 and "failure" not in r
+
+@needs_cxx
+def test_stress_finds_and_shrinks_failure():
+    r = run_stress(REF, _cpp(3), GEN, max_cases=500, workers=1)
+    assert r["status"] == "failed"
+    f = r["failure"]
+    assert f["kind"] == "WA" and f["expected"] != f["actual"]
+    # smallest generated failure needs a nonzero 4th number
+    assert f["input"].split("\n")[0] == "4"
+    assert len(f["shrunk"]["input"]) <= len(f["input"]) and f["shrunk"]["expected"] != f["shrunk"]["actual"]
+
+def test_shrink_stops_at_deadline():
+    def slow(s):
+        time.sleep(0.05)
+        return "7" in s
+    t0 = time.perf_counter()
+    small, steps = shrink("\n".join(["1 2 3 7 5 6"] * 50), slow, deadline=t0 + 0.2)
+    assert time.perf_counter() - t0 < 0.5 and 0 < steps < 30 and "7" in small
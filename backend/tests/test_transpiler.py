@@ -1,7 +1,249 @@
-from transpiler.python_to_cpp import py_to_cpp
+import pytest
+
+from runner.sandbox import _find_compiler, run_cpp, run_python
+from transpiler.python_to_cpp import py_to_cpp, transpile
+from transpiler.incremental import Session, VersionMismatch
+
+needs_cxx = pytest.mark.skipif(_find_compiler()[0] is None, reason="no C++ compiler")
 
 def test_if():
     py = "x=5\nif x>3:\n    print(x)\n"
     cpp = py_to_cpp(py)
     assert "if ((x > 3))" in cpp
     assert "_print(x);" in cpp
+
+def test_infers_concrete_types():
+    py = "def f(x, y):\n    return x ** 2 + y\n\nn = int(input())\nr = f(n, 3)\nh = n / 2\nprint(r, h)\n"
+    cpp = py_to_cpp(py)
+    assert "ll f(ll x, ll y) {" in cpp
+    assert "ipow(x, 2)" in cpp and "pow(" not in cpp.replace("ipow(", "")
+    assert "ll r = f(n, 3);" in cpp
+    assert "double h = ((double)n / 2);" in cpp
+
+def test_container_params_and_fallback_diagnostics():
+    py = "def fill(a, n):\n    for i in range(n):\n        a[i] = i\n\ndef unused(z):\n    return z\n\nq = [0, 0]\nfill(q, 2)\n"
+    cpp, diagnostics = transpile(py)
+    assert "void fill(vector<ll>& a, ll n) {" in cpp
+    assert "vector<ll> q = {0, 0};" in cpp
+    assert "auto unused(auto z) {" in cpp
+    assert any("'z' of unused()" in d for d in diagnostics)
+
+def test_lowers_builtins_and_comprehensions_to_stl():
+    py = ("a = list(map(int, input().split()))\n"
+          "sq = [x * x for x in a]\n"
+          "grid = [[0] * 3 for _ in range(4)]\n"
+          "cnt = {}\n"
+          "for x in a:\n    cnt[x] = cnt.get(x, 0) + 1\n"
+          "a.sort(key=lambda v: -v)\n"
+          "print(sum(x for x in a if x > 1), pow(2, 50, 1000000007), a[::-1], a[-1])\n")
+    cpp = py_to_cpp(py)
+    assert "_r1.reserve(a.size());" in cpp
+    assert "vector<vector<ll>> grid = vector<vector<ll>>(max(0LL, (long long)(4)), vector<ll>(max(0LL, (long long)(3)), 0));" in cpp
+    assert "unordered_map<ll, ll, chash> cnt = {};" in cpp and "struct chash {" in cpp
+    assert "py_sort_key(a, [&](const auto& v){ return (-v); });" in cpp
+    assert "py_modpow(2, 50, 1000000007)" in cpp and "a.end()[-1]" in cpp
+    assert "/*" not in cpp.split("int main(){")[1]
+    # helpers the program doesn't use are left out
+    assert "py_heappush" not in py_to_cpp("print(sorted([3, 1]))\n")
+
+@needs_cxx
+def test_lowered_program_matches_python():
+    py = ("import heapq\nfrom collections import Counter, deque\n"
+          "n = int(input())\na = list(map(int, input().split()))\n"
+          "h = []\nfor x in a:\n    heapq.heappush(h, (x % 3, x))\n"
+          "order = [heapq.heappop(h)[1] for _ in range(n)]\n"
+          "c = Counter(a)\nq = deque(sorted(c, key=lambda k: (-c[k], k)))\n"
+          "first, last = q.popleft(), q.pop()\n"
+          "print(*order)\nprint(first, last, a[1:-1], any(x > 4 for x in a), {x % 4 for x in a} == {0, 1, 3})\n")
+    stdin = "6\n4 1 4 3 6 1\n"
+    out, err, rc, _, _ = run_cpp(py_to_cpp(py), stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+def test_io_follows_input_pattern():
+    cpp = py_to_cpp("q = int(input())\nprint(q, flush=True)\n")
+    assert "getchar()" in cpp and "fread(" not in cpp and "_flush();" in cpp
+
+@needs_cxx
+def test_bulk_read_tokens_parse_like_python():
+    py = ("import sys\ndata = sys.stdin.read().split()\nn = int(data[0])\n"
+          "a = [int(x) for x in data[1:1 + n]]\nw = float(data[n + 1])\nprint(n, sum(a), max(a), w * 2, data[-1])\n")
+    cpp, diagnostics = transpile(py)
+    # only the readers the program calls, and no iostream round trips
+    assert diagnostics == [] and "read_line" not in cpp and "cout" not in cpp
+    stdin = "4\n 5 -3\n+8 10\n1.25 end"
+    out, err, rc, _, _ = run_cpp(cpp, stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+@needs_cxx
+def test_fast_io_program_matches_python():
+    py = ("import sys\ninput = sys.stdin.readline\n"
+          "n = int(input())\na = list(map(int, input().split()))\nname = input().strip()\n"
+          "rest = list(map(int, sys.stdin.read().split()))\n"
+          "print(sum(a), name, sep=', ', end='!\\n')\nprint(len(rest), *rest[-2:])\n"
+          "for x in a:\n    print(x, end=' ')\nprint()\n")
+    stdin = "3  \r\n-5 7 +2\r\n  bob \n1 2\n\n3 4 5"
+    out, err, rc, _, _ = run_cpp(py_to_cpp(py), stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+@needs_cxx
+def test_print_sep_applies_inside_starred_arguments():
+    py = ("a = list(map(int, input().split()))\nprint(*a, sep=',')\nprint(*a, sep='')\n"
+          "print(0, *a, 9, sep=' - ')\nprint(*a, sep=None, end=None)\n")
+    out, err, rc, _, _ = run_cpp(py_to_cpp(py), "1 2 3\n")
+    assert rc == 0, err
+    assert out == run_python(py, "1 2 3\n")[0] == "1,2,3\n123\n0 - 1 - 2 - 3 - 9\n1 2 3\n"
+
+def test_incremental_session_reemits_only_changed_chunks():
+    src = ("def f(a):\n    return sum(x * x for x in a)\n\n"
+           "def g(a):\n    return [x + 1 for x in a]\n\n"
+           "a = list(map(int, input().split()))\nprint(f(a))\nprint(*g(a))\n")
+    s = Session(src)
+    assert s.transpile()["cpp"] == py_to_cpp(src)
+    i = s.code.index("x + 1")
+    s.patch(0, [(i, i + 5, "x + 2")])
+    r = s.transpile()
+    assert (r["reused"], r["emitted"]) == (4, 1) and r["cpp"] == py_to_cpp(s.code)
+    # a statement inserted ahead of main's first use of `a`: later chunks still hit
+    s.patch(1, [(s.code.index("a = "), s.code.index("a = "), "b = [0] * 3\n")])
+    r = s.transpile()
+    assert r["emitted"] == 1 and r["cpp"] == py_to_cpp(s.code)
+    with pytest.raises(VersionMismatch): s.patch(0, [])
+    s.patch(2, [(0, 0, "def (")])
+    assert s.transpile()["error"] and s.version == 3
+
+MEMO_PY = """import sys
+from functools import lru_cache, cache
+sys.setrecursionlimit(10**6)
+
+@lru_cache(maxsize=None)
+def paths(i, j):
+    if i == 0 or j == 0:
+        return 1
+    return (paths(i - 1, j) + paths(i, j - 1)) % 1000000007
+
+@cache
+def count(s, k):
+    if k == 0:
+        return 1
+    return (len(s) * count(s, k - 1)) % 1000003
+
+n, m = map(int, input().split())
+print(paths(n, m), count("abc", m))
+paths.cache_clear()
+print(paths(2, 2))
+"""
+
+def test_memoized_functions_lower_to_memo_tables():
+    cpp = py_to_cpp(MEMO_PY)
+    assert "static _Memo<ll, 2> _memo_paths;" in cpp and "_memo_paths.fit(_k);" in cpp
+    assert "static unordered_map<tuple<string, ll>, ll, chash> _memo_count;" in cpp
+    assert "ll _paths_body(ll i, ll j) {" in cpp and "_memo_paths.clear();" in cpp
+    assert "int main(){ return _run_on_stack(_main, 512000000); }" in cpp
+    assert "setrecursionlimit" not in cpp and "/*expr?*/" not in cpp
+
+@needs_cxx
+def test_memoized_program_matches_python():
+    cpp = py_to_cpp(MEMO_PY)
+    for stdin in ("3 4\n", "300 250\n"):
+        assert run_cpp(cpp, stdin)[:3] == run_python(MEMO_PY, stdin)[:3]
+
+def test_loop_profiling_is_opt_in():
+    src = "n = int(input())\nfor i in range(n):\n    while n > i:\n        n -= 1\nprint(n)\n"
+    assert "_prof" not in py_to_cpp(src)
+    loops = []
+    cpp, _ = transpile(src, loops=loops)
+    assert [(l["line"], l["kind"]) for l in loops] == [(2, "for"), (3, "while")]
+    assert "const int _PROF_LOOPS = 2;" in cpp and "++_prof[1].hits;" in cpp
+
+@needs_cxx
+def test_bfs_queue_fed_from_tuple_keeps_its_type():
+    py = ("from collections import deque\nn, m = map(int, input().split())\n"
+          "g = [[] for _ in range(n)]\nfor _ in range(m):\n    u, v = map(int, input().split())\n"
+          "    for a, b in ((u, v), (v, u)):\n        g[a].append(b)\n"
+          "dist = [-1] * n\ndist[0] = 0\nq = deque([0])\n"
+          "while q:\n    x = q.popleft()\n    for y in g[x]:\n        if dist[y] < 0:\n"
+          "            dist[y] = dist[x] + 1\n            for z in (y,):\n                q.append(z)\n"
+          "print(*dist)\n")
+    cpp, diagnostics = transpile(py)
+    assert diagnostics == [] and "while (!q.empty())" in cpp
+    stdin = "5 4\n0 1\n1 2\n0 3\n3 4\n"
+    out, err, rc, _, _ = run_cpp(cpp, stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+@needs_cxx
+def test_range_zip_counter_and_set_idioms_match_python():
+    py = ("from collections import Counter\nn = int(input())\na = list(map(int, input().split()))\n"
+          "p = list(range(n + 1))\nfor i, (x, y) in enumerate(zip(a, p[1:])):\n    p[i] += x * y\n"
+          "s, t = set(a), set(range(3))\ns |= {9}\n"
+          "print(p, Counter(a).most_common(1)[0][0], sorted(s & t), sorted(s | t), sorted(s - t), sorted(s ^ t))\n")
+    cpp, diagnostics = transpile(py)
+    assert diagnostics == [] and "py_unsupported" not in cpp
+    stdin = "4\n2 7 2 1\n"
+    out, err, rc, _, _ = run_cpp(cpp, stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+@needs_cxx
+def test_line_parsing_idioms_match_python():
+    py = ("t = int(input())\nfor _ in range(t):\n    a = [int(x) for x in input().split()]\n"
+          "    name, age = input().split()\n    s = input()\n"
+          "    print(sum(a), name, int(age) + 1, int(s) * 2, [int(c) for c in s], float(s) / 4)\n")
+    cpp, diagnostics = transpile(py)
+    assert diagnostics == []
+    stdin = "2\n1 2 3\nann 30\n17\n-4 4\nbo 9\n05\n"
+    out, err, rc, _, _ = run_cpp(cpp, stdin)
+    assert rc == 0, err
+    assert out == run_python(py, stdin)[0]
+
+@needs_cxx
+def test_repeat_and_builtin_map_callables_match_python():
+    py = ("s = input()\ng = [[1, 2], [3, 4]]\nt = '-'\nt *= 3\n"
+          "print('ab' * 3, s[0] * 2, 2 * s, [1, 2] * 2, t, sum(map(sum, g)), list(map(max, g)), sum(map(len, [s, t])))\n")
+    cpp, diagnostics = transpile(py)
+    assert diagnostics == []
+    out, err, rc, _, _ = run_cpp(cpp, "hey\n")
+    assert rc == 0, err
+    assert out == run_python(py, "hey\n")[0]
+    assert transpile("print(list(map(str.upper, ['a'])))\n")[1] == \
+        ["line 1: `str.upper` as a function is not supported, the C++ won't compile"]
+
+@needs_cxx
+def test_floor_division_and_modulo_round_like_python():
+    py = ("a = int(input())\nb = a + 0.5\nc = a\nc //= 4\n"
+          "print(a // 2, a % 3, 7 // -2, 7 % -3, b // 2, b % 2, c, [i % 3 + i // 2 for i in range(-3, 3)])\n"
+          "for i in range(5):\n    print(i % 2, end='')\nprint()\n")
+    cpp = py_to_cpp(py)
+    # a range loop variable counting up from 0 can't be negative: plain %
+    assert "(i % 2)" in cpp
+    out, err, rc, _, _ = run_cpp(cpp, "-7\n")
+    assert rc == 0, err
+    assert out == run_python(py, "-7\n")[0]
+
+def test_unsupported_nodes_are_reported_not_silently_zeroed():
+    cpp, diagnostics = transpile("x = [1]\ntry:\n    pass\nexcept Exception:\n    pass\nprint(x.bogus())\n")
+    assert diagnostics == ["line 2: the try statement is not supported, the C++ won't compile",
+                           "line 6: `x.bogus()` is not supported, the C++ won't compile"]
+    assert "/*expr?*/" not in cpp and "// line 6: `x.bogus()`" in cpp
+
+@needs_cxx
+def test_module_variables_used_by_functions_become_globals():
+    py = ("n = int(input())\nparent = list(range(n))\nhits = 0\n"
+          "def find(x):\n    global hits\n    hits += 1\n    while parent[x] != x:\n        x = parent[x]\n    return x\n"
+          "parent[2] = 1\nparent[1] = 0\nprint(find(2), find(3), hits)\n")
+    cpp, diagnostics = transpile(py)
+    assert diagnostics == [] and "static vector<ll> parent;" in cpp and "static ll hits;" in cpp
+    out, err, rc, _, _ = run_cpp(cpp, "4\n")
+    assert rc == 0, err
+    assert out == run_python(py, "4\n")[0]
+
+@needs_cxx
+def test_floats_print_like_python_repr():
+    py = ("n = int(input())\nxs = [n / 3, n * 1.0, 0.1 + 0.2, 1e16, 1e-5, 1e-4, -0.0, 2.0 ** 60, float('inf'), -float('inf')]\n"
+          "for x in xs:\n    print(x)\nprint(str(n / 4) + '!', xs[:2])\n")
+    out, err, rc, _, _ = run_cpp(transpile(py)[0], "1\n")
+    assert rc == 0, err
+    assert out == run_python(py, "1\n")[0]
@@ -0,0 +1,145 @@
+import ast, hashlib, os, re, threading, time, uuid
+
+from transpiler.python_to_cpp import transpile
+
+SESSION_MAX = int(os.environ.get("PY2CPP_SESSION_MAX", "64"))
+SESSION_TTL = float(os.environ.get("PY2CPP_SESSION_TTL", "1800"))
+
+# Emitted C++ per top-level FunctionDef / main statement. Type inference still
+# runs over the whole module (parameter and return types flow between
+# definitions), so a chunk's key is its source plus the typing context it was
+# emitted in; what's saved is emission. Entries not used by the latest
+# transpile are dropped, so the cache tracks one buffer.
+class ChunkCache:
+    def __init__(self):
+        self.entries = {}
+        self._used = set()
+        self._lines = []
+        self._ctx = (None, "")
+        self.reused = self.emitted = 0
+
+    def _context(self, em) -> str:
+        # signatures of every function and the I/O mode, shared by all chunks of a run
+        if self._ctx[0] is not em.info:
+            info = em.info
+            self._ctx = (info, hashlib.sha256(repr((info.params, info.returns, info.globals, em.io.interactive)).encode()).hexdigest())
+        return self._ctx[1]
+
+    def _source(self, node) -> str:
+        # the node's whole lines plus its columns: equal text parses to an equal
+        # subtree, and hashing it is far cheaper than ast.dump
+        first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", ())])
+        text = "\n".join(self._lines[first - 1:node.end_lineno])
+        return f"{node.col_offset}:{node.end_col_offset}:{text}"
+
+    def emit(self, node, em, emit):
+        top = not isinstance(node, ast.FunctionDef)
+        scope = em.scope if top else node.name
+        src = self._source(node)
+        names = set(re.findall(r"[A-Za-z_]\w*", src))
+        env = em.info.scopes.get(scope, {})
+        declared = em.scopes[-1]
+        # only the types of names the chunk mentions, so a new variable elsewhere
+        # doesn't invalidate it; a main statement declares on first assignment,
+        # so it also depends on which of those names earlier statements declared
+        h = hashlib.sha256()
+        for part in (self._context(em), scope, src, repr(sorted((n, env[n]) for n in names if n in env)),
+                     repr(sorted(declared & names)) if top else ""):
+            h.update(part.encode()); h.update(b"\0")
+        key = h.hexdigest()
+        self._used.add(key)
+        hit = self.entries.get(key)
+        # temporaries are numbered in order, so a chunk that made some is only
+        # reusable from the same counter
+        if hit is not None and (hit[2] == hit[3] or hit[2] == em.tmp):
+            lines, new_names, tmp0, tmp1 = hit
+            em.lines.extend(lines)
+            declared.update(new_names)
+            em.tmp += tmp1 - tmp0
+            self.reused += 1
+            return
+        start, before, tmp0 = len(em.lines), set(declared), em.tmp
+        emit(node, em)
+        self.entries[key] = (em.lines[start:], declared - before, tmp0, em.tmp)
+        self.emitted += 1
+
+    def run(self, py_code: str):
+        self._used, self.reused, self.emitted = set(), 0, 0
+        self._lines = py_code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        cpp, diagnostics = transpile(py_code, self)
+        self.entries = {k: v for k, v in self.entries.items() if k in self._used}
+        return cpp, diagnostics
+
+class VersionMismatch(Exception):
+    pass
+
+def _splice(text: str, start: int, end: int, repl: str) -> str:
+    # offsets are UTF-16 code units, as the browser counts them
+    u = text.encode("utf-16-le")
+    if not 0 <= start <= end <= len(u) // 2: raise ValueError(f"bad edit range {start}..{end}")
+    return (u[:2 * start] + repl.encode("utf-16-le") + u[2 * end:]).decode("utf-16-le")
+
+class Session:
+    def __init__(self, code: str):
+        self.id = uuid.uuid4().hex
+        self.code = code
+        self.version = 0
+        self.cache = ChunkCache()
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    # edits: [(start, end, text)] applied in order, each against the result of the previous
+    def patch(self, base_version: int, edits):
+        if base_version != self.version: raise VersionMismatch(f"session is at version {self.version}")
+        code = self.code
+        for start, end, text in edits:
+            code = _splice(code, start, end, text)
+        self.code = code
+        self.version += 1
+
+    def transpile(self) -> dict:
+        t0 = time.perf_counter()
+        try:
+            cpp, diagnostics = self.cache.run(self.code)
+            err = None
+        except SyntaxError as e:
+            # mid-keystroke buffers often don't parse; the client keeps its last good C++
+            cpp, diagnostics, err = None, [], f"line {e.lineno}: {e.msg}"
+        return {"session": self.id, "version": self.version, "cpp": cpp, "diagnostics": diagnostics, "error": err,
+                "reused": self.cache.reused, "emitted": self.cache.emitted,
+                "ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+class SessionStore:
+    def __init__(self, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, code: str) -> Session:
+        s = Session(code)
+        with self._lock:
+            self._expire()
+            while len(self._sessions) >= self.max_sessions:
+                del self._sessions[min(self._sessions, key=lambda k: self._sessions[k].last_used)]
+            self._sessions[s.id] = s
+        return s
+
+    def get(self, sid: str):
+        with self._lock:
+            self._expire()
+            s = self._sessions.get(sid)
+            if s is not None: s.last_used = time.monotonic()
+            return s
+
+    def close(self, sid: str) -> bool:
+        with self._lock: return self._sessions.pop(sid, None) is not None
+
+    def _expire(self):
+        now = time.monotonic()
+        for k in [k for k, s in self._sessions.items() if now - s.last_used > self.ttl]: del self._sessions[k]
+
+    def stats(self) -> dict:
+        with self._lock: return {"sessions": len(self._sessions), "maxSessions": self.max_sessions, "ttlSeconds": self.ttl}
+
+sessions = SessionStore(SESSION_MAX, SESSION_TTL)
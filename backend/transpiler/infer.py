@@ -0,0 +1,470 @@
+import ast
+
+from transpiler.io_plan import is_stdin_alias
+
+# Types are C++ scalar names ("ll", "double", "string", "bool") or tuples for
+# containers: ("vector", T), ("deque", T), ("set", T), ("map", K, V), and
+# ("tuple", A, B, ...) for Python tuples. ("gen", T) is a generator expression,
+# which never becomes a C++ variable. None means "nothing seen yet"; ANY means
+# the uses disagree and we have to fall back to auto.
+LL, DOUBLE, STR, BOOL, CHAR = "ll", "double", "string", "bool", "char"
+ANY = "?"
+MAIN = "<module>"
+_RANK = {BOOL: 0, CHAR: 1, LL: 2, DOUBLE: 3}
+_MAX_PASSES = 12
+SCALARS = (LL, DOUBLE, BOOL, CHAR)
+# stdlib modules whose functions are lowered by name (heapq.heappush -> heappush)
+MODULES = ("heapq", "collections", "math", "bisect")
+
+def vec(t): return ("vector", t)
+
+def kind(t): return t[0] if isinstance(t, tuple) else None
+
+def elem(t):
+    # what iterating a value of type t yields (map iteration yields keys; a
+    # tuple yields the join of its parts, so `for v in (a, b)` keeps a type)
+    if kind(t) in ("vector", "deque", "set", "map", "gen"): return t[1]
+    if kind(t) == "tuple":
+        r = None
+        for x in t[1:]: r = join(r, x)
+        return r
+    if t == STR: return CHAR
+    return ANY if t is not None else None
+
+def call_name(node):
+    if not isinstance(node, ast.Call): return None
+    f = node.func
+    if isinstance(f, ast.Name): return f.id
+    if isinstance(f, ast.Attribute) and isinstance(f.value, ast.Name) and f.value.id in MODULES: return f.attr
+    return None
+
+def join(a, b):
+    if a is None: return b
+    if b is None or a == b: return a
+    if a == ANY or b == ANY: return ANY
+    if a in _RANK and b in _RANK: return max(a, b, key=_RANK.get)
+    if isinstance(a, tuple) and isinstance(b, tuple) and a[0] == b[0] and len(a) == len(b):
+        parts = tuple(join(x, y) for x, y in zip(a[1:], b[1:]))
+        return ANY if ANY in parts else (a[0], *parts)
+    return ANY
+
+def _arith(a, b):
+    t = join(a, b)
+    if t in (BOOL, CHAR): return LL
+    return t if t in (LL, DOUBLE, None) else ANY
+
+def cpp_type(t):
+    if t is None or t == ANY: return None
+    if isinstance(t, str): return t
+    inner = [cpp_type(x) for x in t[1:]]
+    if None in inner or t[0] == "gen": return None
+    # Python's dict/set are hash tables; chash is the seeded hash emitted with them
+    if t[0] == "map": return f"unordered_map<{inner[0]}, {inner[1]}, chash>"
+    if t[0] == "set": return f"unordered_set<{inner[0]}, chash>"
+    if t[0] == "tuple": return f"{'pair' if len(inner) == 2 else 'tuple'}<{', '.join(inner)}>"
+    return f"{t[0]}<{', '.join(inner)}>"
+
+def is_container(t): return isinstance(t, tuple)
+
+def _is_call(node, name): return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name
+
+def is_int_list_read(node) -> bool:
+    # map(int, input().split())
+    if not (_is_call(node, "map") and len(node.args) == 2): return False
+    f, src = node.args
+    return (isinstance(f, ast.Name) and f.id == "int" and isinstance(src, ast.Call)
+            and isinstance(src.func, ast.Attribute) and src.func.attr == "split")
+
+def _module_names(fn: ast.FunctionDef):
+    # (names the function reads but never binds, names it declares `global`)
+    declared = {n for s in ast.walk(fn) if isinstance(s, ast.Global) for n in s.names}
+    stored = {a.arg for a in fn.args.args} | {n.id for n in ast.walk(fn) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+    loaded = {n.id for n in ast.walk(fn) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+    return (loaded - stored) | declared
+
+def _rebinds(fn: ast.FunctionDef, name: str) -> bool:
+    for n in ast.walk(fn):
+        if isinstance(n, (ast.Assign, ast.AugAssign, ast.For)):
+            targets = n.targets if isinstance(n, ast.Assign) else [n.target]
+            if any(isinstance(t, ast.Name) and t.id == name for t in targets): return True
+    return False
+
+def _mutates(fn: ast.FunctionDef, name: str) -> bool:
+    for n in ast.walk(fn):
+        if isinstance(n, ast.Subscript) and isinstance(n.ctx, ast.Store) and isinstance(n.value, ast.Name) and n.value.id == name:
+            return True
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and isinstance(n.func.value, ast.Name) \
+                and n.func.value.id == name:
+            return True
+        if isinstance(n, ast.Call) and call_name(n) in ("heappush", "heappop", "heapify") and n.args \
+                and isinstance(n.args[0], ast.Name) and n.args[0].id == name:
+            return True
+    return False
+
+# Flow-insensitive inference over a module: every variable gets the join of all
+# values assigned to it in its function (or in main), parameters get the join
+# of their call sites, and the whole thing is iterated to a fixpoint so calls
+# between (and within) functions settle.
+class TypeInfo:
+    def __init__(self, tree: ast.Module):
+        self.funcs = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+        self.toplevel = [n for n in tree.body if not isinstance(n, ast.FunctionDef)]
+        self.params = {name: [None] * len(fn.args.args) for name, fn in self.funcs.items()}
+        self.returns = {name: None for name in self.funcs}
+        self.scopes = {name: {} for name in self.funcs}
+        self.scopes[MAIN] = {}
+        # module-level variables each function uses; they become C++ globals
+        self.globals = {name: set() for name in self.funcs}
+        self._module_names = {name: _module_names(fn) for name, fn in self.funcs.items()}
+        self.first_line = {}
+        self.node_types = {}
+        self.diagnostics = []
+        self._run()
+
+    def _snapshot(self):
+        return (repr(self.params), repr(self.returns), repr(self.scopes))
+
+    def _run(self):
+        for _ in range(_MAX_PASSES):
+            before = self._snapshot()
+            main = self.scopes[MAIN]
+            for name, fn in self.funcs.items():
+                env = self.scopes[name]
+                for a, t in zip(fn.args.args, self.params[name]): env[a.arg] = join(env.get(a.arg), t)
+                # a module variable has one type, shared between main and the functions using it
+                shared = self.globals[name]
+                shared |= {n for n in self._module_names[name] if n in main}
+                for g in shared: env[g] = join(env.get(g), main[g])
+                self._block(fn.body, env, name)
+                for g in shared: main[g] = join(main[g], env[g])
+            self._block(self.toplevel, self.scopes[MAIN], MAIN)
+            if self._snapshot() == before: break
+        self._collect_diagnostics()
+
+    def _collect_diagnostics(self):
+        for name, fn in self.funcs.items():
+            for a, t in zip(fn.args.args, self.params[name]):
+                if cpp_type(t) is None:
+                    self.diagnostics.append(f"line {fn.lineno}: parameter '{a.arg}' of {name}() has no inferable type, using auto")
+            if self.has_return(name) and cpp_type(self.returns[name]) is None:
+                self.diagnostics.append(f"line {fn.lineno}: return type of {name}() not inferable, using auto")
+        for scope, env in self.scopes.items():
+            params = {a.arg for a in self.funcs[scope].args.args} | self.globals[scope] if scope in self.funcs else set()
+            for var, t in env.items():
+                if var in params or cpp_type(t) is not None: continue
+                line = self.first_line.get((scope, var), "?")
+                self.diagnostics.append(f"line {line}: type of '{var}' not inferable, using auto")
+
+    # ---- queries used by the emitter ----
+    def has_return(self, fn_name: str) -> bool:
+        return any(isinstance(n, ast.Return) and n.value is not None for n in ast.walk(self.funcs[fn_name]))
+
+    def var_type(self, scope: str, name: str): return self.scopes.get(scope, {}).get(name)
+
+    def module_globals(self) -> list:
+        return sorted(set().union(*self.globals.values()))
+
+    def param_decl(self, fn_name: str, i: int) -> str:
+        fn = self.funcs[fn_name]
+        arg = fn.args.args[i].arg
+        ct = cpp_type(self.params[fn_name][i])
+        if ct is None: return f"auto {arg}"
+        if not is_container(self.params[fn_name][i]) and ct != STR: return f"{ct} {arg}"
+        # containers: alias like Python does when mutated, avoid the copy otherwise
+        if _rebinds(fn, arg): return f"{ct} {arg}"
+        if _mutates(fn, arg): return f"{ct}& {arg}"
+        return f"const {ct}& {arg}"
+
+    def return_decl(self, fn_name: str) -> str:
+        if not self.has_return(fn_name): return "void"
+        return cpp_type(self.returns[fn_name]) or "auto"
+
+    def type_of(self, node, scope: str):
+        # nodes seen during inference keep the type they had in their own
+        # context (comprehension and lambda variables included)
+        if node in self.node_types: return self.node_types[node]
+        return self._expr(node, self.scopes.get(scope, {}))
+
+    # ---- statements ----
+    def _bind(self, env, scope, name, t, node):
+        self.first_line.setdefault((scope, name), getattr(node, "lineno", "?"))
+        env[name] = join(env.get(name), t)
+
+    def _target(self, tgt, t, bind):
+        if isinstance(tgt, ast.Name): bind(tgt.id, t)
+        elif isinstance(tgt, (ast.Tuple, ast.List)):
+            if kind(t) == "tuple" and len(t) == len(tgt.elts) + 1: parts = t[1:]
+            elif kind(t) == "vector": parts = [t[1]] * len(tgt.elts)
+            else: parts = [ANY if t is not None else None] * len(tgt.elts)
+            for e, p in zip(tgt.elts, parts): self._target(e, p, bind)
+
+    def _block(self, stmts, env, scope):
+        for s in stmts: self._stmt(s, env, scope)
+
+    def _stmt(self, node, env, scope):
+        if isinstance(node, ast.Assign) and is_stdin_alias(node.value):
+            pass  # input = sys.stdin.readline: calls keep typing as input()
+        elif isinstance(node, ast.Assign):
+            for tgt in node.targets: self._assign(tgt, node.value, env, scope, node)
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            self._assign(node.target, node.value, env, scope, node)
+        elif isinstance(node, ast.AugAssign):
+            cur = self._expr(node.target, env)
+            t = self._binop(cur, node.op, self._expr(node.value, env), node.value)
+            if isinstance(node.target, ast.Name): self._bind(env, scope, node.target.id, t, node)
+            else: self._store(node.target, t, env)
+        elif isinstance(node, ast.Expr):
+            self._expr(node.value, env)
+        elif isinstance(node, ast.For):
+            self._target(node.target, self._iter_elem(node.iter, env), lambda n, t: self._bind(env, scope, n, t, node))
+            self._block(node.body, env, scope); self._block(node.orelse, env, scope)
+        elif isinstance(node, (ast.While, ast.If)):
+            self._expr(node.test, env)
+            self._block(node.body, env, scope); self._block(node.orelse, env, scope)
+        elif isinstance(node, ast.Return) and node.value is not None and scope in self.returns:
+            self.returns[scope] = join(self.returns[scope], self._expr(node.value, env))
+
+    def _assign(self, tgt, value, env, scope, node):
+        if isinstance(tgt, ast.Name):
+            self._bind(env, scope, tgt.id, self._expr(value, env), node)
+        elif isinstance(tgt, ast.Tuple):
+            if is_int_list_read(value):
+                t = ("tuple",) + (LL,) * len(tgt.elts)
+            elif isinstance(value, (ast.List, ast.Tuple)) and len(value.elts) == len(tgt.elts):
+                t = ("tuple",) + tuple(self._expr(v, env) for v in value.elts)
+            else:
+                t = self._expr(value, env)
+            self._target(tgt, t, lambda n, t: self._bind(env, scope, n, t, node))
+        elif isinstance(tgt, ast.Subscript):
+            self._store(tgt, self._expr(value, env), env)
+
+    def _store(self, tgt, t, env):
+        # a[i] = t / d[k] = t: widen the container that holds the slot
+        if not isinstance(tgt, ast.Subscript) or isinstance(tgt.slice, ast.Slice): return
+        base = self._expr(tgt.value, env)
+        if kind(base) in ("vector", "deque"): self._refine(tgt.value, (base[0], t), env)
+        elif kind(base) == "map": self._refine(tgt.value, ("map", self._expr(tgt.slice, env), t), env)
+
+    def _refine(self, node, t, env):
+        # joins t into whatever `node` (a name or a subscript chain like g[u]) refers to
+        if isinstance(node, ast.Name):
+            if node.id in env: env[node.id] = join(env[node.id], t)
+        else:
+            self._store(node, t, env)
+
+    def _method_call(self, call, env):
+        f = call.func
+        cur = self._expr(f.value, env)
+        k = kind(cur)
+        if f.attr == "sort":
+            key = next((kw.value for kw in call.keywords if kw.arg == "key"), None)
+            if key is not None: self._key(key, elem(cur), env)
+        if not call.args: return
+        arg = self._expr(call.args[0], env)
+        if f.attr in ("append", "appendleft") and k in ("vector", "deque"):
+            self._refine(f.value, (k, arg), env)
+        elif f.attr == "insert" and k == "vector":
+            self._refine(f.value, vec(self._expr(call.args[-1], env)), env)
+        elif f.attr == "add" and k == "set":
+            self._refine(f.value, ("set", arg), env)
+        elif f.attr == "extend" and k in ("vector", "deque"):
+            self._refine(f.value, (k, elem(arg)), env)
+
+    def _iter_elem(self, it, env):
+        n = call_name(it) if isinstance(it, ast.Call) else None
+        if n == "range":
+            for a in it.args: self._expr(a, env)
+            return LL
+        if n == "enumerate" and it.args: return ("tuple", LL, elem(self._expr(it.args[0], env)))
+        if n == "zip" and it.args: return ("tuple",) + tuple(elem(self._expr(a, env)) for a in it.args)
+        if n == "reversed" and it.args: return self._iter_elem(it.args[0], env)
+        if isinstance(it, ast.Call) and isinstance(it.func, ast.Attribute) and it.func.attr in ("items", "keys", "values"):
+            self._expr(it, env)
+            m = self._expr(it.func.value, env)
+            if kind(m) == "map": return {"items": ("tuple", m[1], m[2]), "keys": m[1], "values": m[2]}[it.func.attr]
+        return elem(self._expr(it, env))
+
+    def _comp_env(self, gens, env):
+        inner = dict(env)
+        def bind(n, t): inner[n] = t
+        for g in gens:
+            self._target(g.target, self._iter_elem(g.iter, inner), bind)
+            for c in g.ifs: self._expr(c, inner)
+        return inner
+
+    def _key(self, key, t, env):
+        # key= lambdas see the element type; records types for the lambda body
+        if isinstance(key, ast.Lambda) and len(key.args.args) == 1:
+            inner = dict(env); inner[key.args.args[0].arg] = t
+            return self._expr(key.body, inner)
+        return self._expr(key, env)
+
+    # ---- expressions ----
+    def _binop(self, a, op, b, rhs=None):
+        if isinstance(op, ast.Div): return DOUBLE if a != ANY and b != ANY else ANY
+        if isinstance(op, ast.Pow):
+            t = _arith(a, b)
+            neg = isinstance(rhs, ast.UnaryOp) and isinstance(rhs.op, ast.USub)
+            return DOUBLE if t == LL and neg else t
+        if isinstance(op, (ast.BitAnd, ast.BitOr, ast.BitXor, ast.Sub)) and kind(a) == kind(b) == "set": return join(a, b)
+        if isinstance(op, (ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift)): return _arith(a, b)
+        if isinstance(op, ast.Add) and a == b and (a == STR or is_container(a)): return a
+        if isinstance(op, ast.Add) and is_container(a) and is_container(b): return join(a, b)
+        if isinstance(op, ast.Mult):
+            if CHAR in (a, b) and (a in (LL, BOOL) or b in (LL, BOOL)): return STR
+            if a == STR or is_container(a): return a if b in (LL, BOOL, None) else ANY
+            if b == STR or is_container(b): return b if a in (LL, BOOL, None) else ANY
+        return _arith(a, b)
+
+    def _expr(self, node, env):
+        t = self._eval(node, env)
+        self.node_types[node] = t
+        return t
+
+    def _eval(self, node, env):
+        if isinstance(node, ast.Constant):
+            v = node.value
+            if isinstance(v, bool): return BOOL
+            if isinstance(v, int): return LL
+            if isinstance(v, float): return DOUBLE
+            if isinstance(v, str): return STR
+            return ANY
+        if isinstance(node, ast.Name):
+            if node.id in ("True", "False"): return BOOL
+            return env.get(node.id)
+        if isinstance(node, ast.BinOp):
+            return self._binop(self._expr(node.left, env), node.op, self._expr(node.right, env), node.right)
+        if isinstance(node, ast.UnaryOp):
+            t = self._expr(node.operand, env)
+            if isinstance(node.op, ast.Not): return BOOL
+            return LL if t == BOOL else t
+        if isinstance(node, ast.Compare):
+            self._expr(node.left, env)
+            for c in node.comparators: self._expr(c, env)
+            return BOOL
+        if isinstance(node, ast.BoolOp):
+            for v in node.values: self._expr(v, env)
+            return BOOL
+        if isinstance(node, ast.IfExp):
+            self._expr(node.test, env)
+            return join(self._expr(node.body, env), self._expr(node.orelse, env))
+        if isinstance(node, ast.List):
+            t = None
+            for e in node.elts: t = join(t, self._expr(e, env))
+            return vec(t)
+        if isinstance(node, ast.Tuple):
+            return ("tuple",) + tuple(self._expr(e, env) for e in node.elts)
+        if isinstance(node, ast.Set):
+            t = None
+            for e in node.elts: t = join(t, self._expr(e, env))
+            return ("set", t)
+        if isinstance(node, ast.Dict):
+            k = v = None
+            for a, b in zip(node.keys, node.values):
+                if a is None: return ANY
+                k, v = join(k, self._expr(a, env)), join(v, self._expr(b, env))
+            return ("map", k, v)
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp)):
+            t = self._expr(node.elt, self._comp_env(node.generators, env))
+            return {ast.ListComp: "vector", ast.SetComp: "set", ast.GeneratorExp: "gen"}[type(node)], t
+        if isinstance(node, ast.DictComp):
+            inner = self._comp_env(node.generators, env)
+            return ("map", self._expr(node.key, inner), self._expr(node.value, inner))
+        if isinstance(node, ast.Subscript):
+            base = self._expr(node.value, env)
+            if isinstance(node.slice, ast.Slice):
+                for part in (node.slice.lower, node.slice.upper, node.slice.step):
+                    if part is not None: self._expr(part, env)
+                return base
+            self._expr(node.slice, env)
+            if kind(base) == "tuple":
+                i = const_index(node.slice)
+                return base[1:][i] if i is not None and -len(base) < i < len(base) else ANY
+            if kind(base) in ("vector", "deque", "map"): return base[-1]
+            if base == STR: return CHAR
+            return ANY if base is not None else None
+        if isinstance(node, ast.Call): return self._call(node, env)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math" \
+                and node.attr in ("pi", "e", "inf", "tau"):
+            return DOUBLE
+        if isinstance(node, ast.Starred): return self._expr(node.value, env)
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr): self._expr(child, env)
+        return ANY
+
+    def _call(self, node, env):
+        f, n, args = node.func, call_name(node), node.args
+        kw = {k.arg: k.value for k in node.keywords}
+        if n in self.funcs:
+            ps = self.params[n]
+            for i, a in enumerate(args[:len(ps)]): ps[i] = join(ps[i], self._expr(a, env))
+            return self.returns[n]
+        ts = [self._expr(a, env) for a in args]
+        if n is not None:
+            if n in ("int", "len", "ord", "gcd", "lcm", "floor", "ceil", "bisect", "bisect_left", "bisect_right"): return LL
+            if n in ("float", "sqrt"): return DOUBLE
+            if n in ("str", "input", "chr"): return STR
+            if n in ("bool", "any", "all"): return BOOL
+            if n == "abs" and args: return ts[0]
+            if n == "pow" and args:
+                return LL if len(args) == 3 else self._binop(ts[0], ast.Pow(), ts[1] if len(ts) > 1 else None, args[-1])
+            if n == "sum" and args: return _arith(elem(ts[0]), LL if len(ts) < 2 else ts[1])
+            if n in ("max", "min") and args:
+                t = elem(ts[0]) if len(args) == 1 else None
+                if len(args) > 1:
+                    for a in ts: t = join(t, a)
+                if "key" in kw: self._key(kw["key"], t, env)
+                return t
+            if n == "reversed" and args: return vec(elem(ts[0]))
+            # as values (not loop heads) these are materialized into vectors
+            if n == "range": return vec(LL)
+            if n == "zip" and args: return vec(("tuple",) + tuple(elem(t) for t in ts))
+            if n == "enumerate" and args: return vec(("tuple", LL, elem(ts[0])))
+            if n == "sorted" and args:
+                t = elem(ts[0])
+                if "key" in kw: self._key(kw["key"], t, env)
+                return vec(t)
+            if n in ("list", "set", "deque"):
+                if args and is_int_list_read(args[0]): t = LL
+                else: t = elem(ts[0]) if args else None
+                return vec(t) if n == "list" else (n, t)
+            if n == "dict" and not args: return ("map", None, None)
+            if n == "Counter": return ("map", elem(ts[0]) if args else None, LL)
+            if n == "defaultdict":
+                factory = {"int": LL, "float": DOUBLE, "str": STR, "bool": BOOL, "list": vec(None), "set": ("set", None)}
+                return ("map", None, factory.get(getattr(args[0], "id", None), ANY) if args else ANY)
+            if n == "heappop" and args: return elem(ts[0])
+            if n == "heappush" and len(args) == 2:
+                self._refine(args[0], vec(ts[1]), env)
+                return ANY
+            if n == "map" and len(args) == 2:
+                if isinstance(args[0], ast.Name) and args[0].id in ("int", "str", "float"):
+                    return ("gen", {"int": LL, "str": STR, "float": DOUBLE}[args[0].id])
+                if isinstance(args[0], ast.Name) and args[0].id in ("len", "ord"): return ("gen", LL)
+                if isinstance(args[0], ast.Name) and args[0].id == "sum": return ("gen", _arith(elem(elem(ts[1])), LL))
+                if isinstance(args[0], ast.Name) and args[0].id in ("max", "min"): return ("gen", elem(elem(ts[1])))
+                return ("gen", ANY)
+            return ANY
+        if isinstance(f, ast.Attribute):
+            self._method_call(node, env)
+            recv = self._expr(f.value, env)
+            if f.attr == "split": return vec(STR)
+            if f.attr in ("strip", "lstrip", "rstrip", "upper", "lower", "join", "replace", "readline", "read"): return STR
+            if f.attr in ("count", "index", "find"): return LL
+            if f.attr in ("pop", "popleft") and kind(recv) in ("vector", "deque"): return recv[1]
+            if f.attr == "get" and kind(recv) == "map": return recv[2]
+            if f.attr == "copy": return recv
+            if f.attr == "most_common" and kind(recv) == "map": return vec(("tuple", recv[1], recv[2]))
+            if kind(recv) == "map" and f.attr in ("keys", "values", "items"):
+                return vec({"keys": recv[1], "values": recv[2], "items": ("tuple", recv[1], recv[2])}[f.attr])
+        return ANY
+
+def const_index(node):
+    if isinstance(node, ast.Constant) and type(node.value) is int: return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant) \
+            and type(node.operand.value) is int:
+        return -node.operand.value
+    return None
+
+def infer(tree: ast.Module) -> TypeInfo:
+    return TypeInfo(tree)
@@ -0,0 +1,129 @@
+import ast
+
+# How a program talks to stdin/stdout, so the emitter can replace iostreams with
+# a matching hand-rolled reader and a buffered writer. Line reads (input(),
+# sys.stdin.readline()) keep Python's line semantics; bulk reads
+# (sys.stdin.read().split()) become a straight token scan over the input.
+
+def _is_stdin(node) -> bool:
+    # sys.stdin / sys.stdin.buffer
+    if isinstance(node, ast.Attribute) and node.attr == "buffer": node = node.value
+    return isinstance(node, ast.Attribute) and node.attr == "stdin" and isinstance(node.value, ast.Name) and node.value.id == "sys"
+
+def is_stdin_alias(value) -> bool:
+    # input = sys.stdin.readline / input = lambda: sys.stdin.readline().rstrip()
+    if isinstance(value, ast.Attribute) and value.attr == "readline" and _is_stdin(value.value): return True
+    return isinstance(value, ast.Lambda) and not value.args.args and any(is_line_read(n) for n in ast.walk(value.body))
+
+def is_line_read(node) -> bool:
+    if not isinstance(node, ast.Call) or node.args: return False
+    f = node.func
+    if isinstance(f, ast.Name): return f.id == "input"
+    return isinstance(f, ast.Attribute) and f.attr == "readline" and _is_stdin(f.value)
+
+def is_bulk_read(node) -> bool:
+    # sys.stdin.read() / sys.stdin.buffer.read() / open(0).read()
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "read" and not node.args):
+        return False
+    v = node.func.value
+    return _is_stdin(v) or (isinstance(v, ast.Call) and isinstance(v.func, ast.Name) and v.func.id == "open"
+                            and len(v.args) == 1 and isinstance(v.args[0], ast.Constant) and v.args[0].value == 0)
+
+def split_source(node):
+    # X for X.split() with no separator, else None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "split" and not node.args:
+        return node.func.value
+    return None
+
+def int_list_reader(split_call) -> str:
+    # reader for map(int, X.split())
+    return "read_all_ints()" if is_bulk_read(split_source(split_call)) else "read_int_list()"
+
+class IOPlan:
+    def __init__(self, tree: ast.Module):
+        self.reads = set()          # "int", "ints", "line", "tokens", "all"
+        self.writes = False
+        self.interactive = False    # print(..., flush=True) seen: no read-ahead, flush before reading
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call): continue
+            f = node.func
+            if isinstance(f, ast.Name) and f.id == "print":
+                self.writes = True
+                if any(k.arg == "flush" and not (isinstance(k.value, ast.Constant) and not k.value.value) for k in node.keywords):
+                    self.interactive = True
+            elif isinstance(f, ast.Name) and f.id == "int" and len(node.args) == 1 and is_line_read(node.args[0]):
+                self.reads.add("int")
+            elif split_source(node) is not None and (is_line_read(split_source(node)) or is_bulk_read(split_source(node))):
+                self.reads.add("tokens" if is_bulk_read(split_source(node)) else "ints")
+            elif is_line_read(node): self.reads.add("line")
+            elif is_bulk_read(node): self.reads.add("all")
+
+    def helpers(self) -> dict:
+        # on-demand support code (see lowering.helper_block), reader first
+        if self.interactive:
+            # a pipe to a judge only delivers the next line after we answer, so read
+            # through stdio (returns what's available) and flush before blocking
+            gc = "static inline int _gc(){ _flush(); return getchar(); }\nstatic inline void _ungc(int c){ if(c != EOF) ungetc(c, stdin); }"
+        else:
+            gc = ("static char _ib[1 << 16]; static size_t _ip = 0, _il = 0;\n"
+                  "static inline int _gc(){ if(_ip == _il){ _il = fread(_ib, 1, sizeof _ib, stdin); _ip = 0; if(!_il) return EOF; } return (unsigned char)_ib[_ip++]; }\n"
+                  "static inline void _ungc(int c){ if(c != EOF) --_ip; }")
+        return {
+            # repr(float): the shortest digits that round-trip, positional for 1e-4 <= |x| < 1e16
+            "_fmt_double": """static inline int _fmt_double(double x, char* t){
+    if(x != x){ memcpy(t, "nan", 3); return 3; }
+    if(isinf(x)){ memcpy(t, x > 0 ? "inf" : "-inf", 3 + (x < 0)); return 3 + (x < 0); }
+    char d[32]; int n;
+#if defined(__cpp_lib_to_chars) && __cpp_lib_to_chars >= 201611L
+    n = to_chars(d, d + sizeof d - 1, x, chars_format::scientific).ptr - d;
+#else
+    for(int p = 0;; ++p){ n = snprintf(d, sizeof d, "%.*e", p, x); if(p >= 16 || strtod(d, nullptr) == x) break; }
+#endif
+    d[n] = 0;
+    char* ep = strchr(d, 'e'); int e = atoi(ep + 1), o = 0, k = 0;
+    char dig[24];
+    for(const char* p = d; p < ep; ++p){ if(*p == '-') t[o++] = '-'; else if(*p != '.') dig[k++] = *p; }
+    if(-4 <= e && e < 16){
+        if(e < 0){ t[o++] = '0'; t[o++] = '.'; for(int i = -1; i > e; --i) t[o++] = '0'; memcpy(t + o, dig, k); return o + k; }
+        for(int i = 0; i <= e; ++i) t[o++] = i < k ? dig[i] : '0';
+        t[o++] = '.';
+        if(k <= e + 1){ t[o++] = '0'; return o; }
+        memcpy(t + o, dig + e + 1, k - e - 1); return o + k - e - 1;
+    }
+    t[o++] = dig[0];
+    if(k > 1){ t[o++] = '.'; memcpy(t + o, dig + 1, k - 1); o += k - 1; }
+    return o + snprintf(t + o, 8, "e%c%02d", e < 0 ? '-' : '+', abs(e));
+}""",
+            "_wc _ws _flush": """static char _ob[1 << 16]; static size_t _op = 0;
+static inline void _flush(){ fwrite(_ob, 1, _op, stdout); _op = 0; fflush(stdout); }
+struct _OutFlusher { ~_OutFlusher(){ _flush(); } } _out_flusher;
+static inline void _wc(char c){ if(_op == sizeof _ob) _flush(); _ob[_op++] = c; }
+static inline void _ws(const char* s, size_t n){ if(n > sizeof _ob - _op){ _flush(); if(n > sizeof _ob){ fwrite(s, 1, n, stdout); return; } } memcpy(_ob + _op, s, n); _op += n; }""",
+            "_gc _ungc": gc,
+            "_out": """static inline void _out(long long x){ char t[24]; int n = 0; unsigned long long u = x < 0 ? 0ULL - (unsigned long long)x : x; if(x < 0) _wc('-'); do t[n++] = '0' + u % 10; while(u /= 10); while(n) _wc(t[--n]); }
+static inline void _out(int x){ _out((long long)x); }
+static inline void _out(bool x){ if(x) _ws("True", 4); else _ws("False", 5); }
+static inline void _out(char c){ _wc(c); }
+static inline void _out(double x){ char t[32]; _ws(t, _fmt_double(x, t)); }
+static inline void _out(const string& s){ _ws(s.data(), s.size()); }
+static inline void _out(const char* s){ _ws(s, strlen(s)); }
+template<typename T> void _out(const T& x){ ostringstream o; o << x; _out(o.str()); }
+template<typename T> void _out(const vector<T>& v){ _wc('['); for(size_t i = 0; i < v.size(); ++i){ if(i) _ws(", ", 2); _out(v[i]); } _wc(']'); }""",
+            "_print": """template<typename T> void _print(const T& x){ _out(x); }
+template<typename T, typename... R> void _print(const T& x, const R&... r){ _out(x); ((_wc(' '), _out(r)), ...); }""",
+            "_skip_ws": "static inline int _skip_ws(bool nl){ int c = _gc(); while(c == ' ' || c == '\\t' || c == '\\r' || (nl && c == '\\n')) c = _gc(); return c; }",
+            "_parse_int": "static inline long long _parse_int(int c){ bool neg = c == '-'; if(c == '-' || c == '+') c = _gc(); long long x = 0; while(c >= '0' && c <= '9'){ x = x * 10 + (c - '0'); c = _gc(); } while(c != EOF && !isspace(c)) c = _gc(); _ungc(c); return neg ? -x : x; }",
+            "_skip_line": "static inline void _skip_line(){ int c = _gc(); while(c != '\\n' && c != EOF) c = _gc(); }",
+            # int(input()): the int, then the rest of its line
+            "read_int": "static inline long long read_int(){ int c = _skip_ws(true); if(c == EOF) return 0; long long x = _parse_int(c); _skip_line(); return x; }",
+            # input(): one line without its terminator
+            "read_line": "static inline string read_line(){ string s; int c = _gc(); while(c != '\\n' && c != EOF){ s.push_back((char)c); c = _gc(); } if(!s.empty() && s.back() == '\\r') s.pop_back(); return s; }",
+            # map(int, input().split()): the ints on one line
+            "read_int_list": "static inline vector<long long> read_int_list(){ vector<long long> a; for(int c = _skip_ws(false); c != '\\n' && c != EOF; c = _skip_ws(false)) a.push_back(_parse_int(c)); return a; }",
+            # sys.stdin.read().split() / map(int, ...) over it: every remaining token
+            "read_all_ints": "static inline vector<long long> read_all_ints(){ vector<long long> a; for(int c = _skip_ws(true); c != EOF; c = _skip_ws(true)) a.push_back(_parse_int(c)); return a; }",
+            "read_tokens": "static inline vector<string> read_tokens(){ vector<string> r; for(int c = _skip_ws(true); c != EOF; c = _skip_ws(true)){ string s; while(c != EOF && !isspace(c)){ s.push_back((char)c); c = _gc(); } r.push_back(move(s)); } return r; }",
+            "read_all": "static inline string read_all(){ string s; for(int c = _gc(); c != EOF; c = _gc()) s.push_back((char)c); return s; }",
+            "to_ll": "static inline long long to_ll(const string& s){ size_t i = s.find_first_not_of(\" \\t\\r\\n+\"); long long v = 0; if(i != string::npos) from_chars(s.data() + i, s.data() + s.size(), v); return v; }",
+            "to_double": "static inline double to_double(const string& s){ try{ return stod(s); }catch(...){ return 0; } }",
+        }
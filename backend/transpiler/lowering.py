@@ -0,0 +1,460 @@
+import ast, re
+
+from transpiler.io_plan import split_source, int_list_reader
+from transpiler.infer import LL, STR, CHAR, SCALARS, kind, elem, vec, call_name, const_index, cpp_type
+
+# Lowering of Python builtins, container methods, slices and comprehensions to
+# STL code. Everything here returns C++ expression text; the runtime support it
+# needs lives in HELPERS and is only emitted when the program refers to it.
+
+HELPERS = {
+    "chash": """struct chash {
+    // splitmix64 keyed per run, so inputs crafted against std::hash can't force collisions
+    static uint64_t mix(uint64_t x){ x += 0x9e3779b97f4a7c15ULL; x = (x ^ (x >> 30)) * 0xbf58476d1ce4e5b9ULL; x = (x ^ (x >> 27)) * 0x94d049bb133111ebULL; return x ^ (x >> 31); }
+    static uint64_t seed(){ static const uint64_t s = chrono::steady_clock::now().time_since_epoch().count(); return s; }
+    size_t operator()(uint64_t x) const { return mix(x + seed()); }
+    size_t operator()(const string& s) const { return mix(hash<string>{}(s) + seed()); }
+    template<class A, class B> size_t operator()(const pair<A, B>& p) const { return mix((*this)(p.first) * 31 + (*this)(p.second)); }
+    template<class... T> size_t operator()(const tuple<T...>& t) const { size_t h = 0; apply([&](const auto&... x){ ((h = mix(h * 31 + (*this)(x))), ...); }, t); return h; }
+};""",
+    "py_modpow": "static inline long long py_modpow(long long b, long long e, long long m){ long long r = 1 % m; b %= m; if(b < 0) b += m; for(; e > 0; e >>= 1){ if(e & 1) r = (__int128)r * b % m; b = (__int128)b * b % m; } return r; }",
+    "py_slice": """const long long PY_NONE = LLONG_MIN;
+template<class C> C py_slice(const C& v, long long lo, long long hi, long long st = 1){
+    long long n = v.size();
+    auto fix = [&](long long i, long long none, long long a, long long b){ if(i == PY_NONE) return none; if(i < 0) i += n; return max(a, min(i, b)); };
+    C r;
+    if(st > 0){ lo = fix(lo, 0, 0, n); hi = fix(hi, n, 0, n); if(lo >= hi) return r; if(st == 1) return C(v.begin() + lo, v.begin() + hi); r.reserve((hi - lo + st - 1) / st); for(long long i = lo; i < hi; i += st) r.push_back(v[i]); }
+    else { lo = fix(lo, n - 1, -1, n - 1); hi = fix(hi, -1, -1, n - 1); if(lo <= hi) return r; r.reserve((lo - hi - st - 1) / -st); for(long long i = lo; i > hi; i += st) r.push_back(v[i]); }
+    return r;
+}""",
+    "py_list": "template<class C> auto py_list(C&& c){ using T = typename decay_t<C>::value_type; if constexpr (is_same_v<decay_t<C>, vector<T>>) return vector<T>(forward<C>(c)); else return vector<T>(c.begin(), c.end()); }",
+    "py_sorted": "template<class C> auto py_sorted(C&& c, bool rev = false){ auto v = py_list(forward<C>(c)); if(rev) sort(v.begin(), v.end(), greater<>()); else sort(v.begin(), v.end()); return v; }",
+    "py_sort_key": "template<class V, class K> void py_sort_key(V& v, K key, bool rev = false){ if(rev) stable_sort(v.begin(), v.end(), [&](const auto& a, const auto& b){ return key(b) < key(a); }); else stable_sort(v.begin(), v.end(), [&](const auto& a, const auto& b){ return key(a) < key(b); }); }",
+    "py_sorted_key": "template<class C, class K> auto py_sorted_key(C&& c, K key, bool rev = false){ auto v = py_list(forward<C>(c)); py_sort_key(v, key, rev); return v; }",
+    "py_reversed": "template<class C> auto py_reversed(const C& c){ return vector<typename C::value_type>(c.rbegin(), c.rend()); }",
+    "py_sum": "template<class T, class C> T py_sum(const C& c){ T s = 0; for(const auto& x : c) s += x; return s; }",
+    "py_any": "template<class C> bool py_any(const C& c){ for(const auto& x : c) if(x) return true; return false; }",
+    "py_all": "template<class C> bool py_all(const C& c){ for(const auto& x : c) if(!x) return false; return true; }",
+    "py_max": "template<class C> auto py_max(const C& c){ return *max_element(c.begin(), c.end()); }",
+    "py_min": "template<class C> auto py_min(const C& c){ return *min_element(c.begin(), c.end()); }",
+    "py_max_key": "template<class C, class K> auto py_max_key(const C& c, K key){ return *max_element(c.begin(), c.end(), [&](const auto& a, const auto& b){ return key(a) < key(b); }); }",
+    "py_min_key": "template<class C, class K> auto py_min_key(const C& c, K key){ return *min_element(c.begin(), c.end(), [&](const auto& a, const auto& b){ return key(a) < key(b); }); }",
+    "py_pop": "template<class C> auto py_pop(C& c){ auto x = move(c.back()); c.pop_back(); return x; }",
+    "py_pop_at": "template<class C> auto py_pop_at(C& c, long long i){ if(i < 0) i += c.size(); auto x = move(c[i]); c.erase(c.begin() + i); return x; }",
+    "py_popleft": "template<class C> auto py_popleft(C& c){ auto x = move(c.front()); c.pop_front(); return x; }",
+    "py_extend": "template<class C, class D> void py_extend(C& c, const D& d){ c.insert(c.end(), d.begin(), d.end()); }",
+    "py_remove": "template<class C, class T> void py_remove(C& c, const T& x){ c.erase(find(c.begin(), c.end(), x)); }",
+    "py_heappush": "template<class T> void py_heappush(vector<T>& h, const typename common_type<T>::type& x){ h.push_back(x); push_heap(h.begin(), h.end(), greater<>()); }",
+    "py_heappop": "template<class T> T py_heappop(vector<T>& h){ pop_heap(h.begin(), h.end(), greater<>()); T x = move(h.back()); h.pop_back(); return x; }",
+    "py_heapify": "template<class T> void py_heapify(vector<T>& h){ make_heap(h.begin(), h.end(), greater<>()); }",
+    "py_counter": "template<class C> auto py_counter(const C& c){ unordered_map<typename C::value_type, long long, chash> m; m.reserve(c.size()); for(const auto& x : c) ++m[x]; return m; }",
+    "py_set": "template<class C> auto py_set(const C& c){ unordered_set<typename C::value_type, chash> s; s.reserve(c.size()); s.insert(c.begin(), c.end()); return s; }",
+    "py_deque": "template<class C> auto py_deque(const C& c){ return deque<typename C::value_type>(c.begin(), c.end()); }",
+    "py_get": "template<class M> typename M::mapped_type py_get(const M& m, const typename M::key_type& k, const typename M::mapped_type& d = {}){ auto it = m.find(k); return it == m.end() ? d : it->second; }",
+    "py_keys": "template<class M> auto py_keys(const M& m){ vector<typename M::key_type> r; r.reserve(m.size()); for(const auto& kv : m) r.push_back(kv.first); return r; }",
+    "py_values": "template<class M> auto py_values(const M& m){ vector<typename M::mapped_type> r; r.reserve(m.size()); for(const auto& kv : m) r.push_back(kv.second); return r; }",
+    "py_items": "template<class M> auto py_items(const M& m){ return vector<pair<typename M::key_type, typename M::mapped_type>>(m.begin(), m.end()); }",
+    "py_in": "template<class C, class T> bool py_in(const C& c, const T& x){ return find(c.begin(), c.end(), x) != c.end(); }",
+    "py_count": """static inline long long py_count(const string& s, const string& t){ if(t.empty()) return s.size() + 1; long long c = 0; for(size_t i = s.find(t); i != string::npos; i = s.find(t, i + t.size())) ++c; return c; }
+template<class C, class T> long long py_count(const C& c, const T& x){ return count(c.begin(), c.end(), x); }""",
+    "py_index": "template<class C, class T> long long py_index(const C& c, const T& x){ return find(c.begin(), c.end(), x) - c.begin(); }",
+    "py_bisect_left": "template<class C, class T> long long py_bisect_left(const C& a, const T& x){ return lower_bound(a.begin(), a.end(), x) - a.begin(); }",
+    "py_bisect_right": "template<class C, class T> long long py_bisect_right(const C& a, const T& x){ return upper_bound(a.begin(), a.end(), x) - a.begin(); }",
+    "py_str": """template<class T> string py_str(const T& x){ ostringstream o; o << x; return o.str(); }
+static inline string py_str(double x){ char t[32]; return string(t, _fmt_double(x, t)); }""",
+    "py_join": "template<class C> string py_join(const string& sep, const C& c){ ostringstream o; bool first = true; for(const auto& x : c){ if(!first) o << sep; first = false; o << x; } return o.str(); }",
+    "py_split": """static inline vector<string> py_split(const string& s){ vector<string> r; istringstream is(s); string w; while(is >> w) r.push_back(w); return r; }
+static inline vector<string> py_split(const string& s, const string& sep){ vector<string> r; size_t i = 0, j; while((j = s.find(sep, i)) != string::npos){ r.push_back(s.substr(i, j - i)); i = j + sep.size(); } r.push_back(s.substr(i)); return r; }""",
+    "py_strip": "static inline string py_strip(const string& s, bool l = true, bool r = true){ const char* ws = \" \\t\\r\\n\"; size_t a = l ? s.find_first_not_of(ws) : 0; if(a == string::npos) return \"\"; size_t b = r ? s.find_last_not_of(ws) : s.size() - 1; return s.substr(a, b - a + 1); }",
+    "py_upper": "static inline string py_upper(string s){ for(auto& c : s) c = toupper(c); return s; }",
+    "py_lower": "static inline string py_lower(string s){ for(auto& c : s) c = tolower(c); return s; }",
+    "py_int": "template<class T> long long py_int(const T& x){ if constexpr (is_same_v<T, string>) return to_ll(x); else if constexpr (is_same_v<T, char>) return x - '0'; else return (long long)x; }",
+    "py_float": "template<class T> double py_float(const T& x){ if constexpr (is_same_v<T, string>) return to_double(x); else if constexpr (is_same_v<T, char>) return x - '0'; else return (double)x; }",
+    "py_truthy": "template<class T> bool py_truthy(const T& x){ if constexpr (is_arithmetic_v<T>) return x != 0; else return !x.empty(); }",
+    "py_range": "static inline vector<long long> py_range(long long lo, long long hi, long long st = 1){ vector<long long> r; if(st > 0){ if(hi > lo) r.reserve((hi - lo + st - 1) / st); for(long long i = lo; i < hi; i += st) r.push_back(i); } else for(long long i = lo; i > hi; i += st) r.push_back(i); return r; }",
+    "py_enumerate": "template<class C> auto py_enumerate(const C& c, long long start = 0){ vector<pair<long long, typename C::value_type>> r; r.reserve(c.size()); for(const auto& x : c) r.emplace_back(start++, x); return r; }",
+    "py_zip _zip_t": """template<class... T> struct _zip_t { using type = tuple<T...>; };
+template<class A, class B> struct _zip_t<A, B> { using type = pair<A, B>; };
+template<class... C> auto py_zip(const C&... c){
+    size_t n = min({(size_t)c.size()...});
+    vector<typename _zip_t<typename C::value_type...>::type> r; r.reserve(n);
+    for(size_t i = 0; i < n; ++i) r.emplace_back(c[i]...);
+    return r;
+}""",
+    "py_most_common": """// Counter.most_common: by count, ties by key (Python keeps first-insertion order, which a hash map doesn't have)
+template<class M> auto py_most_common(const M& m, long long k = -1){
+    vector<pair<typename M::key_type, typename M::mapped_type>> r(m.begin(), m.end());
+    auto by = [](const auto& a, const auto& b){ return a.second != b.second ? a.second > b.second : a.first < b.first; };
+    if(k >= 0 && k < (long long)r.size()){ partial_sort(r.begin(), r.begin() + k, r.end(), by); r.resize(k); } else sort(r.begin(), r.end(), by);
+    return r;
+}""",
+    "py_set_and py_set_or py_set_sub py_set_xor": """template<class S> S py_set_and(const S& a, const S& b){ if(a.size() > b.size()) return py_set_and(b, a); S r; for(const auto& x : a) if(b.count(x)) r.insert(x); return r; }
+template<class S> S py_set_or(S a, const S& b){ a.insert(b.begin(), b.end()); return a; }
+template<class S> S py_set_sub(const S& a, const S& b){ S r; for(const auto& x : a) if(!b.count(x)) r.insert(x); return r; }
+template<class S> S py_set_xor(const S& a, const S& b){ S r = py_set_sub(a, b); for(const auto& x : b) if(!a.count(x)) r.insert(x); return r; }""",
+    "py_floordiv py_mod": """template<class A, class B> auto py_floordiv(A a, B b){ if constexpr (is_floating_point_v<common_type_t<A, B>>) return floor((double)a / b); else { auto q = a / b; return q - (a % b != 0 && (a < 0) != (b < 0)); } }
+template<class A, class B> auto py_mod(A a, B b){ if constexpr (is_floating_point_v<common_type_t<A, B>>){ double r = fmod(a, b); return r != 0 && (r < 0) != (b < 0) ? r + b : r; } else { auto r = a % b; return r != 0 && (r < 0) != (b < 0) ? r + b : r; } }""",
+    "py_repeat": """static inline string py_repeat(char c, long long n){ return string(max(0LL, n), c); }
+template<class C> C py_repeat(const C& c, long long n){ C r; if(n > 0) r.reserve(c.size() * n); for(long long i = 0; i < n; ++i) r.insert(r.end(), c.begin(), c.end()); return r; }""",
+    "py_print_seq": "template<class C, class S = char> void py_print_seq(const C& c, const S& sep = ' '){ bool first = true; for(const auto& x : c){ if(!first) _out(sep); first = false; _out(x); } }",
+}
+
+def helper_block(body: str, first: dict = None, last: dict = None):
+    # helpers referenced by `body`, plus the ones they use, in definition order;
+    # a key lists the names its code provides. `first` is emitted ahead of HELPERS, `last` after.
+    helpers = {**(first or {}), **HELPERS, **(last or {})}
+    need, text = set(), body
+    while True:
+        # one identifier scan per round instead of a regex search per helper name
+        words = set(re.findall(r"\w+", text))
+        new = {k for k in helpers if k not in need and any(n in words for n in k.split())}
+        if not new: break
+        need |= new
+        text = "\n".join(helpers[k] for k in new)
+    return [helpers[k] for k in helpers if k in need]
+
+def _scalar(t): return t in SCALARS
+
+def _ref(t):
+    # loop/unpack bindings: scalars by value (Python rebinding never writes
+    # back), everything else aliases like Python does
+    return "auto" if _scalar(t) else "auto&&"
+
+def is_empty_ctor(node):
+    if isinstance(node, (ast.List, ast.Set, ast.Dict)): return not (node.elts if not isinstance(node, ast.Dict) else node.keys)
+    return isinstance(node, ast.Call) and call_name(node) in ("list", "set", "dict", "deque", "Counter", "defaultdict") \
+        and not node.keywords and (not node.args or call_name(node) == "defaultdict")
+
+def init_for(value, t, em):
+    # value of a freshly typed container slot: `[]`, `set()`, `defaultdict(list)`... become T()
+    ct = cpp_type(t)
+    if ct and is_empty_ctor(value): return f"{ct}()"
+    if isinstance(value, (ast.ListComp, ast.SetComp, ast.DictComp)): return lower_comp(value, em, t)
+    return em.expr(value)
+
+def _seq(node, em):
+    # names are reused as-is; anything else is bound once so it isn't re-evaluated
+    if isinstance(node, ast.Name): return node.id, ""
+    tmp = em.fresh("s")
+    return tmp, f"auto&& {tmp} = {em.expr(node)}; "
+
+def _bind(target, src, t, em):
+    if isinstance(target, ast.Name): return [f"{_ref(t)} {target.id} = {src};"]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        parts = t[1:] if kind(t) == "tuple" and len(t) == len(target.elts) + 1 else [None] * len(target.elts)
+        out = []
+        for i, (e, p) in enumerate(zip(target.elts, parts)):
+            out += _bind(e, f"get<{i}>({src})" if kind(t) != "vector" else f"{src}[{i}]", p, em)
+        return out
+    return [unsupported(target, "loop target") + ";"]
+
+def range_head(var, decl, args, em):
+    a = [em.expr(x) for x in args]
+    if len(a) == 1: return f"for ({decl}{var} = 0; {var} < {a[0]}; ++{var})"
+    if len(a) == 2: return f"for ({decl}{var} = {a[0]}; {var} < {a[1]}; ++{var})"
+    cmp = ">" if a[2].startswith("-") or a[2].startswith("(-") else "<"
+    return f"for ({decl}{var} = {a[0]}; {var} {cmp} {a[1]}; {var} += {a[2]})"
+
+def loop_head(target, it, em, decl="long long "):
+    # -> (code before the loop, the `for (...)` header, statements opening the body)
+    n = call_name(it) if isinstance(it, ast.Call) else None
+    t = em.type_of(it)
+    if n == "range" and isinstance(target, ast.Name):
+        return "", range_head(target.id, decl, it.args, em), []
+    if n == "reversed" and it.args:
+        src = it.args[0]
+        if call_name(src) == "range" and len(src.args) in (1, 2) and isinstance(target, ast.Name):
+            lo, hi = ("0", em.expr(src.args[0])) if len(src.args) == 1 else (em.expr(src.args[0]), em.expr(src.args[1]))
+            v = target.id
+            return "", f"for ({decl}{v} = {hi} - 1; {v} >= {lo}; --{v})", []
+        seq, pre = _seq(src, em)
+        i = em.fresh("it")
+        return pre, f"for (auto {i} = {seq}.rbegin(); {i} != {seq}.rend(); ++{i})", _bind(target, f"*{i}", elem(em.type_of(src)), em)
+    if n == "enumerate" and it.args and isinstance(target, ast.Tuple) and len(target.elts) == 2:
+        seq, pre = _seq(it.args[0], em)
+        i = em.fresh("i")
+        idx = f"{i} + {em.expr(it.args[1])}" if len(it.args) > 1 else i
+        body = _bind(target.elts[0], idx, LL, em) + _bind(target.elts[1], f"{seq}[{i}]", elem(em.type_of(it.args[0])), em)
+        return pre, f"for (long long {i} = 0; {i} < (long long){seq}.size(); ++{i})", body
+    if n == "zip" and it.args and isinstance(target, ast.Tuple) and len(target.elts) == len(it.args):
+        seqs, pre = zip(*(_seq(a, em) for a in it.args))
+        i = em.fresh("i")
+        size = f"{seqs[0]}.size()" if len(seqs) == 1 else f"min({{{', '.join(f'{s}.size()' for s in seqs)}}})"
+        body = []
+        for e, s, a in zip(target.elts, seqs, it.args): body += _bind(e, f"{s}[{i}]", elem(em.type_of(a)), em)
+        return "".join(pre), f"for (long long {i} = 0; {i} < (long long){size}; ++{i})", body
+    view = it.func.attr if isinstance(it, ast.Call) and isinstance(it.func, ast.Attribute) and not it.args else None
+    if view in ("items", "keys", "values") and kind(em.type_of(it.func.value)) == "map":
+        m = em.type_of(it.func.value)
+        kv = em.fresh("kv")
+        head = f"for (auto& {kv} : {em.expr(it.func.value)})"
+        if view == "items":
+            if isinstance(target, ast.Tuple) and len(target.elts) == 2:
+                return "", head, _bind(target.elts[0], f"{kv}.first", m[1], em) + _bind(target.elts[1], f"{kv}.second", m[2], em)
+            return "", head, _bind(target, kv, ("tuple", m[1], m[2]), em)
+        return "", head, _bind(target, f"{kv}.{'first' if view == 'keys' else 'second'}", m[1] if view == "keys" else m[2], em)
+    if kind(t) == "map":
+        kv = em.fresh("kv")
+        return "", f"for (auto& {kv} : {em.expr(it)})", _bind(target, f"{kv}.first", t[1], em)
+    if isinstance(it, ast.Tuple) and cpp_type(elem(t)):
+        # a pair/tuple isn't iterable: loop over the values instead
+        it_code = f"initializer_list<{cpp_type(elem(t))}>{{{', '.join(em.expr(e) for e in it.elts)}}}"
+        if isinstance(target, ast.Name): return "", f"for ({_ref(elem(t))} {target.id} : {it_code})", []
+        e = em.fresh("e")
+        return "", f"for (auto&& {e} : {it_code})", _bind(target, e, elem(t), em)
+    if isinstance(target, ast.Name):
+        return "", f"for ({_ref(elem(t))} {target.id} : {em.expr(it)})", []
+    e = em.fresh("e")
+    return "", f"for (auto&& {e} : {em.expr(it)})", _bind(target, e, elem(t), em)
+
+def _loops(gens, em, inner: str) -> str:
+    code = inner
+    for g in reversed(gens):
+        for c in reversed(g.ifs): code = f"if ({em.expr(c)}) {{ {code} }}"
+        pre, head, body = loop_head(g.target, g.iter, em)
+        code = f"{pre}{head} {{ {' '.join(body + [code])} }}"
+    return code
+
+def _size_hint(gens, em):
+    # exact result size for a single unfiltered generator, else None
+    if len(gens) != 1 or gens[0].ifs: return None
+    it = gens[0].iter
+    if call_name(it) == "range" and isinstance(it, ast.Call):
+        if len(it.args) == 1: return f"max(0LL, (long long)({em.expr(it.args[0])}))"
+        if len(it.args) == 2: return f"max(0LL, (long long)({em.expr(it.args[1])}) - ({em.expr(it.args[0])}))"
+        return None
+    if isinstance(it, ast.Name) and (kind(em.type_of(it)) in ("vector", "deque", "set", "map") or em.type_of(it) == STR):
+        return f"{it.id}.size()"
+    return None
+
+def _names(node): return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+def lower_comp(node, em, t=None):
+    # list/set/dict comprehensions -> an immediately invoked lambda filling a
+    # pre-sized container; `[x for _ in range(n)]` -> the fill constructor
+    t = t if cpp_type(t) else em.type_of(node)
+    if kind(t) == "gen": t = vec(t[1])
+    ct = cpp_type(t) or {ast.DictComp: "unordered_map<long long, long long, chash>",
+                         ast.SetComp: "unordered_set<long long, chash>"}.get(type(node), "vector<long long>")
+    gens = node.generators
+    if isinstance(node, (ast.ListComp, ast.GeneratorExp)) and len(gens) == 1 and not gens[0].ifs \
+            and call_name(gens[0].iter) == "range" and len(gens[0].iter.args) == 1 \
+            and not (_names(node.elt) & _names(gens[0].target)) \
+            and not any(isinstance(n, (ast.Call, ast.ListComp, ast.SetComp, ast.DictComp)) and not is_empty_ctor(n) for n in ast.walk(node.elt)):
+        return f"{ct}({_size_hint(gens, em)}, {init_for(node.elt, t[1] if kind(t) == 'vector' else None, em)})"
+    r = em.fresh("r")
+    if isinstance(node, ast.DictComp): add = f"{r}[{em.expr(node.key)}] = {em.expr(node.value)};"
+    elif isinstance(node, ast.SetComp): add = f"{r}.insert({em.expr(node.elt)});"
+    else: add = f"{r}.push_back({em.expr(node.elt)});"
+    size = _size_hint(gens, em)
+    reserve = f"{r}.reserve({size}); " if size else ""
+    return f"[&]{{ {ct} {r}; {reserve}{_loops(gens, em, add)} return {r}; }}()"
+
+def _fold(fn, gen, em, start=None):
+    # sum/any/all/max/min over a comprehension in one pass, without building it
+    elt, gens = gen.elt, gen.generators
+    if fn == "any": return f"[&]{{ {_loops(gens, em, f'if ({em.expr(elt)}) return true;')} return false; }}()"
+    if fn == "all": return f"[&]{{ {_loops(gens, em, f'if (!({em.expr(elt)})) return false;')} return true; }}()"
+    t = em.type_of(elt)
+    ct = cpp_type(LL if t in (None, "bool", CHAR) and fn == "sum" else t)
+    if ct is None: return None
+    acc = em.fresh("acc")
+    if fn == "sum":
+        init = em.expr(start) if start is not None else "0"
+        return f"[&]{{ {ct} {acc} = {init}; {_loops(gens, em, f'{acc} += {em.expr(elt)};')} return {acc}; }}()"
+    x, first = em.fresh("x"), em.fresh("first")
+    cmp = ">" if fn == "max" else "<"
+    step = f"{ct} {x} = {em.expr(elt)}; if ({first} || {x} {cmp} {acc}) {{ {acc} = {x}; {first} = false; }}"
+    return f"[&]{{ {ct} {acc}{{}}; bool {first} = true; {_loops(gens, em, step)} return {acc}; }}()"
+
+def callable_expr(node, em):
+    # key=/map() functions as C++ callables
+    if isinstance(node, ast.Lambda):
+        params = ", ".join(f"const auto& {a.arg}" for a in node.args.args)
+        return f"[&]({params}){{ return {em.expr(node.body)}; }}"
+    if isinstance(node, ast.Name):
+        builtin = {
+            "len": "[](const auto& x){ return (long long)x.size(); }",
+            "abs": "[](const auto& x){ return abs(x); }",
+            "str": "[](const auto& x){ return py_str(x); }",
+            "int": "[](const auto& x){ return py_int(x); }",
+            "float": "[](const auto& x){ return py_float(x); }",
+            "bool": "[](const auto& x){ return py_truthy(x); }",
+            "ord": "[](const auto& x){ if constexpr (is_same_v<decay_t<decltype(x)>, string>) return (long long)(unsigned char)x[0]; else return (long long)(unsigned char)x; }",
+            "chr": "[](const auto& x){ return string(1, (char)x); }",
+            "sum": "[](const auto& x){ return py_sum<common_type_t<long long, decay_t<decltype(*begin(x))>>>(x); }",
+            "max": "[](const auto& x){ return py_max(x); }",
+            "min": "[](const auto& x){ return py_min(x); }",
+            "sorted": "[](const auto& x){ return py_sorted(x); }",
+            "list": "[](const auto& x){ return py_list(x); }",
+            "set": "[](const auto& x){ return py_set(x); }",
+        }
+        if node.id in builtin: return builtin[node.id]
+        if em.info and node.id in em.info.funcs: return f"[&](const auto& x){{ return {node.id}(x); }}"
+        if em.is_declared(node.id): return node.id
+    # str.upper, math.floor, a builtin without a lowering...: not a C++ callable
+    return unsupported(node, f"`{ast.unparse(node)}` as a function")
+
+def _iterable(node, em):
+    # C++ container expression for an iterable argument (maps iterate keys)
+    if isinstance(node, (ast.ListComp, ast.GeneratorExp)): return lower_comp(node, em)
+    if isinstance(node, ast.Call) and call_name(node) == "map" and len(node.args) == 2:
+        m = node.args[1]
+        if isinstance(node.args[0], ast.Name) and node.args[0].id == "int" and split_source(m) is not None:
+            return int_list_reader(m)
+        (seq, pre), fn, r = _seq(m, em), em.fresh("f"), em.fresh("r")
+        return (f"[&]{{ {pre}auto {fn} = {callable_expr(node.args[0], em)}; vector<decay_t<decltype({fn}(*begin({seq})))>> {r}; "
+                f"{r}.reserve({seq}.size()); for (auto&& x : {seq}) {r}.push_back({fn}(x)); return {r}; }}()")
+    if kind(em.type_of(node)) == "map": return f"py_keys({em.expr(node)})"
+    return em.expr(node)
+
+def _flag(node, em):
+    if node is None or isinstance(node, ast.Constant) and node.value is False: return None
+    return em.expr(node)
+
+def lower_call(node, em):
+    n = call_name(node)
+    if n is None or (em.info and n in em.info.funcs): return None
+    args, kw = node.args, {k.arg: k.value for k in node.keywords}
+    ex = em.expr
+    gen = args[0] if args and isinstance(args[0], (ast.GeneratorExp, ast.ListComp)) else None
+    if n == "sorted" and args:
+        rev = _flag(kw.get("reverse"), em)
+        tail = f", {rev}" if rev else ""
+        if kw.get("key") is not None: return f"py_sorted_key({_iterable(args[0], em)}, {callable_expr(kw['key'], em)}{tail})"
+        return f"py_sorted({_iterable(args[0], em)}{tail})"
+    if n in ("sum", "any", "all") and args:
+        if gen is not None:
+            r = _fold(n, gen, em, args[1] if len(args) > 1 else None)
+            if r: return r
+        if n != "sum": return f"py_{n}({_iterable(args[0], em)})"
+        ct = cpp_type(em.type_of(node)) or "long long"
+        s = f"py_sum<{ct}>({_iterable(args[0], em)})"
+        return f"({ex(args[1])} + {s})" if len(args) > 1 else s
+    if n in ("max", "min") and args:
+        if len(args) == 1:
+            if "key" in kw: return f"py_{n}_key({_iterable(args[0], em)}, {callable_expr(kw['key'], em)})"
+            if gen is not None:
+                r = _fold(n, gen, em)
+                if r: return r
+            return f"py_{n}({_iterable(args[0], em)})"
+        ct = cpp_type(em.type_of(node))
+        targ = f"<{ct}>" if ct else ""
+        vals = [ex(a) for a in args]
+        return f"{n}{targ}({vals[0]}, {vals[1]})" if len(vals) == 2 else f"{n}{targ}({{{', '.join(vals)}}})"
+    if n == "reversed" and len(args) == 1: return f"py_reversed({_iterable(args[0], em)})"
+    if n == "pow" and len(args) == 3: return f"py_modpow({ex(args[0])}, {ex(args[1])}, {ex(args[2])})"
+    if n == "pow" and len(args) == 2:
+        return f"{'ipow' if em.type_of(node) == LL else 'pow'}({ex(args[0])}, {ex(args[1])})"
+    if n == "abs" and len(args) == 1: return f"abs({ex(args[0])})"
+    if n in ("gcd", "lcm") and len(args) == 2: return f"{n}({ex(args[0])}, {ex(args[1])})"
+    if n == "sqrt" and len(args) == 1: return f"sqrt((double)({ex(args[0])}))"
+    if n in ("floor", "ceil") and len(args) == 1: return f"(long long){n}({ex(args[0])})"
+    if n == "str" and len(args) == 1:
+        t = em.type_of(args[0])
+        if t == STR: return ex(args[0])
+        if t == CHAR: return f"string(1, {ex(args[0])})"
+        return f"to_string({ex(args[0])})" if t == LL else f"py_str({ex(args[0])})"
+    if n in ("heappush", "heappop", "heapify") and args: return f"py_{n}({', '.join(ex(a) for a in args)})"
+    if n in ("bisect", "bisect_left", "bisect_right") and len(args) == 2:
+        return f"py_{'bisect_right' if n == 'bisect' else n}({ex(args[0])}, {ex(args[1])})"
+    if n in ("list", "set", "deque", "Counter", "dict", "defaultdict"):
+        if is_empty_ctor(node):
+            ct = cpp_type(em.type_of(node))
+            return f"{ct}()" if ct else "{}"
+        if n == "set" and gen is not None: return lower_comp(ast.SetComp(elt=gen.elt, generators=gen.generators), em, em.type_of(node))
+        if n == "list" and gen is not None: return lower_comp(gen, em, em.type_of(node))
+        ct = cpp_type(em.type_of(node))
+        if n in ("list", "set", "deque") and ct and isinstance(args[0], (ast.List, ast.Tuple, ast.Set)):
+            return f"{ct}{{{', '.join(ex(e) for e in args[0].elts)}}}"
+        src = _iterable(args[0], em)
+        return {"list": f"py_list({src})", "set": f"py_set({src})", "deque": f"py_deque({src})",
+                "Counter": f"py_counter({src})"}.get(n)
+    if n == "map" and len(args) == 2: return _iterable(node, em)
+    # range/zip/enumerate used as values rather than loop heads: materialized
+    if n == "range" and 1 <= len(args) <= 3:
+        a = [ex(x) for x in args]
+        return f"py_range({', '.join(['0'] + a if len(a) == 1 else a)})"
+    if n == "zip" and args: return f"py_zip({', '.join(_iterable(a, em) for a in args)})"
+    if n == "enumerate" and args: return f"py_enumerate({', '.join([_iterable(args[0], em)] + [ex(a) for a in args[1:2]])})"
+    return None
+
+SET_OPS = {ast.BitAnd: "py_set_and", ast.BitOr: "py_set_or", ast.Sub: "py_set_sub", ast.BitXor: "py_set_xor"}
+
+def lower_set_op(op, left: str, right: str):
+    fn = SET_OPS.get(type(op))
+    return f"{fn}({left}, {right})" if fn else None
+
+def unsupported(node, what: str) -> str:
+    # doesn't compile on purpose; transpile() reports each one in its diagnostics
+    return f"py_unsupported /* {what}, line {getattr(node, 'lineno', '?')} */"
+
+def lower_method(node, em, stmt=False):
+    f = node.func
+    attr, t = f.attr, em.type_of(f.value)
+    k, x = kind(t), em.expr(f.value)
+    args = [em.expr(a) for a in node.args]
+    kw = {a.arg: a.value for a in node.keywords}
+    if attr == "append" and len(args) == 1: return f"{x}.push_back({args[0]})"
+    if attr == "appendleft" and len(args) == 1: return f"{x}.push_front({args[0]})"
+    if attr == "extend" and len(args) == 1: return f"py_extend({x}, {_iterable(node.args[0], em)})"
+    if attr == "insert" and len(args) == 2 and k != "set": return f"{x}.insert({x}.begin() + {args[0]}, {args[1]})"
+    if attr == "pop" and k != "map":
+        if args: return f"py_pop_at({x}, {args[0]})"
+        return f"{x}.pop_back()" if stmt else f"py_pop({x})"
+    if attr == "popleft" and not args: return f"{x}.pop_front()" if stmt else f"py_popleft({x})"
+    if attr == "sort" and not args:
+        rev = _flag(kw.get("reverse"), em)
+        if kw.get("key") is not None: return f"py_sort_key({x}, {callable_expr(kw['key'], em)}{', ' + rev if rev else ''})"
+        if rev and rev != "true": return f"py_sort_key({x}, [](const auto& e){{ return e; }}, {rev})"
+        return f"sort({'rall' if rev else 'all'}({x}))"
+    if attr == "reverse" and not args: return f"reverse(all({x}))"
+    if attr == "add" and len(args) == 1: return f"{x}.insert({args[0]})"
+    if attr in ("remove", "discard") and len(args) == 1:
+        return f"{x}.erase({args[0]})" if k in ("set", "map") else f"py_remove({x}, {args[0]})"
+    if attr == "clear" and not args: return f"{x}.clear()"
+    if attr == "copy" and not args: return x
+    if attr == "get" and args: return f"py_get({x}, {', '.join(args)})"
+    if attr in ("keys", "values", "items") and not args: return f"py_{attr}({x})"
+    if attr == "most_common" and len(args) <= 1: return f"py_most_common({', '.join([x] + args)})"
+    if attr == "count" and len(args) == 1: return f"py_count({x}, {args[0]})"
+    if attr in ("index", "find") and len(args) == 1:
+        return f"(long long){x}.find({args[0]})" if t == STR else f"py_index({x}, {args[0]})"
+    if attr == "join" and len(args) == 1:
+        src = node.args[0]
+        if isinstance(src, ast.Call) and call_name(src) == "map" and len(src.args) == 2 \
+                and isinstance(src.args[0], ast.Name) and src.args[0].id == "str":
+            return f"py_join({x}, {_iterable(src.args[1], em)})"
+        return f"py_join({x}, {_iterable(src, em)})"
+    if attr == "split": return f"py_split({', '.join([x] + args[:1])})"
+    if attr in ("strip", "lstrip", "rstrip") and not args:
+        return {"strip": f"py_strip({x})", "lstrip": f"py_strip({x}, true, false)", "rstrip": f"py_strip({x}, false, true)"}[attr]
+    if attr in ("upper", "lower") and not args: return f"py_{attr}({x})"
+    return None
+
+def lower_in(left, right, em):
+    x, t = em.expr(left), em.type_of(right)
+    if isinstance(right, (ast.List, ast.Tuple, ast.Set)) and isinstance(left, (ast.Name, ast.Constant)) and right.elts:
+        return "(" + " || ".join(f"{x} == {char_or_expr(e, em.type_of(left), em)}" for e in right.elts) + ")"
+    if kind(t) in ("set", "map"): return f"({em.expr(right)}.count({x}) != 0)"
+    if t == STR: return f"({em.expr(right)}.find({x}) != string::npos)"
+    return f"py_in({_iterable(right, em)}, {x})"
+
+def char_or_expr(node, other_t, em):
+    # 1-char string literals compared against chars (s[i] == "a") become char literals
+    if other_t == CHAR and isinstance(node, ast.Constant) and isinstance(node.value, str) and len(node.value) == 1:
+        return "'" + {"'": "\\'", "\\": "\\\\", "\n": "\\n", "\t": "\\t"}.get(node.value, node.value) + "'"
+    return em.expr(node)
+
+def lower_subscript(node, em):
+    base, t, s = em.expr(node.value), em.type_of(node.value), node.slice
+    if isinstance(s, ast.Slice):
+        parts = [em.expr(p) if p is not None else "PY_NONE" for p in (s.lower, s.upper)]
+        if s.step is not None: parts.append(em.expr(s.step))
+        return f"py_slice({base}, {', '.join(parts)})"
+    i = const_index(s)
+    if kind(t) == "tuple" and i is not None:
+        return f"get<{i if i >= 0 else len(t) - 1 + i}>({base})"
+    if i is not None and i < 0 and kind(t) != "map": return f"{base}.end()[{i}]"
+    return f"{base}[{char_or_expr(s, t[1] if kind(t) == 'map' else None, em)}]"
+
@@ -0,0 +1,75 @@
+import ast, os, struct
+
+# Loop-level profiling for transpiled programs. Every for/while statement gets a
+# slot of counters in a file the program maps shared, so the numbers survive a
+# TLE kill: a loop still running at the end is charged up to the moment the
+# run finished. Comprehensions are expressions and aren't counted.
+
+PROFILE_FILE = "py2cpp.prof"
+# per loop: iterations, entries (outermost), inclusive ns, open depth, entry time
+SLOT = struct.Struct("<5q")
+
+HELPERS = {
+    "_ProfLoop _prof": """#include <sys/mman.h>
+#include <fcntl.h>
+#include <unistd.h>
+struct _ProfSlot { long long hits, entries, ns, depth, since; };
+static inline long long _prof_now(){ timespec t; clock_gettime(CLOCK_MONOTONIC, &t); return t.tv_sec * 1000000000LL + t.tv_nsec; }
+// counters live in the runner's py2cpp.prof when it exists, in plain memory otherwise
+static _ProfSlot* _prof = [](){
+    size_t bytes = _PROF_LOOPS * sizeof(_ProfSlot);
+    int fd = open("py2cpp.prof", O_RDWR);
+    void* p = fd >= 0 ? mmap(nullptr, bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0) : MAP_FAILED;
+    if(fd >= 0) close(fd);
+    return (_ProfSlot*)(p != MAP_FAILED ? p : calloc(_PROF_LOOPS, sizeof(_ProfSlot)));
+}();
+// times one loop statement; recursion re-entering a running loop isn't timed twice
+struct _ProfLoop {
+    _ProfSlot& s;
+    _ProfLoop(int id) : s(_prof[id]) { if(!s.depth++){ ++s.entries; s.since = _prof_now(); } }
+    ~_ProfLoop(){ if(!--s.depth) s.ns += _prof_now() - s.since; }
+};""",
+}
+
+def begin_loop(node, em):
+    # opens a block timing the loop statement and returns its id (None when not
+    # profiling); the caller closes the block after the loop
+    if em.loops is None: return None
+    i = len(em.loops)
+    em.loops.append({"id": i, "line": node.lineno, "endLine": node.end_lineno,
+                     "kind": "for" if isinstance(node, ast.For) else "while", "function": em.scope})
+    em.write(f"{{ _ProfLoop _pl{i}({i});")
+    return i
+
+def count_iteration(i, em):
+    if i is not None: em.write(f"++_prof[{i}].hits;")
+
+def prepare(d: str, loops) -> str:
+    path = os.path.join(d, PROFILE_FILE)
+    with open(path, "wb") as f: f.truncate(max(1, len(loops)) * SLOT.size)
+    return path
+
+def _nested(outer, inner) -> bool:
+    return outer is not inner and outer["function"] == inner["function"] \
+        and outer["line"] < inner["line"] and inner["endLine"] <= outer["endLine"]
+
+# Counters from a finished run, one entry per loop in source order. selfMs leaves
+# out loops nested in the same function; share is of the run's wall time.
+def read(path: str, loops, end_ns: int, wall_ms: float) -> list:
+    with open(path, "rb") as f: data = f.read()
+    out = []
+    for loop, (hits, entries, ns, depth, since) in zip(loops, SLOT.iter_unpack(data[:len(loops) * SLOT.size])):
+        if depth > 0: ns += max(0, end_ns - since)
+        out.append({**loop, "hits": hits, "entries": entries, "ms": round(ns / 1e6, 3), "running": depth > 0})
+    for p in out:
+        inner = [c for c in out if _nested(p, c) and not any(_nested(m, c) and _nested(p, m) for m in out)]
+        p["selfMs"] = round(max(0.0, p["ms"] - sum(c["ms"] for c in inner)), 3)
+        p["share"] = round(min(1.0, p["ms"] / wall_ms), 4) if wall_ms > 0 else 0.0
+    return out
+
+def summary(profile: list) -> dict:
+    # lineMs: a loop's own time on its header line, what the editor heatmap shows
+    heat = {}
+    for p in profile: heat[p["line"]] = round(heat.get(p["line"], 0.0) + p["selfMs"], 3)
+    hottest = max(profile, key=lambda p: p["selfMs"])["line"] if profile else None
+    return {"loops": profile, "lineMs": heat, "hottestLine": hottest}
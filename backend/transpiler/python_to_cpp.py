@@ -1,12 +1,30 @@
-import ast
+import ast, re
+
+from transpiler.infer import TypeInfo, MAIN, MODULES, ANY, LL, BOOL, DOUBLE, CHAR, STR, cpp_type, kind, elem, call_name
+from transpiler.io_plan import IOPlan, is_line_read, is_bulk_read, is_stdin_alias, split_source, int_list_reader
+from transpiler.lowering import (helper_block, init_for, is_empty_ctor, loop_head, lower_call, lower_method, lower_comp,
+                                 lower_in, lower_subscript, lower_set_op, char_or_expr, callable_expr, unsupported)
+from transpiler import recursion, profiling
+from transpiler.recursion import is_memoized, is_setrecursionlimit, cache_clear, emit_memo_wrapper, stack_bytes
 
 IND = "    "
+HELPERS_MARK = "// @@helpers@@"
+DIAGNOSTICS_MARK = "// @@diagnostics@@"
+_UNSUPPORTED = re.compile(r"py_unsupported /\* (.*?), line (\d+|\?) \*/")
+# math module constants, by attribute
+_MATH_CONSTS = {"pi": "M_PI", "e": "M_E", "inf": "INFINITY", "tau": "(2 * M_PI)"}
 
 class Emitter:
-    def __init__(self):
+    def __init__(self, info: TypeInfo = None):
         self.lines = []
         self.level = 0
         self.scopes = [set()]
+        self.info = info
+        self.scope = MAIN
+        self.tmp = 0
+        self.io = None
+        self.loops = None  # list of loop records when emitting profiling counters
+        self.nonneg = set()  # range() loop variables known to stay >= 0 in the current body
     def write(self, s): self.lines.append(IND*self.level + s)
     def indent(self): self.level += 1
     def dedent(self): self.level -= 1
@@ -15,23 +33,34 @@ class Emitter:
     def is_declared(self, name:str) -> bool: return any(name in s for s in self.scopes)
     def push_scope(self): self.scopes.append(set())
     def pop_scope(self): self.scopes.pop()
+    def type_of(self, node): return self.info.type_of(node, self.scope) if self.info else None
+    def expr(self, node) -> str: return emit_expr(node, self)
+    def fresh(self, base: str) -> str:
+        self.tmp += 1
+        return f"_{base}{self.tmp}"
+    def decl_type(self, name: str) -> str:
+        # concrete C++ type from inference, or an explicit auto fallback (reported in diagnostics)
+        t = cpp_type(self.info.var_type(self.scope, name)) if self.info else None
+        return t or "auto"
 
 def _cpp_string_literal(py: str) -> str:
     s = py.replace("\\", "\\\\").replace("\"", "\\\"")
     s = s.replace("\n", "\\n").replace("\t", "\\t")
     return f"string(\"{s}\")"
 
-def has_return(fn: ast.FunctionDef) -> bool:
-    class Finder(ast.NodeVisitor):
-        def __init__(self): self.found = False
-        def visit_Return(self, node): self.found = True
-    f = Finder()
-    for n in fn.body: f.visit(n)
-    return f.found
-
 def py_to_cpp(py_code: str) -> str:
+    return transpile(py_code)[0]
+
+# cache: optional transpiler.incremental.ChunkCache; functions and top-level
+# statements whose AST and typing context are unchanged reuse their emitted lines.
+# loops: a list to instrument every for/while with counters (transpiler.profiling);
+# it is filled with one record per loop, in id order.
+def transpile(py_code: str, cache=None, loops: list = None):
     tree = ast.parse(py_code)
-    em = Emitter()
+    info = TypeInfo(tree)
+    em = Emitter(info)
+    em.io = IOPlan(tree)
+    em.loops = loops
 
     em.write('#include <bits/stdc++.h>')
     em.write('using namespace std;')
@@ -69,89 +98,186 @@ def py_to_cpp(py_code: str) -> str:
     em.write('#endif')
     em.write('')
     em.write('// ---- helpers ----')
-    em.write('template<typename T> void _print(const T& x){ cout << x; }')
-    em.write('template<typename T, typename... R> void _print(const T& x, const T&... r){ cout << x; ((cout << \' \' << r), ...); }')
-    em.write('static inline long long read_int(){ long long x; if(!(cin>>x)) return 0; return x; }')
-    em.write('static inline string read_line(){ string s; if(cin.peek()==\'\\n\') cin.get(); getline(cin, s); return s; }')
-    em.write('static inline vector<long long> read_int_list(){ string s = read_line(); istringstream iss(s); vector<long long> a; long long x; while(iss>>x) a.push_back(x); return a; }')
-    em.write('static inline long long to_ll(const string& s){ try{ size_t p; long long v=stoll(s,&p); return v; }catch(...){ return 0; } }')
-    em.write('static inline double to_double(const string& s){ try{ size_t p; double v=stod(s,&p); return v; }catch(...){ return 0; } }')
+    em.write('static inline long long ipow(long long b, long long e){ long long r = 1; while(e > 0){ if(e & 1) r *= b; e >>= 1; if(e) b *= b; } return r; }')
+    em.write(HELPERS_MARK)
     em.write('')
 
+    em.write(DIAGNOSTICS_MARK)
+
+    # module variables that functions use live at file scope; main assigns them
+    hoisted = info.module_globals()
+    if hoisted: em.write('// ---- module-level variables ----')
+    for g in hoisted:
+        ct = cpp_type(info.var_type(MAIN, g))
+        em.write(f"static {ct} {g};" if ct else unsupported(tree, f"module variable '{g}' of unknown type") + ";")
+        em.declare(g)
+    if hoisted: em.write('')
+
     funcs, toplevel = [], []
     for node in tree.body:
         (funcs if isinstance(node, ast.FunctionDef) else toplevel).append(node)
 
-    for fn in funcs: emit_function(fn, em)
+    emit = cache.emit if cache else (lambda node, em, fn: fn(node, em))
+    for fn in funcs: emit(fn, em, emit_function)
 
-    em.write('int main(){')
+    em.scope = MAIN
+    em.tmp = 0
+    # recursive programs get main's body on a thread with a big stack
+    stack = stack_bytes(tree)
+    em.write('static void _main(){' if stack else 'int main(){')
     em.indent(); em.write('fastio;'); em.write(''); em.push_scope()
-    for stmt in toplevel: emit_stmt(stmt, em)
-    em.write('return 0;')
+    for stmt in toplevel: emit(stmt, em, emit_stmt)
+    if not stack: em.write('return 0;')
     em.pop_scope(); em.dedent(); em.write('}')
-    return em.render()
+    if stack: em.write(f'int main(){{ return _run_on_stack(_main, {stack}); }}')
+    cpp = em.render()
+    # only the I/O and lowering helpers this program actually uses
+    helpers = helper_block(cpp, em.io.helpers(), {**recursion.HELPERS, **profiling.HELPERS})
+    if em.loops: helpers.insert(0, f"const int _PROF_LOOPS = {len(em.loops)};")
+    # read back from the text, so chunks reused by the incremental cache report theirs too
+    diagnostics = info.diagnostics + [f"line {m[2]}: {m[1]} is not supported, the C++ won't compile"
+                                      for m in _UNSUPPORTED.finditer(cpp)]
+    notes = (['// ---- transpiler diagnostics ----'] + [f'// {d}' for d in diagnostics] + ['']) if diagnostics else []
+    return cpp.replace(HELPERS_MARK, "\n".join(helpers)).replace(DIAGNOSTICS_MARK + "\n", "".join(l + "\n" for l in notes)), diagnostics
 
 def emit_function(fn: ast.FunctionDef, em: Emitter):
-    ret_auto = has_return(fn)
-    params = [f"auto {a.arg}" for a in fn.args.args]
-    sig = f"{'auto' if ret_auto else 'void'} {fn.name}({', '.join(params)})"
+    em.scope = fn.name
+    em.tmp = 0  # temporaries are local, number them per function
+    params = [em.info.param_decl(fn.name, i) for i in range(len(fn.args.args))]
+    ret = em.info.return_decl(fn.name)
+    name = fn.name
+    if is_memoized(fn):
+        name = emit_memo_wrapper(fn, em, params, ret)
+        if name is None:
+            name = fn.name
+            em.write("// lru_cache: argument or return types not inferred, emitted without memoization")
+    sig = f"{ret} {name}({', '.join(params)})"
     em.write(sig + " {")
     em.indent(); em.push_scope()
+    for a in fn.args.args: em.declare(a.arg)
     for s in fn.body: emit_stmt(s, em)
     em.pop_scope(); em.dedent(); em.write("}\n")
+    em.scope = MAIN
 
-def _emit_unpack(names, list_expr, em: Emitter):
+def _emit_unpack(names, list_expr, em: Emitter, default: str = "0"):
     tmp = "__tmp_unpack__"
     em.write(f"auto {tmp} = {list_expr};")
     for i, n in enumerate(names):
-        decl = "" if em.is_declared(n) else "auto "
+        decl = "" if em.is_declared(n) else em.decl_type(n) + " "
         if not em.is_declared(n): em.declare(n)
-        em.write(f"{decl}{n} = {tmp}.size()>{i} ? {tmp}[{i}] : 0;")
+        em.write(f"{decl}{n} = {tmp}.size()>{i} ? {tmp}[{i}] : {default};")
+
+def _emit_tie(targets, value: str, em: Emitter):
+    # a, b = b, a + b / x, y = heappop(h): declare new names, then assign through tie()
+    for t in targets:
+        if isinstance(t, ast.Name) and not em.is_declared(t.id):
+            em.declare(t.id); em.write(f"{em.decl_type(t.id)} {t.id}{{}};")
+    em.write(f"tie({', '.join(emit_expr(t, em) for t in targets)}) = {value};")
+
+def _write(node, em: Emitter) -> str:
+    # sep=/end= values: constant strings go straight into the output buffer
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        if not node.value: return ""
+        if len(node.value) == 1: return f"_wc({char_or_expr(node, CHAR, em)});"
+        return f"_ws({_cpp_string_literal(node.value)[7:-1]}, {len(node.value.encode())});"
+    return f"_out({emit_expr(node, em)});"
+
+def _emit_print(call: ast.Call, em: Emitter):
+    # sep=None / end=None mean the defaults
+    kw = {k.arg: k.value for k in call.keywords if not (isinstance(k.value, ast.Constant) and k.value.value is None)}
+    pargs = call.args
+    args = [emit_expr(a.value if isinstance(a, ast.Starred) else a, em) for a in pargs]
+    end = _write(kw["end"], em) if "end" in kw else "_wc('\\n');"
+    if "flush" in kw and em.io.interactive: end += " _flush();"
+    if "sep" not in kw and not any(isinstance(a, ast.Starred) for a in pargs) \
+            and sum(any(isinstance(n, ast.Call) for n in ast.walk(a)) for a in pargs) <= 1:
+        em.write(f"_print({', '.join(args)}); {end}" if args else end); return
+    # print(*a, x) needs a loop, and C++ leaves argument evaluation order
+    # unspecified, which print(q.pop(), q.pop()) can't afford: one item at a time
+    sep = _write(kw["sep"], em) if "sep" in kw else "_wc(' ');"
+    # a starred argument's items are separated by sep too
+    seq = f", {char_or_expr(kw['sep'], CHAR, em)}" if "sep" in kw else ""
+    parts = [f"py_print_seq({c}{seq});" if isinstance(a, ast.Starred) else f"_print({c});" for a, c in zip(pargs, args)]
+    em.write((f" {sep} " if sep else " ").join(parts) + f" {end}")
 
 def emit_stmt(node, em: Emitter):
     if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Tuple):
         target = node.targets[0]
+        if all(isinstance(e, (ast.Name, ast.Subscript)) for e in target.elts):
+            value = node.value
+            if isinstance(value, ast.Tuple) and len(value.elts) == len(target.elts):
+                if all(isinstance(e, ast.Name) and not em.is_declared(e.id) for e in target.elts) \
+                        and not any(em.decl_type(e.id) == "auto" for e in target.elts):
+                    for e, v in zip(target.elts, value.elts):
+                        em.declare(e.id); em.write(f"{em.decl_type(e.id)} {e.id} = {emit_expr(v, em)};")
+                    return
+                _emit_tie(target.elts, f"make_tuple({', '.join(emit_expr(v, em) for v in value.elts)})", em); return
+            if kind(em.type_of(value)) == "tuple":
+                _emit_tie(target.elts, emit_expr(value, em), em); return
         names = []
         for elt in target.elts:
             if isinstance(elt, ast.Name): names.append(elt.id)
-            else: em.write("// [unsupported: complex unpack]"); return
+            else: em.write(unsupported(node, "nested unpacking") + ";"); return
+        if kind(em.type_of(node.value)) == "vector" and not isinstance(node.value, ast.List):
+            default = "0" if elem(em.type_of(node.value)) == LL else f"{cpp_type(elem(em.type_of(node.value))) or 'long long'}()"
+            _emit_unpack(names, emit_expr(node.value, em), em, default); return
         if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name) and node.value.func.id == "map":
             args = node.value.args
             if len(args) == 2 and isinstance(args[0], ast.Name) and args[0].id == "int":
                 if isinstance(args[1], ast.Call) and isinstance(args[1].func, ast.Attribute) and args[1].func.attr == "split":
-                    _emit_unpack(names, "read_int_list()", em); return
+                    _emit_unpack(names, int_list_reader(args[1]), em); return
         if isinstance(node.value, ast.List):
             _emit_unpack(names, emit_expr(node.value, em), em); return
-        em.write("// [unsupported: tuple unpacking pattern not recognized]")
+        em.write(unsupported(node, "this tuple unpacking") + ";")
         return
 
+    if isinstance(node, ast.Assign) and is_stdin_alias(node.value):
+        return  # input = sys.stdin.readline: input() already reads a line
+
     if isinstance(node, ast.Assign):
         tgt_node = node.targets[0]
         tgt = emit_expr(tgt_node, em)
-        val = emit_expr(node.value, em)
         if isinstance(tgt_node, ast.Name) and not em.is_declared(tgt):
-            em.declare(tgt); em.write(f"auto {tgt} = {val};")
+            em.declare(tgt)
+            ctype = em.decl_type(tgt)
+            val = _init_expr(node.value, em, em.info.var_type(em.scope, tgt)) if ctype != "auto" else emit_expr(node.value, em)
+            em.write(f"{ctype} {tgt} = {val};")
         else:
-            em.write(f"{tgt} = {val};")
+            t = em.info.var_type(em.scope, tgt) if isinstance(tgt_node, ast.Name) else em.type_of(tgt_node)
+            em.write(f"{tgt} = {_init_expr(node.value, em, t)};")
         return
 
     if isinstance(node, ast.AugAssign):
+        if kind(em.type_of(node.target)) == "set":
+            x = emit_expr(node.target, em)
+            low = lower_set_op(node.op, x, emit_expr(node.value, em))
+            if low: em.write(f"{x} = {low};"); return
+        if isinstance(node.op, ast.Mult):
+            rep = _repeat(node.target, node.value, em)
+            if rep: em.write(f"{emit_expr(node.target, em)} = {rep};"); return
+        if isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+            em.write(f"{emit_expr(node.target, em)} = {_floor_op(node.op, node.target, node.value, em)};"); return
         em.write(f"{emit_expr(node.target, em)} {emit_op(node.op)}= {emit_expr(node.value, em)};"); return
 
     if isinstance(node, ast.Expr):
+        if is_setrecursionlimit(node): return  # the stack is sized for the whole program, see stack_bytes
+        clear = cache_clear(node, em.info)
+        if clear: em.write(clear); return
         if isinstance(node.value, ast.Call) and getattr(node.value.func, "id", "") == "print":
-            args = [emit_expr(a, em) for a in node.value.args]
-            em.write(f"_print({', '.join(args)}); cout << '\\n';" if args else "cout << '\\n';"); return
+            _emit_print(node.value, em); return
+        if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute):
+            low = lower_method(node.value, em, stmt=True)
+            if low is not None: em.write(low + ";"); return
         em.write(emit_expr(node.value, em) + ";"); return
 
     if isinstance(node, ast.If):
-        em.write(f"if ({emit_expr(node.test, em)}) {{")
+        em.write(f"if ({emit_cond(node.test, em)}) {{")
         em.indent(); [emit_stmt(s, em) for s in node.body]; em.dedent()
         if node.orelse:
             chain = node.orelse
             while len(chain) == 1 and isinstance(chain[0], ast.If):
                 n = chain[0]
-                em.write(f"}} else if ({emit_expr(n.test, em)}) {{")
+                em.write(f"}} else if ({emit_cond(n.test, em)}) {{")
                 em.indent(); [emit_stmt(s, em) for s in n.body]; em.dedent()
                 chain = n.orelse
             if chain:
@@ -163,33 +289,30 @@ def emit_stmt(node, em: Emitter):
         return
 
     if isinstance(node, ast.While):
-        em.write(f"while ({emit_expr(node.test, em)}) {{"); em.indent()
-        [emit_stmt(s, em) for s in node.body]; em.dedent(); em.write("}"); return
+        pid = profiling.begin_loop(node, em)
+        em.write(f"while ({emit_cond(node.test, em)}) {{"); em.indent()
+        profiling.count_iteration(pid, em)
+        [emit_stmt(s, em) for s in node.body]; em.dedent(); em.write("}" if pid is None else "}}"); return
 
     if isinstance(node, ast.For):
-        it = node.iter
-        if isinstance(it, ast.Call) and getattr(it.func, "id", "") == "range":
-            args = [emit_expr(a, em) for a in it.args]
-            var = emit_expr(node.target, em)
-            decl = ""
-            if isinstance(node.target, ast.Name) and not em.is_declared(var):
-                em.declare(var); decl = "auto "
-            if len(args) == 1:
-                em.write(f"for ({decl}{var} = 0; {var} < {args[0]}; ++{var}) {{")
-            elif len(args) == 2:
-                em.write(f"for ({decl}{var} = {args[0]}; {var} < {args[1]}; ++{var}) {{")
-            else:
-                step = args[2]; cmp = "<"
-                if step.startswith("-") or step.startswith("(-"): cmp = ">"
-                em.write(f"for ({decl}{var} = {args[0]}; {var} {cmp} {args[1]}; {var} += {step}) {{")
-            em.indent(); [emit_stmt(s, em) for s in node.body]; em.dedent(); em.write("}")
-            return
-        var = emit_expr(node.target, em)
-        if isinstance(node.target, ast.Name) and not em.is_declared(var):
-            em.declare(var); em.write(f"for (auto &{var} : {emit_expr(node.iter, em)}) {{")
-        else:
-            em.write(f"for (auto &{var} : {emit_expr(node.iter, em)}) {{")
-        em.indent(); [emit_stmt(s, em) for s in node.body]; em.dedent(); em.write("}")
+        decl = ""
+        if isinstance(node.target, ast.Name) and not em.is_declared(node.target.id):
+            decl = em.decl_type(node.target.id) + " "
+        pre, head, prelude = loop_head(node.target, node.iter, em, decl)
+        if pre: em.write(pre.strip())
+        pid = profiling.begin_loop(node, em)
+        em.write(head + " {")
+        # loop variables live in the C++ loop's scope
+        em.push_scope()
+        for n in ast.walk(node.target):
+            if isinstance(n, ast.Name): em.declare(n.id)
+        nonneg = _nonneg_loop_var(node, em)
+        if nonneg: em.nonneg.add(nonneg)
+        em.indent()
+        profiling.count_iteration(pid, em)
+        [em.write(p) for p in prelude]; [emit_stmt(s, em) for s in node.body]; em.dedent(); em.write("}" if pid is None else "}}")
+        em.nonneg.discard(nonneg)
+        em.pop_scope()
         return
 
     if isinstance(node, ast.Return):
@@ -198,7 +321,13 @@ def emit_stmt(node, em: Emitter):
     if isinstance(node, ast.Pass):
         em.write(";"); return
 
-    em.write("// [unsupported in MVP]")
+    if isinstance(node, (ast.Break, ast.Continue)):
+        em.write("break;" if isinstance(node, ast.Break) else "continue;"); return
+
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.Global)):
+        return  # globals are hoisted to file scope up front
+
+    em.write(unsupported(node, f"the {type(node).__name__.lower()} statement") + ";")
 
 def emit_expr(node, em: Emitter) -> str:
     if isinstance(node, ast.Constant):
@@ -207,20 +336,52 @@ def emit_expr(node, em: Emitter) -> str:
         return repr(node.value)
     if isinstance(node, ast.Name): return node.id
     if isinstance(node, ast.BinOp):
-        if isinstance(node.op, ast.Pow): return f"pow({emit_expr(node.left, em)}, {emit_expr(node.right, em)})"
+        if isinstance(node.op, ast.Pow):
+            fn = "ipow" if em.type_of(node) == LL else "pow"
+            return f"{fn}({emit_expr(node.left, em)}, {emit_expr(node.right, em)})"
+        if isinstance(node.op, ast.Mult) and isinstance(node.left, ast.List) and len(node.left.elts) == 1:
+            # [v] * n -> fill constructor
+            ct = cpp_type(em.type_of(node)) or "vector<long long>"
+            return f"{ct}(max(0LL, (long long)({emit_expr(node.right, em)})), {emit_expr(node.left.elts[0], em)})"
+        if isinstance(node.op, ast.Mult):
+            rep = _repeat(node.left, node.right, em) or _repeat(node.right, node.left, em)
+            if rep: return rep
+        if isinstance(node.op, (ast.FloorDiv, ast.Mod)): return _floor_op(node.op, node.left, node.right, em)
+        if kind(em.type_of(node.left)) == "set" and kind(em.type_of(node.right)) == "set":
+            low = lower_set_op(node.op, emit_expr(node.left, em), emit_expr(node.right, em))
+            if low: return low
+        if isinstance(node.op, ast.Div) and DOUBLE not in (em.type_of(node.left), em.type_of(node.right)):
+            # Python's / is true division even on ints
+            return f"((double){emit_expr(node.left, em)} / {emit_expr(node.right, em)})"
         return f"({emit_expr(node.left, em)} {emit_op(node.op)} {emit_expr(node.right, em)})"
-    if isinstance(node, ast.UnaryOp): return f"({emit_uop(node.op)}{emit_expr(node.operand, em)})"
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not): return f"(!{emit_cond(node.operand, em)})"
+        return f"({emit_uop(node.op)}{emit_expr(node.operand, em)})"
     if isinstance(node, ast.Compare):
-        left = emit_expr(node.left, em)
-        if len(node.ops) == 1:
-            return f"({left} {emit_cmp(node.ops[0])} {emit_expr(node.comparators[0], em)})"
-        parts, cur = [], left
+        parts, lhs = [], node.left
         for op, rhs in zip(node.ops, node.comparators):
-            r = emit_expr(rhs, em); parts.append(f"({cur} {emit_cmp(op)} {r})"); cur = r
-        return "(" + " && ".join(parts) + ")"
+            if isinstance(op, (ast.In, ast.NotIn)):
+                c = lower_in(lhs, rhs, em)
+                parts.append(f"(!{c})" if isinstance(op, ast.NotIn) else c)
+            else:
+                l, r = char_or_expr(lhs, em.type_of(rhs), em), char_or_expr(rhs, em.type_of(lhs), em)
+                parts.append(f"({l} {emit_cmp(op)} {r})")
+            lhs = rhs
+        return parts[0] if len(parts) == 1 else "(" + " && ".join(parts) + ")"
     if isinstance(node, ast.BoolOp):
         join = " && " if isinstance(node.op, ast.And) else " || "
-        return "(" + join.join(emit_expr(v, em) for v in node.values) + ")"
+        return "(" + join.join(emit_cond(v, em) for v in node.values) + ")"
+    if isinstance(node, ast.IfExp):
+        return f"({emit_expr(node.test, em)} ? {emit_expr(node.body, em)} : {emit_expr(node.orelse, em)})"
+    if isinstance(node, ast.Lambda): return callable_expr(node, em)
+    if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)): return lower_comp(node, em)
+    if is_line_read(node): return "read_line()"
+    if is_bulk_read(node): return "read_all()"
+    if split_source(node) is not None and is_bulk_read(split_source(node)): return "read_tokens()"
+    if isinstance(node, ast.Call):
+        low = lower_call(node, em) if not isinstance(node.func, ast.Attribute) or getattr(node.func.value, "id", None) in MODULES \
+            else lower_method(node, em)
+        if low is not None: return low
     if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
         fname = node.func.id
         if fname == "print":
@@ -228,47 +389,115 @@ def emit_expr(node, em: Emitter) -> str:
             return f"(_print({args}), 0)"
         if fname == "len": return f"((int){emit_expr(node.args[0], em)}.size())"
         if fname == "int":
-            if len(node.args) == 1 and isinstance(node.args[0], ast.Call) and getattr(node.args[0].func, "id", "") == "input":
+            if len(node.args) == 1 and is_line_read(node.args[0]):
                 return "read_int()"
-            return f"(long long)({emit_any_to_ll(node.args[0], em)})"
-        if fname == "float": return f"(double)({emit_any_to_double(node.args[0], em)})"
+            if len(node.args) == 2 and em.type_of(node.args[0]) == STR:
+                return f"stoll({emit_expr(node.args[0], em)}, nullptr, {emit_expr(node.args[1], em)})"
+            if len(node.args) == 1: return emit_any_to_ll(node.args[0], em)
+        if fname == "bool" and len(node.args) == 1: return f"((bool)({emit_cond(node.args[0], em)}))"
+        if fname == "float" and len(node.args) == 1: return emit_any_to_double(node.args[0], em)
         if fname == "input": return "read_line()"
         if fname == "list":
             if len(node.args) == 1 and isinstance(node.args[0], ast.Call) and isinstance(node.args[0].func, ast.Name) and node.args[0].func.id == "map":
                 m = node.args[0]
                 if len(m.args) == 2 and isinstance(m.args[0], ast.Name) and m.args[0].id == "int":
                     if isinstance(m.args[1], ast.Call) and isinstance(m.args[1].func, ast.Attribute) and m.args[1].func.attr == "split":
-                        return "read_int_list()"
+                        return int_list_reader(m.args[1])
             return "vector<long long>{}"
-        if fname == "map": return "/*map*/0"
-        if fname == "max" and len(node.args) == 2:
-            return f"max({emit_expr(node.args[0], em)}, {emit_expr(node.args[1], em)})"
-        if fname == "min" and len(node.args) == 2:
-            return f"min({emit_expr(node.args[0], em)}, {emit_expr(node.args[1], em)})"
-    if isinstance(node, ast.Attribute): return "/*attr*/0"
-    if isinstance(node, ast.List):
+        if em.info and fname in em.info.funcs:
+            return f"{fname}({', '.join(emit_expr(a, em) for a in node.args)})"
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math" \
+            and node.attr in _MATH_CONSTS:
+        return _MATH_CONSTS[node.attr]
+    if isinstance(node, (ast.List, ast.Set)):
         elems = ", ".join(emit_expr(e, em) for e in node.elts)
-        return f"vector<long long>{{{elems}}}"
-    if isinstance(node, ast.Subscript):
-        base = emit_expr(node.value, em)
-        if isinstance(node.slice, ast.Slice): return "/*slice*/0"
-        idx = emit_expr(node.slice, em); return f"{base}[{idx}]"
-    return "/*expr?*/0"
+        fallback = "vector<long long>" if isinstance(node, ast.List) else "unordered_set<long long, chash>"
+        return f"{cpp_type(em.type_of(node)) or fallback}{{{elems}}}"
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        elems = ", ".join(f"{{{emit_expr(k, em)}, {emit_expr(v, em)}}}" for k, v in zip(node.keys, node.values))
+        return f"{cpp_type(em.type_of(node)) or 'unordered_map<long long, long long, chash>'}{{{elems}}}"
+    if isinstance(node, ast.Tuple):
+        ct = cpp_type(em.type_of(node))
+        elems = ", ".join(emit_expr(e, em) for e in node.elts)
+        if ct: return f"{ct}({elems})"
+        return f"make_{'pair' if len(node.elts) == 2 else 'tuple'}({elems})"
+    if isinstance(node, ast.Subscript): return lower_subscript(node, em)
+    what = ast.unparse(node.func) + "()" if isinstance(node, ast.Call) else ast.unparse(node)
+    return unsupported(node, f"`{what if len(what) <= 40 else what[:37] + '...'}`")
+
+def _repeat(seq, n, em: Emitter):
+    # 'ab' * 3, [1, 2] * n: repeated concatenation
+    t = em.type_of(seq)
+    if t in (STR, CHAR) or kind(t) in ("vector", "deque"):
+        return f"py_repeat({emit_expr(seq, em)}, {emit_expr(n, em)})"
+    return None
+
+def emit_cond(node, em: Emitter) -> str:
+    # Python truthiness: containers and strings are true when non-empty
+    t = em.type_of(node)
+    if kind(t) in ("vector", "deque", "set", "map") or t == STR: return f"!{emit_expr(node, em)}.empty()"
+    # no inferred type (auto in C++): decide at compile time
+    if (t is None or t == ANY) and isinstance(node, (ast.Name, ast.Subscript, ast.Attribute)):
+        return f"py_truthy({emit_expr(node, em)})"
+    return emit_expr(node, em)
 
+def _init_expr(value, em: Emitter, t=None) -> str:
+    # container literals assigned to a typed variable become brace lists, so the
+    # literal doesn't need (and can't contradict) its own element type
+    if isinstance(value, (ast.List, ast.Set)) and value.elts:
+        return "{" + ", ".join(emit_expr(e, em) for e in value.elts) + "}"
+    if isinstance(value, ast.Dict) and value.keys and None not in value.keys:
+        return "{" + ", ".join(f"{{{emit_expr(k, em)}, {emit_expr(v, em)}}}" for k, v in zip(value.keys, value.values)) + "}"
+    if is_empty_ctor(value): return "{}"
+    return init_for(value, t, em)
+
+# int()/float() by the argument's inferred type; py_int/py_float decide at
+# compile time when it wasn't inferred
 def emit_any_to_ll(arg, em: Emitter) -> str:
-    if isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "input":
-        return "to_ll(read_line())"
-    a = emit_expr(arg, em)
-    return f"to_ll({a})" if a.startswith("string(") or a.startswith("read_line()") else a
+    t, a = em.type_of(arg), emit_expr(arg, em)
+    if t == STR: return f"to_ll({a})"
+    if t == CHAR: return f"(long long)({a} - '0')"
+    if t in (LL, BOOL, DOUBLE): return f"(long long)({a})"
+    return f"py_int({a})"
 
 def emit_any_to_double(arg, em: Emitter) -> str:
-    if isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "input":
-        return "to_double(read_line())"
-    a = emit_expr(arg, em)
-    return f"to_double({a})" if a.startswith("string(") or a.startswith("read_line()") else a
+    t, a = em.type_of(arg), emit_expr(arg, em)
+    if t == STR: return f"to_double({a})"
+    if t == CHAR: return f"(double)({a} - '0')"
+    if t in (LL, BOOL, DOUBLE): return f"(double)({a})"
+    return f"py_float({a})"
+
+def _nonneg(node, em: Emitter) -> bool:
+    # provably >= 0 from the expression alone
+    if isinstance(node, ast.Constant): return isinstance(node.value, int) and node.value >= 0
+    if isinstance(node, ast.Name): return node.id in em.nonneg
+    if isinstance(node, ast.Call): return isinstance(node.func, ast.Name) and node.func.id == "len"
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, ast.Mod): return _nonneg(node.right, em)
+        return isinstance(node.op, (ast.Add, ast.Mult, ast.FloorDiv, ast.BitAnd, ast.BitOr, ast.RShift)) \
+            and _nonneg(node.left, em) and _nonneg(node.right, em)
+    return False
+
+def _nonneg_loop_var(node: ast.For, em: Emitter):
+    # `for i in range(...)` counting up from >= 0, with i never reassigned in the body
+    it = node.iter
+    if not (isinstance(node.target, ast.Name) and call_name(it) == "range" and 1 <= len(it.args) <= 3): return None
+    if len(it.args) > 1 and not _nonneg(it.args[0], em): return None
+    if len(it.args) == 3 and not (isinstance(it.args[2], ast.Constant) and isinstance(it.args[2].value, int) and it.args[2].value > 0): return None
+    v = node.target.id
+    if any(isinstance(n, ast.Name) and n.id == v and isinstance(n.ctx, ast.Store) for s in node.body for n in ast.walk(s)): return None
+    return v
+
+def _floor_op(op, left, right, em: Emitter) -> str:
+    # Python's // and % round toward -inf; C++ truncates. Same result for
+    # non-negative ints, otherwise py_floordiv/py_mod fix up the sign
+    l, r = emit_expr(left, em), emit_expr(right, em)
+    ints = all(em.type_of(x) in (LL, BOOL) for x in (left, right))
+    if ints and _nonneg(left, em) and _nonneg(right, em): return f"({l} {'/' if isinstance(op, ast.FloorDiv) else '%'} {r})"
+    return f"py_{'floordiv' if isinstance(op, ast.FloorDiv) else 'mod'}({l}, {r})"
 
 def emit_op(op):
-    return {ast.Add:"+", ast.Sub:"-", ast.Mult:"*", ast.Div:"/", ast.FloorDiv:"/", ast.Mod:"%", ast.BitOr:"|", ast.BitAnd:"&", ast.BitXor:"^", ast.LShift:"<<", ast.RShift:">>"}[type(op)]
+    return {ast.Add:"+", ast.Sub:"-", ast.Mult:"*", ast.Div:"/", ast.BitOr:"|", ast.BitAnd:"&", ast.BitXor:"^", ast.LShift:"<<", ast.RShift:">>"}[type(op)]
 
 def emit_uop(op): return {ast.UAdd:"+", ast.USub:"-", ast.Not:"!"}[type(op)]
-def emit_cmp(op): return {ast.Lt:"<", ast.Le:"<=", ast.Gt:">", ast.Ge:">=", ast.Eq:"==", ast.NotEq:"!="}[type(op)]
+def emit_cmp(op): return {ast.Lt:"<", ast.LtE:"<=", ast.Gt:">", ast.GtE:">=", ast.Eq:"==", ast.NotEq:"!="}[type(op)]
@@ -0,0 +1,198 @@
+import ast
+
+from transpiler.infer import LL, BOOL, CHAR, STR, DOUBLE, cpp_type, kind
+
+# Recursion support: @lru_cache / @cache functions become a memoized wrapper
+# around the original body, and programs that recurse run main on a thread
+# with an explicitly sized stack (Python code raises sys.setrecursionlimit for
+# the same reason).
+
+STACK_DEFAULT = 256 << 20
+STACK_MAX = 1 << 30
+STACK_PER_FRAME = 512  # bytes per Python recursion level granted by setrecursionlimit
+_INTEGRAL = (LL, BOOL, CHAR)
+
+HELPERS = {
+    "_Memo": """const long double _MEMO_DENSE_BYTES = 1 << 27;
+// Memo for a function of K integer arguments. The outermost call sizes a dense
+// box over [0, arg] per argument (recursion that only shrinks its arguments stays
+// inside it); anything outside goes to a hash map keyed by the packed arguments.
+template<class R, int K> struct _Memo {
+    using Key = array<long long, K>;
+    using S = conditional_t<is_same_v<R, bool>, unsigned char, R>;  // no vector<bool>
+    struct H { size_t operator()(const Key& k) const { uint64_t h = 0; for(auto x : k) h = chash::mix(h * 31 + x + chash::seed()); return h; } };
+    Key hi{};
+    vector<S> val; vector<unsigned char> has;
+    unordered_map<Key, S, H> far;
+    int depth = 0;
+    long long index(const Key& k) const {
+        long long i = 0;
+        for(int d = 0; d < K; ++d){ if(k[d] < 0 || k[d] >= hi[d]) return -1; i = i * hi[d] + k[d]; }
+        return i;
+    }
+    S* find(const Key& k){
+        long long i = index(k);
+        if(i >= 0) return has[i] ? &val[i] : nullptr;
+        auto it = far.find(k); return it == far.end() ? nullptr : &it->second;
+    }
+    R put(const Key& k, R v){
+        long long i = index(k);
+        if(i >= 0){ has[i] = 1; val[i] = v; } else far[k] = v;
+        return v;
+    }
+    static long double cells(const Key& h){ long double c = 1; for(auto x : h) c *= x; return c; }
+    void fit(const Key& k){
+        Key want = hi; bool grow = false;
+        for(int d = 0; d < K; ++d){ if(k[d] < 0) return; if(k[d] >= hi[d]){ want[d] = max(k[d] + 1, hi[d] * 2); grow = true; } }
+        if(!grow) return;
+        if(cells(want) * (sizeof(S) + 1) > _MEMO_DENSE_BYTES){
+            for(int d = 0; d < K; ++d) want[d] = max(hi[d], k[d] + 1);
+            if(cells(want) * (sizeof(S) + 1) > _MEMO_DENSE_BYTES) return;
+        }
+        vector<S> v((size_t)cells(want)); vector<unsigned char> h(v.size());
+        swap(v, val); swap(h, has);
+        Key old = hi; hi = want;
+        for(size_t i = 0; i < h.size(); ++i) if(h[i]){ Key key; size_t r = i; for(int d = K - 1; d >= 0; --d){ key[d] = r % old[d]; r /= old[d]; } put(key, v[i]); }
+        for(auto it = far.begin(); it != far.end();){ if(index(it->first) >= 0){ put(it->first, it->second); it = far.erase(it); } else ++it; }
+    }
+    void clear(){ fill(has.begin(), has.end(), 0); far.clear(); }
+};""",
+    "_run_on_stack": """#include <pthread.h>
+// runs f on a thread with a `bytes` stack; under an address-space limit the size
+// is halved until the thread can be created, and f runs inline as a last resort
+static void (*_stack_fn)();
+static int _run_on_stack(void (*f)(), size_t bytes){
+    _stack_fn = f;
+    pthread_attr_t a; pthread_attr_init(&a);
+    for(; bytes >= (8u << 20); bytes /= 2){
+        pthread_t t;
+        if(pthread_attr_setstacksize(&a, bytes) != 0) continue;
+        if(pthread_create(&t, &a, [](void*) -> void* { _stack_fn(); return nullptr; }, nullptr) == 0){
+            pthread_join(t, nullptr); pthread_attr_destroy(&a); return 0;
+        }
+    }
+    pthread_attr_destroy(&a);
+    f(); return 0;
+}""",
+}
+
+def _is_name(node, *names):
+    if isinstance(node, ast.Name): return node.id in names
+    return isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "functools" \
+        and node.attr in names
+
+def is_memoized(fn: ast.FunctionDef) -> bool:
+    # @cache, @lru_cache, @lru_cache(None), @lru_cache(maxsize=...), with or without functools.
+    # maxsize is ignored: the function is pure, so evicting never changes a result
+    for d in fn.decorator_list:
+        if _is_name(d, "cache", "lru_cache"): return True
+        if isinstance(d, ast.Call) and _is_name(d.func, "lru_cache"): return True
+    return False
+
+def cache_clear(node, info):
+    # f.cache_clear() -> the memo's clear(), as a statement
+    call = node.value if isinstance(node, ast.Expr) else None
+    if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "cache_clear"
+            and isinstance(call.func.value, ast.Name) and call.func.value.id in info.funcs): return None
+    name = call.func.value.id
+    return f"_memo_{name}.clear();" if memo_kind(info.funcs[name], info) else ";"
+
+def is_setrecursionlimit(node) -> bool:
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute) \
+        and node.value.func.attr == "setrecursionlimit"
+
+def _calls(fn: ast.FunctionDef, names):
+    return {n.func.id for n in ast.walk(fn) if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in names}
+
+_ARITH = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+          ast.Pow: lambda a, b: a ** b if b < 64 else None, ast.LShift: lambda a, b: a << b if b < 64 else None}
+
+def _const_int(node):
+    # 10**6, 1 << 20, 5 * 10**5 + 5
+    if isinstance(node, ast.Constant) and type(node.value) is int: return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        a, b = _const_int(node.left), _const_int(node.right)
+        return None if a is None or b is None else _ARITH[type(node.op)](a, b)
+    return None
+
+def stack_bytes(tree: ast.Module):
+    # an explicit stack when the program recurses or asks for a deeper limit
+    limit = None
+    for node in ast.walk(tree):
+        if is_setrecursionlimit(node) and node.value.args:
+            limit = _const_int(node.value.args[0]) or 0
+    funcs = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+    graph = {name: _calls(fn, funcs) for name, fn in funcs.items()}
+    def cyclic(start):
+        seen, todo = set(), list(graph[start])
+        while todo:
+            n = todo.pop()
+            if n == start: return True
+            if n not in seen: seen.add(n); todo.extend(graph[n])
+        return False
+    if limit is None and not any(cyclic(f) for f in funcs): return None
+    if not limit: return STACK_DEFAULT
+    return min(max(limit * STACK_PER_FRAME, STACK_DEFAULT), STACK_MAX)
+
+def _shrinks(arg, param: str) -> bool:
+    # param, param - c, param // c, param >> c or a non-negative constant
+    if isinstance(arg, ast.Constant): return type(arg.value) is int and arg.value >= 0
+    if isinstance(arg, ast.Name): return arg.id == param
+    if isinstance(arg, ast.BinOp) and isinstance(arg.left, ast.Name) and arg.left.id == param \
+            and isinstance(arg.right, ast.Constant) and type(arg.right.value) is int:
+        c = arg.right.value
+        return (isinstance(arg.op, ast.Sub) and c >= 0) or (isinstance(arg.op, (ast.FloorDiv, ast.RShift)) and c >= 1)
+    return False
+
+def dense_bounds(fn: ast.FunctionDef) -> bool:
+    # every recursive call stays within [0, outermost arguments] when non-negative
+    params = [a.arg for a in fn.args.args]
+    for n in ast.walk(fn):
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == fn.name:
+            if n.keywords or len(n.args) != len(params): return False
+            if not all(_shrinks(a, p) for a, p in zip(n.args, params)): return False
+    return True
+
+def _hashable(t) -> bool:
+    if t in _INTEGRAL or t in (STR, DOUBLE): return True
+    return kind(t) == "tuple" and all(_hashable(x) for x in t[1:])
+
+def memo_kind(fn: ast.FunctionDef, info):
+    # "array": integer arguments, _Memo; "hash": other hashable arguments; None: not memoized
+    types = info.params[fn.name]
+    if not is_memoized(fn) or not types or info.return_decl(fn.name) == "auto": return None
+    if all(t in _INTEGRAL for t in types): return "array"
+    return "hash" if all(_hashable(t) for t in types) else None
+
+# The memoized wrapper keeps the Python name, so calls anywhere (including the
+# recursive ones in the body) go through the memo; the body becomes _<name>_body.
+def emit_memo_wrapper(fn: ast.FunctionDef, em, params, ret: str) -> str:
+    mk = memo_kind(fn, em.info)
+    if mk is None: return None
+    types = em.info.params[fn.name]
+    args = ", ".join(a.arg for a in fn.args.args)
+    body = f"_{fn.name}_body"
+    memo = f"_memo_{fn.name}"
+    proto = f"{ret} {body}({', '.join(params)});"
+    if mk == "array":
+        em.write(proto)
+        em.write(f"static _Memo<{ret}, {len(types)}> {memo};")
+        em.write(f"{ret} {fn.name}({', '.join(params)}) {{")
+        em.indent()
+        em.write(f"const array<long long, {len(types)}> _k{{{args}}};")
+        if dense_bounds(fn): em.write(f"if (!{memo}.depth) {memo}.fit(_k);")
+        em.write(f"if (auto* _v = {memo}.find(_k)) return *_v;")
+        em.write(f"++{memo}.depth; {ret} _r = {body}({args}); --{memo}.depth;")
+        em.write(f"return {memo}.put(_k, _r);")
+    else:
+        key = f"tuple<{', '.join(cpp_type(t) for t in types)}>"
+        em.write(proto)
+        em.write(f"static unordered_map<{key}, {ret}, chash> {memo};")
+        em.write(f"{ret} {fn.name}({', '.join(params)}) {{")
+        em.indent()
+        em.write(f"{key} _k{{{args}}};")
+        em.write(f"auto _it = {memo}.find(_k); if (_it != {memo}.end()) return _it->second;")
+        em.write(f"{ret} _r = {body}({args});")
+        em.write(f"return {memo}.emplace(move(_k), _r).first->second;")
+    em.dedent(); em.write("}\n")
+    return body
@@ -15,18 +15,133 @@ for _ in range(n):
 print(ans)
 `;
 
+const API = import.meta.env.VITE_API_URL;
+
+// Rule-based transpile on every keystroke: one server session per buffer, edits
+// are batched and sent as patches; a 404/409 (expired or out of sync) reopens
+// the session with the whole buffer.
+function useLiveTranspile(enabled, py, setCpp, setStatus) {
+  const session = useRef(null);
+  const pending = useRef([]);
+  const busy = useRef(false);
+  const timer = useRef(null);
+  const latest = useRef(py);
+  latest.current = py;
+
+  const show = (r) => {
+    if (r.cpp != null) setCpp(r.cpp);
+    setStatus(r.error ? `Live: ${r.error}` : `Live: ${r.ms.toFixed(1)} ms (${r.reused} reused, ${r.emitted} emitted)`);
+  };
+
+  const open = async () => {
+    pending.current = [];
+    const r = await fetch(`${API}/transpile/session`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ code: latest.current })
+    }).then((res) => res.json());
+    session.current = { id: r.session, version: r.version };
+    show(r);
+  };
+
+  const flush = async () => {
+    if (busy.current || !pending.current.length) return;
+    busy.current = true;
+    const edits = pending.current;
+    pending.current = [];
+    try {
+      if (!session.current) return await open();
+      const { id, version } = session.current;
+      const res = await fetch(`${API}/transpile/session/${id}/patch`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ baseVersion: version, edits })
+      });
+      if (!res.ok) return await open();
+      const r = await res.json();
+      session.current.version = r.version;
+      show(r);
+    } finally {
+      busy.current = false;
+      if (pending.current.length) timer.current = setTimeout(flush, 0);
+    }
+  };
+
+  useEffect(() => {
+    if (!enabled) return;
+    busy.current = true;
+    open().finally(() => {
+      busy.current = false;
+      flush();
+    });
+    return () => {
+      clearTimeout(timer.current);
+      if (session.current) fetch(`${API}/transpile/session/${session.current.id}`, { method: "DELETE" });
+      session.current = null;
+    };
+  }, [enabled]);
+
+  return (edit) => {
+    if (!enabled) return;
+    pending.current.push(edit);
+    clearTimeout(timer.current);
+    timer.current = setTimeout(flush, 80);
+  };
+}
+
 export default function App() {
   const [py, setPy] = useState(SAMPLE);
   const [cpp, setCpp] = useState("");
+  const [heat, setHeat] = useState(null);
   const runnerRef = useRef(null);
 
+  const [aiStatus, setAiStatus] = useState("");
+  const [live, setLive] = useState(false);
+  const onPyEdit = useLiveTranspile(live, py, setCpp, setAiStatus);
+
   const transpile = async () => {
-    const res = await fetch(`${import.meta.env.VITE_API_URL}/ai/convert`, {
+    setCpp("");
+    setAiStatus("Generating…");
+    setLive(false);
+    const res = await fetch(`${API}/ai/convert/stream`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ py })
-    }).then((r) => r.json());
-    setCpp(res.cpp || "");
+    });
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buf = "";
+    let draft = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += value;
+      let sep;
+      while ((sep = buf.indexOf("\n\n")) !== -1) {
+        const frame = buf.slice(0, sep);
+        buf = buf.slice(sep + 2);
+        const data = frame.split("\n").find((l) => l.startsWith("data: "));
+        if (!data) continue;
+        const ev = JSON.parse(data.slice(6));
+        if (ev.type === "token") {
+          draft += ev.text;
+          setCpp(draft);
+        } else if (ev.type === "candidate") {
+          setAiStatus(`Candidate ${ev.index + 1} (t=${ev.temperature}) ${ev.ok ? "compiles" : "failed"}…`);
+        } else if (ev.type === "compiling") {
+          setAiStatus(`Compiling (attempt ${ev.attempt + 1})…`);
+        } else if (ev.type === "compile_failed") {
+          setAiStatus(`Compile failed, repairing…\n${ev.stderr}`);
+        } else if (ev.type === "repair") {
+          draft = "";
+          setAiStatus(`Repair attempt ${ev.attempt}…`);
+        } else if (ev.type === "done") {
+          setCpp(ev.cpp || "");
+          setAiStatus(ev.ok ? "" : "Could not produce compiling C++ after repairs.");
+        } else if (ev.type === "error") {
+          setAiStatus(`Error: ${ev.detail}`);
+        }
+      }
+    }
   };
 
   useEffect(() => {
@@ -56,11 +171,23 @@ export default function App() {
     <div className="app">
       <div className="pane">
         <h3>Python</h3>
-        <Editor value={py} onChange={setPy} lang="py" />
+        <Editor
+          value={py}
+          onChange={(v) => {
+            setPy(v);
+            setHeat(null); // line numbers no longer line up
+          }}
+          onEdit={onPyEdit}
+          lang="py"
+          heat={heat}
+        />
         <div className="controls">
           <button onClick={transpile} title={`Cmd+' or Cmd+" (when focus not in editor)`}>
             Transpile → C++ (AI)
           </button>
+          <label className="status" style={{ marginLeft: 8 }}>
+            <input type="checkbox" checked={live} onChange={(e) => setLive(e.target.checked)} /> Live C++ (rule-based)
+          </label>
           <span className="status" style={{ marginLeft: 8 }}>
             Shortcuts: Cmd+' / Cmd+" (global), Cmd+Enter (run), Cmd+/ (toggle comments)
           </span>
@@ -70,9 +197,10 @@ export default function App() {
       <div className="pane">
         <h3>Generated C++ (editable)</h3>
         <Editor value={cpp} onChange={setCpp} lang="cpp" />
+        {aiStatus && <pre className="status">{aiStatus}</pre>}
       </div>
 
-      <TestRunner ref={runnerRef} python={py} cpp={cpp} />
+      <TestRunner ref={runnerRef} python={py} cpp={cpp} onLoopProfile={(p) => setHeat(p ? p.lineMs : null)} />
     </div>
   );
 }
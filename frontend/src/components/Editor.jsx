@@ -5,13 +5,44 @@ const INDENT_LEN = INDENT.length;
 const OPENERS = { "(": ")", "[": "]", "{": "}", '"': '"', "'": "'" };
 const CLOSERS = new Set(Object.values(OPENERS));
 
-export default function Editor({ value, onChange, lang = "py" }) {
+// smallest single replacement turning prev into next (offsets in UTF-16 units)
+export function diffEdit(prev, next) {
+  let start = 0;
+  const max = Math.min(prev.length, next.length);
+  while (start < max && prev[start] === next[start]) start++;
+  let tail = 0;
+  while (tail < max - start && prev[prev.length - 1 - tail] === next[next.length - 1 - tail]) tail++;
+  return { start, end: prev.length - tail, text: next.slice(start, next.length - tail) };
+}
+
+// heat: { [line]: ms } from a loop profile, drawn as line backgrounds behind the text
+function HeatBackdrop({ text, heat, scrollRef }) {
+  const max = Math.max(...Object.values(heat), 0);
+  return (
+    <div className="editor heat-backdrop" ref={scrollRef} aria-hidden>
+      {text.split("\n").map((line, i) => {
+        const ms = heat[i + 1];
+        const alpha = ms && max > 0 ? 0.12 + 0.5 * (ms / max) : 0;
+        return (
+          <div key={i} style={alpha ? { background: `rgba(255, 90, 60, ${alpha.toFixed(3)})` } : undefined}>
+            {line || " "}
+            {ms != null && <span className="heat-label">{ms < 1 ? ms.toFixed(2) : Math.round(ms)} ms</span>}
+          </div>
+        );
+      })}
+    </div>
+  );
+}
+
+export default function Editor({ value, onChange, onEdit, lang = "py", heat = null }) {
   const [val, setVal] = useState(value || "");
   const taRef = useRef(null);
+  const backRef = useRef(null);
 
   useEffect(() => setVal(value || ""), [value]);
 
   const applyEdit = (next, selStart, selEnd) => {
+    if (next !== val) onEdit?.(diffEdit(val, next));
     setVal(next);
     requestAnimationFrame(() => {
       const el = taRef.current;
@@ -133,17 +164,28 @@ export default function Editor({ value, onChange, lang = "py" }) {
     }
   };
 
-  return (
+  const textarea = (
     <textarea
       ref={taRef}
-      className="editor code-input"
+      className={heat ? "editor code-input heat-input" : "editor code-input"}
       value={val}
       onChange={(e) => {
+        onEdit?.(diffEdit(val, e.target.value));
         setVal(e.target.value);
         onChange?.(e.target.value);
       }}
+      onScroll={(e) => {
+        if (backRef.current) backRef.current.scrollTop = e.currentTarget.scrollTop;
+      }}
       onKeyDown={handleKeyDown}
       spellCheck={false}
     />
   );
+  if (!heat) return textarea;
+  return (
+    <div className="heat-wrap">
+      <HeatBackdrop text={val} heat={heat} scrollRef={backRef} />
+      {textarea}
+    </div>
+  );
 }
@@ -1,30 +1,91 @@
 import React, { forwardRef, useImperativeHandle, useState } from "react";
 
-const TestRunner = forwardRef(function TestRunner({ python, cpp }, ref) {
+const TestRunner = forwardRef(function TestRunner({ python, cpp, onLoopProfile }, ref) {
   const [stdin, setStdin] = useState("");
   const [pyOut, setPyOut] = useState("");
   const [cppOut, setCppOut] = useState("");
   const [status, setStatus] = useState("");
+  const [profile, setProfile] = useState("release");
+  const [build, setBuild] = useState(null);
+  const [comparison, setComparison] = useState(null);
+  const [stdinFile, setStdinFile] = useState(null);
+  const [generator, setGenerator] = useState("");
+  const [stress, setStress] = useState(null);
+  const [loops, setLoops] = useState(null);
 
   const API = import.meta.env.VITE_API_URL;
 
   const runBoth = async () => {
     setStatus("Running…");
     try {
-      const py = await fetch(`${API}/run/python`, {
+      // one request: the backend compiles the C++ while Python runs; a stdin
+      // file is uploaded as multipart so large inputs never become a JSON string
+      let req;
+      if (stdinFile) {
+        const form = new FormData();
+        Object.entries({ lang: "both", python, cpp, profile }).forEach(([k, v]) => form.append(k, v));
+        form.append("stdin", stdinFile);
+        req = fetch(`${API}/run/upload`, { method: "POST", body: form });
+      } else {
+        req = fetch(`${API}/run/both`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ python, cpp, stdin, profile })
+        });
+      }
+      const r = await req.then((r) => r.json());
+      const { python: py, cpp: cc } = r;
+
+      const show = (res) =>
+        (res.stdout || "") +
+        (res.truncated ? `\n[output truncated: ${res.usage.stdoutBytes} bytes total]` : "") +
+        (res.stderr ? "\n[stderr]\n" + res.stderr : "");
+      setPyOut(show(py));
+      setCppOut(show(cc));
+      setBuild(cc.compile || null);
+      setComparison({ diff: r.diff, speedup: r.speedup, wallMs: r.wallMs });
+    } finally {
+      setStatus("");
+    }
+  };
+
+  const runStress = async () => {
+    setStatus("Stress testing…");
+    setStress(null);
+    try {
+      const r = await fetch(`${API}/stress`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ code: python, stdin })
+        body: JSON.stringify({ python, cpp, generator, profile })
       }).then((r) => r.json());
+      setStress(r);
+      // the smallest failing input goes to stdin, ready for Run
+      const f = r.failure;
+      if (f) setStdin((f.shrunk || f).input);
+    } finally {
+      setStatus("");
+    }
+  };
 
-      const cc = await fetch(`${API}/run/cpp`, {
+  // runs the rule-based C++ of the Python buffer with a counter on every loop;
+  // the per-line times become a heatmap over the Python editor
+  const runProfile = async () => {
+    setStatus("Profiling loops…");
+    try {
+      const r = await fetch(`${API}/run/profile`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ code: cpp, stdin })
+        body: JSON.stringify({ code: python, stdin, profile })
       }).then((r) => r.json());
-
-      setPyOut((py.stdout || "") + (py.stderr ? "\n[stderr]\n" + py.stderr : ""));
-      setCppOut((cc.stdout || "") + (cc.stderr ? "\n[stderr]\n" + cc.stderr : ""));
+      if (!r.loopProfile) {
+        setCppOut(r.stderr || r.detail || "");
+        setLoops(null);
+        onLoopProfile?.(null);
+        return;
+      }
+      setCppOut((r.stdout || "") + (r.stderr ? "\n[stderr]\n" + r.stderr : ""));
+      setLoops({ verdict: r.verdict, wallMs: r.usage.wallMs, ...r.loopProfile });
+      onLoopProfile?.(r.loopProfile);
     } finally {
       setStatus("");
     }
@@ -41,12 +102,86 @@ const TestRunner = forwardRef(function TestRunner({ python, cpp }, ref) {
           placeholder="stdin…"
           value={stdin}
           onChange={(e) => setStdin(e.target.value)}
+          disabled={!!stdinFile}
         />
       </div>
       <div className="controls">
+        <input type="file" title="stdin from a file" onChange={(e) => setStdinFile(e.target.files[0] || null)} />
+        {stdinFile && <button onClick={() => setStdinFile(null)}>Clear file</button>}
+      </div>
+      <div className="controls">
+        <select value={profile} onChange={(e) => setProfile(e.target.value)} title="C++ build profile">
+          <option value="fast">fast (-O0)</option>
+          <option value="release">release (-O2)</option>
+          <option value="aggressive">aggressive (-O3, LTO)</option>
+          <option value="pgo">profile-guided</option>
+        </select>
         <button onClick={runBoth}>Run Python & C++</button>
+        <button
+          className="secondary"
+          onClick={runProfile}
+          disabled={!!stdinFile}
+          title="Run the rule-based C++ with per-loop counters (text stdin only)"
+        >
+          Profile loops
+        </button>
+        {build && (
+          <div className="status">
+            {Object.entries(build.phases).map(([k, ms]) => `${k} ${Math.round(ms)} ms`).join(" · ")}
+          </div>
+        )}
+        {comparison && (
+          <div className="status">
+            {comparison.diff.match
+              ? "outputs match"
+              : `${comparison.diff.mismatchedLines} line(s) differ, first at line ${comparison.diff.firstMismatch}`}
+            {comparison.speedup && ` · C++ ${comparison.speedup.cpu}× faster (cpu)`}
+            {` · ${Math.round(comparison.wallMs)} ms total`}
+          </div>
+        )}
         {status && <div className="status">{status}</div>}
       </div>
+      {loops && (
+        <pre className="output">
+          {`${loops.verdict} · ${Math.round(loops.wallMs)} ms\n` +
+            [...loops.loops]
+              .sort((a, b) => b.selfMs - a.selfMs)
+              .slice(0, 8)
+              .map(
+                (l) =>
+                  `line ${l.line} ${l.kind} in ${l.function}: ${l.selfMs} ms self, ${l.ms} ms total` +
+                  ` (${Math.round(l.share * 100)}%), ${l.hits} iterations` +
+                  (l.running ? " · still running" : "")
+              )
+              .join("\n")}
+        </pre>
+      )}
+      {comparison && !comparison.diff.match && (
+        <pre className="output">
+          {comparison.diff.lines
+            .map((l) => `line ${l.line}\n  py:  ${l.expected ?? "<missing>"}\n  c++: ${l.actual ?? "<missing>"}`)
+            .join("\n")}
+        </pre>
+      )}
+      <div className="io">
+        <textarea
+          className="editor"
+          placeholder="input generator (Python, prints one test; seeded per case)…"
+          value={generator}
+          onChange={(e) => setGenerator(e.target.value)}
+        />
+      </div>
+      <div className="controls">
+        <button onClick={runStress} disabled={!generator.trim()}>Stress test</button>
+        {stress && (
+          <div className="status">
+            {stress.status === "compile_error" || stress.status === "error"
+              ? `${stress.status}: ${(stress.stderr || stress.error || "").slice(0, 200)}`
+              : `${stress.status} · ${stress.cases} cases · ${stress.casesPerSec}/s` +
+                (stress.failure ? ` · ${stress.failure.kind} on seed ${stress.failure.seed}` : "")}
+          </div>
+        )}
+      </div>
       <div style={{ display: "flex", gap: 8, padding: 8, height: "100%" }}>
         <div className="pane" style={{ flex: 1 }}>
           <h3>Python output</h3>